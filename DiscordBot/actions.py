@@ -0,0 +1,113 @@
+# actions.py
+import asyncio
+import logging
+from collections import OrderedDict
+
+import discord
+
+logger = logging.getLogger('modbot.actions')
+
+# Number of completed step keys remembered for idempotency
+MAX_REMEMBERED_STEPS = 10000
+
+
+class ActionOutcome:
+    """Result of one moderator action: which steps succeeded, were skipped or failed."""
+    def __init__(self):
+        self.succeeded = []
+        self.skipped = []  # Already done by an earlier run with the same key
+        self.failed = {}  # Map from step name to a short error description
+
+    @property
+    def ok(self):
+        return not self.failed
+
+    def summary(self):
+        lines = []
+        if self.failed:
+            lines.append("⚠️ Some steps failed:")
+            lines.extend(f"• {name}: {error}" for name, error in self.failed.items())
+        if self.skipped:
+            lines.append(f"ℹ️ Already done earlier: {', '.join(self.skipped)}")
+        return "\n".join(lines)
+
+
+def _describe(error):
+    if isinstance(error, discord.Forbidden):
+        return "missing permission (they may have DMs disabled)"
+    if isinstance(error, discord.NotFound):
+        return "not found"
+    return str(error) or type(error).__name__
+
+
+def _is_retryable(error):
+    if isinstance(error, (discord.Forbidden, discord.NotFound)):
+        return False
+    if isinstance(error, discord.HTTPException):
+        return error.status >= 500 or error.status == 429
+    return isinstance(error, (asyncio.TimeoutError, OSError))
+
+
+class ActionExecutor:
+    """
+    Runs the side effects of a moderator action (DMs, message deletes,
+    infraction records) concurrently, retrying transient failures.
+
+    Every step runs under an idempotency key `<action key>:<step name>`. A step
+    that already succeeded under its key is not repeated, and a step that is
+    still running is awaited instead of started twice, so a moderator replying
+    "ban" twice does not DM the user twice.
+    """
+    def __init__(self, retries=3, base_delay=0.5):
+        self.retries = retries
+        self.base_delay = base_delay
+        self._completed = OrderedDict()  # Idempotency keys of steps that succeeded, oldest first
+        self._in_flight = {}  # Map from idempotency key to the running step task
+
+    async def run(self, action_key, steps):
+        """
+        Runs all steps of one action concurrently.
+
+        Args:
+            action_key: Identifies the action, e.g. "<message id>:ban:<user id>"
+            steps: Map from step name to a zero-argument callable returning an awaitable
+
+        Returns:
+            ActionOutcome
+        """
+        outcome = ActionOutcome()
+        names, tasks = [], []
+        for name, step in steps.items():
+            key = f"{action_key}:{name}"
+            if key in self._completed:
+                outcome.skipped.append(name)
+                continue
+            task = self._in_flight.get(key)
+            if task is None:
+                task = asyncio.ensure_future(self._run_step(key, step))
+                self._in_flight[key] = task
+                task.add_done_callback(lambda _, key=key: self._in_flight.pop(key, None))
+            names.append(name)
+            tasks.append(task)
+
+        for name, result in zip(names, await asyncio.gather(*tasks, return_exceptions=True)):
+            if isinstance(result, BaseException):
+                outcome.failed[name] = _describe(result)
+            else:
+                outcome.succeeded.append(name)
+        return outcome
+
+    async def _run_step(self, key, step):
+        for attempt in range(self.retries + 1):
+            try:
+                result = await step()
+            except Exception as e:
+                if attempt == self.retries or not _is_retryable(e):
+                    logger.warning("Action step %s failed: %s", key, e)
+                    raise
+                await asyncio.sleep(self.base_delay * 2 ** attempt)
+            else:
+                self._completed[key] = True
+                while len(self._completed) > MAX_REMEMBERED_STEPS:
+                    self._completed.popitem(last=False)
+                return result
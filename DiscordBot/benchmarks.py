@@ -0,0 +1,225 @@
+# benchmarks.py
+"""
+Micro-benchmarks for the detection and formatting hot paths.
+
+Texts come from data/labeled_slurs.csv. API-backed detectors are stubbed, so
+runs are offline and measure only our own code. Each benchmark reports
+ops/sec, p50/p99 latency and memory allocated per operation, and is compared
+against the stored baseline:
+
+    python benchmarks.py                  # run and compare with benchmarks_baseline.json
+    python benchmarks.py --save-baseline  # record the current numbers as the new baseline
+    python benchmarks.py --only regex     # run benchmarks whose name contains "regex"
+
+The run exits with status 1 when a benchmark's throughput falls, or its
+allocations grow, by more than the tolerance. Baselines are machine-specific;
+re-record them when changing machines.
+"""
+import argparse
+import asyncio
+import csv
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+from detection_engine import DetectionEngine, DetectionConfig
+from hate_speech_detector import DetectionMethod, DetectionResult
+from report import Report
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+CORPUS_PATH = os.path.join(DATA_DIR, "labeled_slurs.csv")
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks_baseline.json")
+CORPUS_SIZE = 2000  # Texts sampled from the corpus
+SEED = 152  # Sampling seed, so every run sees the same texts
+MIN_SECONDS = 1.0  # Each benchmark repeats over the corpus for at least this long
+TOLERANCE = 0.25  # Allowed fractional drop in ops/sec or growth in allocations
+ALLOC_SLACK_BYTES = 256  # Allocation growth per op always allowed, since small allocations are noisy
+
+# Steps of a complete slur report, starting from an identified message
+REPORT_FLOW = ["ok", "1", "race", "individual", "joke", "no"]
+
+
+def load_corpus(path=CORPUS_PATH, size=CORPUS_SIZE, seed=SEED):
+    """Samples `size` tweets from the labeled dataset, deterministically."""
+    with open(path, newline='', encoding='utf-8') as f:
+        texts = [row["tweet"] for row in csv.DictReader(f)]
+    return random.Random(seed).sample(texts, min(size, len(texts)))
+
+
+def stub_completion(text):
+    """A chat completion shaped like the OpenAI response, with a verdict derived from the text."""
+    flagged = len(text) % 3 == 0
+    content = json.dumps({
+        "hate_speech_detected": flagged,
+        "confidence_score": 0.9 if flagged else 0.1,
+        "category": "threat" if flagged else None,
+        "explanation": "Stub response"
+    })
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+        usage=SimpleNamespace(prompt_tokens=60 + len(text) // 4, completion_tokens=40)
+    )
+
+
+def stub_engine():
+    """A detection engine whose API calls return immediately, with the response cache disabled."""
+    engine = DetectionEngine(DetectionConfig(openai_api_key="benchmark", cache_size=0))
+
+    async def create(model, messages, params):
+        return stub_completion(messages[-1]["content"])
+
+    engine.classifier._create = create
+    return engine
+
+
+class StubClient:
+    """The parts of ModBot that Report uses."""
+    def __init__(self):
+        self.automod_scores = {}
+        self.report_classifier = None
+
+
+def measure(run_once, corpus, min_seconds=MIN_SECONDS):
+    """
+    Times `run_once(item)` over the corpus until `min_seconds` have passed,
+    then repeats one pass under tracemalloc to measure the peak memory
+    each operation allocates.
+    Returns a dict of results.
+    """
+    samples = []
+    start = time.perf_counter()
+    while time.perf_counter() - start < min_seconds:
+        for item in corpus:
+            t0 = time.perf_counter_ns()
+            run_once(item)
+            samples.append(time.perf_counter_ns() - t0)
+    elapsed = time.perf_counter() - start
+
+    # Allocation pass, kept separate because tracing slows everything down
+    tracemalloc.start()
+    allocated = 0
+    for item in corpus:
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        run_once(item)
+        allocated += tracemalloc.get_traced_memory()[1] - before
+    tracemalloc.stop()
+
+    samples.sort()
+    return {
+        "ops": len(samples),
+        "ops_per_sec": len(samples) / elapsed,
+        "p50_us": samples[len(samples) // 2] / 1000,
+        "p99_us": samples[min(len(samples) - 1, int(len(samples) * 0.99))] / 1000,
+        "peak_bytes_per_op": allocated / len(corpus),
+    }
+
+
+def benchmark_suite(corpus):
+    """Returns {name: zero-argument function running the benchmark}."""
+    engine = stub_engine()
+    detector = engine.detector
+    loop = asyncio.new_event_loop()
+
+    analyses = [loop.run_until_complete(engine.eval_text(text, caller="benchmark")) for text in corpus]
+    detection_results = [
+        [detector.detect_with_regex_slurs(text),
+         DetectionResult(DetectionMethod.OPENAI_API, len(text) % 3 == 0, 0.9, "threat", "Stub response")]
+        for text in corpus
+    ]
+
+    # Imported here, outside the timed function: bot.py pulls in discord.py,
+    # which only this benchmark needs
+    from bot import ModBot
+
+    def code_format(analysis):
+        return ModBot.code_format(None, analysis)
+
+    client = StubClient()
+
+    def report_flow(text):
+        message = SimpleNamespace(id=hash(text), content=text)
+        # Scores already known from automod, so no classification task is started
+        client.automod_scores[message.id] = analyses[0]
+        report = Report(client, message)
+        for step in REPORT_FLOW:
+            loop.run_until_complete(report.handle_message(SimpleNamespace(content=step)))
+        client.automod_scores.pop(message.id, None)
+
+    return {
+        "regex_slurs": lambda: measure(detector.detect_with_regex_slurs, corpus),
+        "eval_text_stubbed": lambda: measure(
+            lambda text: loop.run_until_complete(engine.eval_text(text, caller="benchmark")), corpus
+        ),
+        "evaluate_results": lambda: measure(detector.evaluate_results, detection_results),
+        "code_format": lambda: measure(code_format, analyses),
+        "report_flow": lambda: measure(report_flow, corpus),
+    }
+
+
+def compare(results, baseline, tolerance=TOLERANCE):
+    """Returns a list of regression descriptions, empty if none."""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        if current["ops_per_sec"] < previous["ops_per_sec"] * (1 - tolerance):
+            regressions.append(
+                f"{name}: {current['ops_per_sec']:.0f} ops/s, baseline {previous['ops_per_sec']:.0f}"
+            )
+        if current["peak_bytes_per_op"] > previous["peak_bytes_per_op"] * (1 + tolerance) + ALLOC_SLACK_BYTES:
+            regressions.append(
+                f"{name}: {current['peak_bytes_per_op']:.0f} B/op allocated, "
+                f"baseline {previous['peak_bytes_per_op']:.0f}"
+            )
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the detection and formatting hot paths")
+    parser.add_argument("--only", help="run only benchmarks whose name contains this text")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help=f"write the results to {os.path.basename(BASELINE_PATH)}")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE,
+                        help="allowed fractional regression before the run fails")
+    args = parser.parse_args()
+
+    corpus = load_corpus()
+    print(f"Corpus: {len(corpus)} texts from {os.path.basename(CORPUS_PATH)}\n")
+    print(f"{'benchmark':<20} {'ops/sec':>12} {'p50 us':>10} {'p99 us':>10} {'alloc B/op':>12}")
+
+    results = {}
+    for name, run in benchmark_suite(corpus).items():
+        if args.only and args.only not in name:
+            continue
+        results[name] = result = run()
+        print(f"{name:<20} {result['ops_per_sec']:>12.0f} {result['p50_us']:>10.1f} "
+              f"{result['p99_us']:>10.1f} {result['peak_bytes_per_op']:>12.0f}")
+
+    if args.save_baseline:
+        baseline = {}
+        if os.path.isfile(BASELINE_PATH):
+            with open(BASELINE_PATH) as f:
+                baseline = json.load(f)
+        baseline.update(results)
+        with open(BASELINE_PATH, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"\nSaved baseline to {BASELINE_PATH}")
+        sys.exit(0)
+
+    if not os.path.isfile(BASELINE_PATH):
+        print("\nNo baseline found; run with --save-baseline to create one.")
+        sys.exit(0)
+    with open(BASELINE_PATH) as f:
+        regressions = compare(results, json.load(f), args.tolerance)
+    if regressions:
+        print("\nRegressions against the baseline:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+    print("\nNo regressions against the baseline.")
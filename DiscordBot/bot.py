@@ -5,39 +5,42 @@ import os
 import json
 import logging
 import re
-import requests
-from report import Report, State, ReportReason, SlurType, TargetGroup, Context
-import pdb
-import openai
+import io
+from report import Report, State, ReportReason, SlurType, TargetGroup, Context, HateSpeechClassifier
 import time
-from hate_speech_detector import HateSpeechDetector, DetectionMethod
+from collections import OrderedDict
+from hate_speech_detector import DetectionMethod
 from database import InfractionDatabase
-
-# Set up logging to the console
-logger = logging.getLogger('discord')
-logger.setLevel(logging.DEBUG)
-handler = logging.FileHandler(filename='discord.log', encoding='utf-8', mode='w')
-handler.setFormatter(logging.Formatter('%(asctime)s:%(levelname)s:%(name)s: %(message)s'))
-logger.addHandler(handler)
-
-# Load configuration from tokens.json
-token_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tokens.json')
-if not os.path.isfile(token_path):
-    print(f"Error: {token_path} not found!")
-    print(f"Current working directory: {os.getcwd()}")
-    print("Make sure to create a tokens.json file with your Discord token.")
-    print("Format should be: { \"discord\": \"your_token_here\", \"openai\": \"your_openai_key_here\" }")
-    raise Exception(f"{token_path} not found!")
-with open(token_path) as f:
-    tokens = json.load(f)
-    discord_token = tokens['discord']
-    # Configure OpenAI API key if available
-    if 'openai' in tokens:
-        openai.api_key = tokens['openai']
-    else:
-        print("Warning: OpenAI API key not found in tokens.json")
-        print("Add an 'openai' field with your API key to enable hate speech detection")
-        openai.api_key = None
+from counters import UserCounters, CounterError, OFFENSES
+from detection_engine import DetectionEngine, DetectionConfig
+from report_sessions import ReportSessionStore
+from channel_index import ChannelIndex, MONITORED, MOD, ESCALATION
+from log_config import configure_logging
+from config import load_tokens, TOKENS_PATH
+from traffic import TrafficRecorder
+from usage import guild_scope
+from profiler import SamplingProfiler, DEFAULT_PROFILE_SECONDS, MAX_PROFILE_SECONDS
+from memory_monitor import MemoryMonitor, trim_oldest
+from tracing import Tracer, span
+from metrics import REGISTRY, STAGE_SECONDS, MESSAGES, METRICS_PORT, start_metrics_server, stats_summary
+
+logger = logging.getLogger('modbot')
+# Per-message events; sampled, see log_config.DEFAULT_SAMPLE_RATES
+message_logger = logging.getLogger('modbot.messages')
+
+# Number of recent automod results kept for reuse by the report flow
+AUTOMOD_SCORE_CACHE_SIZE = 1000
+
+# In-progress DM reports: where they are saved, how long they may sit idle
+# (seconds) and how many are kept at most
+REPORT_SESSIONS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'report_sessions.json')
+REPORT_SESSION_IDLE_TIMEOUT = 30 * 60
+MAX_REPORT_SESSIONS = 1000
+
+# Report cards and escalations kept, newest first, when the memory monitor evicts state
+# (MODBOT_MEMORY_EVICT=1). Law enforcement escalations are never evicted
+EVICT_KEEP_MOD_REPORTS = 2000
+EVICT_KEEP_ESCALATED_REPORTS = 500
 
 class ModBot(commands.Bot):
     """
@@ -49,11 +52,11 @@ class ModBot(commands.Bot):
         intents.message_content = True
         super().__init__(command_prefix='.', intents=intents)
         self.group_num = None
-        self.mod_channels = {}  # Map from guild to the mod channel id for that guild
-        self.reports = {}  # Map from user IDs to the state of their report
+        # Channels the bot monitors, reports to and escalates to, kept current from gateway events
+        self.channel_index = ChannelIndex()
+        self.mod_channels = self.channel_index.channels[MOD]  # Map from guild ID to the mod channel for that guild
         self.mod_reports = {}  # Map from mod message IDs to reported message info
-        self.message_report_counts = {}  # Map from message IDs to the number of times they've been reported
-        self.user_offense_counts = {}  # Map from user IDs to the number of times they've been flagged for hate speech
+        self.automod_scores = OrderedDict()  # Map from message IDs to their automod scores, most recent last
         
         # Initialize database
         try:
@@ -62,7 +65,30 @@ class ModBot(commands.Bot):
         except Exception as e:
             print(f"Failed to initialize database: {str(e)}")
             self.db = None
+
+        # Offense, suspension and false-report counts per user, cached from the database
+        self.counters = UserCounters(self.db)
         
+        # Detection pipeline and the classification service shared by automod and the report flow.
+        # OPENAI_BASE_URL and MODBOT_CASSETTE point it at a stub server or recorded responses
+        tokens = load_tokens()
+        if 'openai' not in tokens:
+            print("Warning: OpenAI API key not found in tokens.json")
+            print("Add an 'openai' field with your API key to enable hate speech detection")
+        self.engine = DetectionEngine(DetectionConfig.from_env())
+        self.classifier = self.engine.classifier
+        self.detector = self.engine.detector
+        self.report_classifier = HateSpeechClassifier(self.classifier)
+
+        # Map from user IDs to the state of their report, persisted across restarts
+        self.reports = ReportSessionStore(
+            self,
+            path=REPORT_SESSIONS_PATH,
+            idle_timeout=REPORT_SESSION_IDLE_TIMEOUT,
+            max_sessions=MAX_REPORT_SESSIONS
+        )
+        self.reports.load()
+
         # Setting to control whether to forward clean messages (non-flagged) to mod channel
         self.forward_clean_messages = False  # Only forward flagged messages by default
 
@@ -70,13 +96,51 @@ class ModBot(commands.Bot):
         self.escalation_channel_id = None
         self.law_enforcement_reports = {}  # Track LE escalations with reference IDs
 
-        self.number_of_false_reports = {}
-
-        self.user_suspension_counts = {}  # Track total suspensions per user
+        # Optional capture of handled events for replay (MODBOT_TRAFFIC_LOG, see traffic.py)
+        self.traffic = TrafficRecorder.from_env()
+
+        # Optional per-message traces through the pipeline (MODBOT_TRACE_LOG, see tracing.py)
+        self.tracer = Tracer.from_env()
+
+        # Sampling profiler started from the mod channel with `.profile`, while it runs
+        self.profiler = None
+
+        # Queue depths and state sizes, read whenever metrics are scraped
+        self.metrics_server = None
+        REGISTRY.gauge("modbot_classifier_waiting", "Classification requests queued for a slot",
+                       lambda: self.classifier.waiting)
+        REGISTRY.gauge("modbot_classifier_in_flight", "Classification requests awaiting the API",
+                       lambda: self.classifier.in_flight)
+        REGISTRY.gauge("modbot_report_sessions", "In-progress DM reports", lambda: len(self.reports))
+        REGISTRY.gauge("modbot_mod_reports", "Report cards moderators can act on", lambda: len(self.mod_reports))
+        REGISTRY.gauge("modbot_automod_scores", "Cached automod results", lambda: len(self.automod_scores))
+        REGISTRY.gauge("modbot_user_counters", "Users with cached infraction counts", lambda: len(self.counters))
+
+        # RSS and state sizes checked against a budget, with allocation tracing near it (see memory_monitor.py)
+        self.memory = MemoryMonitor.from_env(
+            states={
+                "report_sessions": lambda: len(self.reports),
+                "mod_reports": lambda: len(self.mod_reports),
+                "escalated_reports": lambda: len(self.escalated_reports),
+                "law_enforcement_reports": lambda: len(self.law_enforcement_reports),
+                "report_cards": lambda: len(self.get_cog('Moderation').report_cards),
+                "automod_scores": lambda: len(self.automod_scores),
+                "user_counters": lambda: len(self.counters),
+                "classifier_cache": lambda: len(self.classifier._cache),
+            },
+            post=self.post_to_mod_channels,
+            evict=self.evict_state
+        )
     
     async def setup_hook(self):
-        """Load in moderator flow"""
+        """Load in moderator flow, start flushing LLM usage and report sessions and start the local metrics endpoint"""
         await self.load_extension('moderation')
+        self.classifier.usage.start()
+        self.reports.start()
+        self.memory.start()
+        port = int(os.environ.get("MODBOT_METRICS_PORT", METRICS_PORT))
+        if port:
+            self.metrics_server = await start_metrics_server(port)
 
     async def on_ready(self):
         """
@@ -95,12 +159,26 @@ class ModBot(commands.Bot):
         else:
             raise Exception("Group number not found in bot's name. Name format should be \"Group # Bot\".")
 
-        # Find the mod channel in each guild that this bot should report to
+        # Index the monitored, mod and escalation channels of each guild
+        self.channel_index.build(self.guilds, self.group_num)
         for guild in self.guilds:
-            for channel in guild.text_channels:
-                if channel.name == f'group-{self.group_num}-mod':
-                    self.mod_channels[guild.id] = channel
-                    print(f"Found mod channel in {guild.name}: #{channel.name}")
+            if guild.id in self.mod_channels:
+                print(f"Found mod channel in {guild.name}: #{self.mod_channels[guild.id].name}")
+
+    async def on_guild_channel_create(self, channel):
+        self.channel_index.add(channel)
+
+    async def on_guild_channel_update(self, before, after):
+        self.channel_index.update(before, after)
+
+    async def on_guild_channel_delete(self, channel):
+        self.channel_index.remove(channel)
+
+    async def on_guild_join(self, guild):
+        self.channel_index.add_guild(guild)
+
+    async def on_guild_remove(self, guild):
+        self.channel_index.remove_guild(guild)
 
     async def on_message(self, message):
         """
@@ -110,6 +188,12 @@ class ModBot(commands.Bot):
         # Ignore messages from the bot 
         if message.author.id == self.user.id:
             return
+        if self.traffic:
+            self.traffic.record_message(
+                message,
+                self.channel_index.role(message.channel.id),
+                self.reported_message_id(message.reference.message_id) if message.reference else None
+            )
 
         # Route to appropriate handler based on message source
         if message.guild:
@@ -117,6 +201,21 @@ class ModBot(commands.Bot):
         else:
             await self.handle_dm(message)
 
+    def reported_message_id(self, mod_message_id):
+        """Returns the ID of the message a mod report card is about, or None if it is not a card."""
+        reported_info = self.mod_reports.get(mod_message_id)
+        return reported_info['reported_message'].id if reported_info else None
+
+    def remember_automod_scores(self, message_id, scores):
+        """
+        Keeps the most recent automod scores so a report on an already
+        scored message can reuse them instead of classifying it again.
+        """
+        self.automod_scores[message_id] = scores
+        self.automod_scores.move_to_end(message_id)
+        while len(self.automod_scores) > AUTOMOD_SCORE_CACHE_SIZE:
+            self.automod_scores.popitem(last=False)
+
     async def get_text_from_attachment(self, attachment):
         """
         Downloads and reads text from a .txt file attachment.
@@ -137,7 +236,7 @@ class ModBot(commands.Bot):
             text = file_content.decode('utf-8')
             return text
         except Exception as e:
-            print(f"Error reading attachment: {e}")
+            logger.warning("Error reading attachment %s: %s", attachment.filename, e)
             return None
 
     async def handle_dm(self, message):
@@ -158,24 +257,20 @@ class ModBot(commands.Bot):
         # Only respond to messages if they're part of a reporting flow or starting one
         if message.content.lower() == Report.START_KEYWORD:
             self.reports[author_id] = Report(self)
-        elif author_id not in self.reports:
+        report = await self.reports.get(author_id)
+        if report is None:
             return
 
         # Let the report class handle this message and send responses
-        responses = await self.reports[author_id].handle_message(message)
+        responses = await report.handle_message(message)
+        self.reports.changed()
         for r in responses:
             await message.channel.send(r)
 
         # Forward complete reports to mod channels
-        if author_id in self.reports and self.reports[author_id].state == State.REPORT_COMPLETE and self.reports[author_id].reason:
-            guild_id = self.reports[author_id].message.guild.id
+        if report.state == State.REPORT_COMPLETE and report.reason:
+            guild_id = report.message.guild.id
             if guild_id in self.mod_channels:
-                report = self.reports[author_id]
-                reported_message_id = report.message.id
-
-                # Update the report count for this message
-                self.message_report_counts[reported_message_id] = self.message_report_counts.get(reported_message_id, 0) + 1
-
                 # Format the reason text with all new details
                 reason_text = report.reason.value
                 if report.reason == ReportReason.SLURS:
@@ -192,25 +287,25 @@ class ModBot(commands.Bot):
                 if report.is_immediate_threat:
                     reason_text = "@here ⚠️ IMMEDIATE THREAT REPORTED ⚠️\n" + reason_text
 
-                # Send report to moderators
+                # Send report to moderators; repeat reports of the same message update one card
                 moderation_cog = self.get_cog('Moderation')
-                await moderation_cog.send_actionable_report_to_mods(
+                await moderation_cog.aggregate_user_report(
                     guild_id, 
                     report.message, 
                     message.author,
-                    reason_text,
-                    self.message_report_counts[reported_message_id],
-                    is_user_report=True
+                    reason_text
                 )
 
 
         # Clean up completed reports
-        if author_id in self.reports and self.reports[author_id].report_complete():
+        if report.report_complete():
             self.reports.pop(author_id)
 
     async def on_raw_reaction_add(self, payload):
         if payload.user_id == self.user.id:
             return
+        if self.traffic:
+            self.traffic.record_reaction(payload, self.reported_message_id(payload.message_id))
         
         guild = self.get_guild(payload.guild_id)
         if not guild: return
@@ -224,15 +319,19 @@ class ModBot(commands.Bot):
   
         if payload.message_id in self.mod_reports:
             report_info = self.mod_reports[payload.message_id]
-            if payload.emoji.name == '⏫':
-                await moderation_cog.escalate_report(payload.message_id, report_info, user, guild)
+            with self.tracer.trace(
+                "mod_reaction", trace_id=report_info.get('trace_id'), emoji=payload.emoji.name,
+                moderator_id=payload.user_id, mod_message_id=payload.message_id
+            ):
+                if payload.emoji.name == '⏫':
+                    await moderation_cog.escalate_report(payload.message_id, report_info, user, guild)
             
-            elif payload.emoji.name == '🚔':
-                ref_id = await moderation_cog.escalate_to_law_enforcement(report_info, user, guild)
-                await self.mod_channels[guild.id].send(
-                    f"✅ Report escalated to law enforcement by {user.name}\n"
-                    f"Reference ID: `{ref_id}`"
-                )
+                elif payload.emoji.name == '🚔':
+                    ref_id = await moderation_cog.escalate_to_law_enforcement(report_info, user, guild)
+                    await self.mod_channels[guild.id].send(
+                        f"✅ Report escalated to law enforcement by {user.name}\n"
+                        f"Reference ID: `{ref_id}`"
+                    )
         
         elif payload.emoji.name in ['🚔','✅', '❌']:
             await moderation_cog.handle_le_escalation_reaction(payload, user, guild)
@@ -240,6 +339,10 @@ class ModBot(commands.Bot):
     async def generate_incident_report(self, escalation_record, requesting_user, guild):      
         report_info = escalation_record['original_report']
         reported_msg = report_info['reported_message']
+        try:
+            previous_violations = await self.counters.get_count(reported_msg.author.id, guild.id)
+        except CounterError:
+            previous_violations = "unknown"
         
         incident_report = f"""
         **INCIDENT REPORT - {escalation_record['reference_id']}**
@@ -257,7 +360,7 @@ class ModBot(commands.Bot):
         • Username: {reported_msg.author.name}
         • User ID: {reported_msg.author.id}
         • Account Created: {reported_msg.author.created_at.strftime('%Y-%m-%d %H:%M:%S UTC')}
-        • Previous Violations: {self.user_offense_counts.get(reported_msg.author.id, 0)}
+        • Previous Violations: {previous_violations}
 
         **MESSAGE DETAILS**:
         • Content: "{reported_msg.content}"
@@ -298,10 +401,21 @@ class ModBot(commands.Bot):
         Handles moderation commands, analyzes content for hate speech,
         and forwards relevant messages to the mod channel.
         """
+        channel_role = self.channel_index.role(message.channel.id)
+
+        # Pipeline metrics for moderators
+        if channel_role in (MOD, ESCALATION) and message.content.strip().lower() == '.stats':
+            await self.send_stats(message.channel)
+            return
+        if channel_role in (MOD, ESCALATION) and message.content.strip().lower() == '.memory':
+            await self.send_in_chunks(message.channel, await self.memory.summary())
+            return
+        if channel_role in (MOD, ESCALATION) and message.content.strip().lower().startswith('.profile'):
+            await self.handle_profile_command(message.channel, message.content.split()[1:])
+            return
+
         # Handle moderator commands (replies to reported messages)
-        if ((message.channel.name == f'group-{self.group_num}-mod' or 
-             message.channel.name == f'group-{self.group_num}-escalation') and 
-             message.reference):
+        if channel_role in (MOD, ESCALATION) and message.reference:
             
             moderation_cog = self.get_cog('Moderation')
             if not moderation_cog:
@@ -309,44 +423,66 @@ class ModBot(commands.Bot):
 
             referenced_message = await message.channel.fetch_message(message.reference.message_id)
             if referenced_message.id in self.mod_reports:
-                action = message.content.lower()
+                action = message.content.strip().lower()
                 reported_info = self.mod_reports[referenced_message.id]
                 reported_user = reported_info['reported_message'].author
                 reporter = reported_info['reporter']
                 
-                if action == "ban":
-                    try:
-                        # Simulate banning by sending a DM
-                        await reported_user.send(f"You have been banned for: {reported_info['reason']}")
-                        await reported_info['reported_message'].delete()
-                        await message.channel.send(f"Simulated ban message sent to {reported_user.name}.")
-                        if isinstance(reported_info['reporter'], discord.Member):
-                            await reported_info['reporter'].send(f"The user you reported has been banned. Thank you for helping keep our community safe!")
-                    except discord.Forbidden:
-                        await message.channel.send("I couldn't send a message to that user (they may have DMs disabled).")
+                with self.tracer.trace(
+                    "mod_reply", trace_id=reported_info.get('trace_id'), action=action,
+                    moderator_id=message.author.id, mod_message_id=referenced_message.id
+                ):
+                    user_actions = {
+                        "ban": moderation_cog.execute_ban,
+                        "suspend": moderation_cog.execute_suspend,
+                        "warn": moderation_cog.execute_warn
+                    }
+                    reporter_actions = {
+                        "ban reporter": moderation_cog.execute_ban_reporter,
+                        "suspend reporter": moderation_cog.execute_suspend_reporter,
+                        "warn reporter": moderation_cog.execute_warn_reporter
+                    }
                 
-                # Handle warn command
-                elif action == "warn":
-                    try:
-                        await reported_user.send(f"You have received a warning for: {reported_info['reason']}. If this happens again you will be banned.")
-                        await reported_info['reported_message'].delete()
-                        await message.channel.send(f"Warning sent to {reported_user.name}.")
-                        if isinstance(reported_info['reporter'], discord.Member):
-                            await reported_info['reporter'].send(f"The user you reported has been warned. Thank you for helping keep our community safe!")
-                    except discord.Forbidden:
-                        await message.channel.send("I couldn't send a warning to that user (they may have DMs disabled).")
+                    if action in user_actions:
+                        await user_actions[action](reported_user, reported_info, message)
                 
-                # Handle toggle forwarding command
-                elif action == "toggle forwarding":
-                    self.forward_clean_messages = not self.forward_clean_messages
-                    status = "enabled" if self.forward_clean_messages else "disabled"
-                    await message.channel.send(f"Forwarding of clean messages is now {status}.")
+                    elif action in reporter_actions:
+                        if reported_info.get('is_user_report'):
+                            await reporter_actions[action](reporter, reported_info, message)
+                        else:
+                            await message.channel.send("This report came from automatic detection, so there is no reporter to act on.")
+                
+                    elif action == "dismiss":
+                        await moderation_cog.dismiss_report(reporter, reported_info, message)
+                
+                    elif action == "purge":
+                        await moderation_cog.purge_user_messages(reported_user, reported_info, message)
+                
+                    # Handle toggle forwarding command
+                    elif action == "toggle forwarding":
+                        self.forward_clean_messages = not self.forward_clean_messages
+                        status = "enabled" if self.forward_clean_messages else "disabled"
+                        await message.channel.send(f"Forwarding of clean messages is now {status}.")
                 return
 
         # Only process messages from the group's channel
-        if not message.channel.name == f'group-{self.group_num}':
+        if channel_role != MONITORED:
             return
 
+        with STAGE_SECONDS.time(stage="message_total"), guild_scope(message.guild.id), self.tracer.trace(
+            "handle_channel_message", message_id=message.id, guild_id=message.guild.id,
+            channel_id=message.channel.id, author_id=message.author.id
+        ) as traced:
+            found_hate_speech = await self.scan_message(message)
+            if traced:
+                traced.set(flagged=found_hate_speech)
+        MESSAGES.inc(outcome="flagged" if found_hate_speech else "clean")
+
+    async def scan_message(self, message):
+        """
+        Checks a monitored message and its .txt attachments for hate speech,
+        reporting anything found to the mod channel. Returns whether any was found.
+        """
         mod_channel = self.mod_channels[message.guild.id]
         
         # Track if any hate speech was detected in the message or attachments
@@ -354,9 +490,14 @@ class ModBot(commands.Bot):
         
         # Process the text content of the message
         if message.content:
-            print(f"Processing message from {message.author.name}: {message.content}")
             scores = await self.eval_text(message.content)
-            print(f"Evaluation scores: {scores}")
+            self.remember_automod_scores(message.id, scores)
+            message_logger.info("Evaluated message", extra={
+                "message_id": message.id,
+                "author_id": message.author.id,
+                "is_hate_speech": scores.get('is_hate_speech', False),
+                "confidence": scores.get('confidence'),
+            })
             
             # Check if hate speech was detected in the message
             msg_has_hate = scores.get('is_hate_speech', False)
@@ -366,14 +507,13 @@ class ModBot(commands.Bot):
             moderation_cog = self.get_cog('Moderation')
 
             if msg_has_hate or self.forward_clean_messages:
-                print(f"Hate speech detected: {msg_has_hate}")
                 await mod_channel.send(f'Forwarded message:\n{message.author.name}: "{message.content}"')
                 await mod_channel.send(self.code_format(scores))
             
             # Update user offense count and create actionable report if hate speech was detected
             if msg_has_hate:
-                print(f"Updating offense count for {message.author.name}")
-                await self.update_user_offense_count(message.author, mod_channel, message)
+                with span("update_user_offense_count"):
+                    await self.update_user_offense_count(message.author, mod_channel, message)
                 
                 # Create an actionable report for moderators
                 reason_text = f"Automatic hate speech detection"
@@ -414,14 +554,15 @@ class ModBot(commands.Bot):
                     
                     # Update user offense count and create actionable report if hate speech was detected
                     if file_has_hate:
-                        await self.update_user_offense_count(message.author, mod_channel, message)
+                        with span("update_user_offense_count"):
+                            await self.update_user_offense_count(message.author, mod_channel, message)
                         
                         # Create an actionable report for moderators for file content
                         reason_text = f"Automatic hate speech detection in file ({attachment.filename})"
                         if file_scores.get("category"):
                             reason_text += f" - {file_scores.get('category')}"
                         
-                        moderation_cog = self.get_cog('ModerationCog')
+                        moderation_cog = self.get_cog('Moderation')
                         await moderation_cog.send_actionable_report_to_mods(
                             message.guild.id,
                             message,
@@ -436,6 +577,91 @@ class ModBot(commands.Bot):
         # Send alert if hate speech was detected but no content to display
         if found_hate_speech and not message.content and not any(a.filename.lower().endswith('.txt') for a in message.attachments):
             await mod_channel.send(f'⚠️ Hate speech detected in message from {message.author.name} but no content to display.')
+        return found_hate_speech
+
+    async def send_stats(self, channel):
+        """Posts a digest of the pipeline metrics."""
+        await self.send_in_chunks(
+            channel, stats_summary() + "\n" + self.classifier.usage.cap_summary(channel.guild.id)
+        )
+
+    async def post_to_mod_channels(self, text):
+        """Sends a process-wide notice, such as a memory report, to every guild's mod channel."""
+        for channel in list(self.mod_channels.values()):
+            try:
+                await self.send_in_chunks(channel, text)
+            except Exception as e:
+                logger.error("Failed to post to #%s: %s", channel.name, e)
+
+    def evict_state(self):
+        """
+        Trims state that otherwise grows for the life of the process: the
+        oldest report cards and escalations, idle report sessions and
+        rebuildable caches. Returns {state: entries dropped}.
+        """
+        evicted = {
+            "mod_reports": trim_oldest(self.mod_reports, EVICT_KEEP_MOD_REPORTS),
+            "escalated_reports": trim_oldest(self.escalated_reports, EVICT_KEEP_ESCALATED_REPORTS),
+            "classifier_cache": self.classifier.clear_cache(),
+            "user_counters": len(self.counters),
+        }
+        self.counters.invalidate()  # Reloaded from the database on next use
+        moderation_cog = self.get_cog('Moderation')
+        if moderation_cog:
+            evicted["report_cards"] = moderation_cog.drop_stale_cards()
+        sessions = len(self.reports)
+        self.reports.expire_idle()
+        evicted["report_sessions"] = sessions - len(self.reports)
+        logger.warning("Evicted state over the memory budget: %s", evicted)
+        return evicted
+
+    async def send_in_chunks(self, channel, text, file=None):
+        """Posts text split by lines to fit Discord's message limit, attaching `file` to the last part."""
+        chunks = [""]
+        for line in text.splitlines():
+            if len(chunks[-1]) + len(line) + 1 > 1900:
+                chunks.append("")
+            chunks[-1] += line + "\n"
+        for chunk in chunks[:-1]:
+            await channel.send(chunk)
+        await channel.send(chunks[-1], file=file)
+
+    async def handle_profile_command(self, channel, args):
+        """
+        `.profile [seconds]` samples the event loop for a while and posts a
+        summary and the collapsed stacks; `.profile stop` ends a run early.
+        """
+        if args and args[0].lower() == "stop":
+            if self.profiler is None:
+                await channel.send("No profile is running.")
+            else:
+                self.profiler.stop()
+            return
+        if self.profiler is not None:
+            await channel.send("A profile is already running. Use `.profile stop` to end it.")
+            return
+        try:
+            seconds = float(args[0]) if args else DEFAULT_PROFILE_SECONDS
+        except ValueError:
+            await channel.send(f"Usage: `.profile [seconds]` (up to {MAX_PROFILE_SECONDS}) or `.profile stop`")
+            return
+        seconds = max(1.0, min(seconds, MAX_PROFILE_SECONDS))
+
+        await channel.send(f"Profiling the bot for {seconds:.0f} seconds...")
+        self.profiler = SamplingProfiler()
+        try:
+            profile = await self.profiler.run(seconds)
+        finally:
+            self.profiler = None
+        folded = discord.File(
+            io.BytesIO(profile.collapsed().encode('utf-8')),
+            filename=f"modbot-profile-{int(time.time())}.folded"
+        )
+        await self.send_in_chunks(
+            channel,
+            profile.summary() + "\nCollapsed stacks attached; open them in speedscope.app or flamegraph.pl.",
+            file=folded
+        )
 
     async def update_user_offense_count(self, user, mod_channel, original_message=None):
         """
@@ -447,164 +673,74 @@ class ModBot(commands.Bot):
             mod_channel: The moderation channel to send reports to
             original_message: The message that triggered the infraction (optional)
         """
-        print(f"Starting update_user_offense_count for {user.name}")
-        
-        # Record the infraction in the database if available
-        if self.db:
-            try:
-                print(f"Database available, attempting to record infraction for {user.name}")
-                
-                # Use the original message if provided, otherwise try to find it
-                message = original_message
-                if not message:
-                    async for msg in mod_channel.history(limit=100):
-                        if msg.author.id == user.id:
-                            message = msg
-                            break
-                
-                if message:
-                    print(f"Found message: {message.content}")
-                    result = await self.db.add_infraction(
-                        user_id=user.id,
-                        user_name=user.name,
-                        infraction_type="hate_speech",
-                        reason="Automated detection",
-                        message_content=message.content,
-                        channel_id=message.channel.id,
-                        message_id=message.id,
-                        guild_id=message.guild.id,
-                        detected_by="automod",
-                        confidence=1.0,  # High confidence for direct detection
-                        category="hate_speech"
+        try:
+            # Use the original message if provided, otherwise try to find it
+            message = original_message
+            if not message:
+                async for msg in mod_channel.history(limit=100):
+                    if msg.author.id == user.id:
+                        message = msg
+                        break
+            
+            if message:
+                # Record the infraction; the counter service writes it to the
+                # database (if available) and returns the updated counts
+                counts = await self.counters.record_infraction(
+                    user_id=user.id,
+                    guild_id=message.guild.id,
+                    infraction_type="hate_speech",
+                    user_name=user.name,
+                    reason="Automated detection",
+                    message_content=message.content,
+                    channel_id=message.channel.id,
+                    message_id=message.id,
+                    detected_by="automod",
+                    confidence=1.0,  # High confidence for direct detection
+                    category="hate_speech"
+                )
+                if counts is None:
+                    await mod_channel.send(
+                        f"**User Offense Tracking**: {user.name} (ID: {user.id})\n"
+                        "Infraction recorded, but their offense count could not be loaded."
                     )
-                    print(f"Database operation result: {result}")
-                    
-                    # Get the updated count from the database
-                    count = await self.db.get_user_infraction_count(user.id, message.guild.id)
-                    
-                    # Format offense count message based on number of offenses
-                    if count == 1:
-                        count_msg = "This is their first offense."
-                    elif count == 2:
-                        count_msg = "This is their second offense."
-                    elif count == 3:
-                        count_msg = "This is their third offense. Consider taking stronger action."
-                    else:
-                        count_msg = f"This user has {count} total offenses. Immediate action recommended!"
-                    
-                    # Send the offense count to the mod channel
-                    await mod_channel.send(f"**User Offense Tracking**: {user.name} (ID: {user.id})\n{count_msg}")
-                    
-                    # Recommend action based on offense count
-                    if count >= 3:
-                        await mod_channel.send("**Recommended Action**: Ban user for repeated hate speech violations.")
-                    elif count == 2:
-                        await mod_channel.send("**Recommended Action**: Issue a final warning to the user.")
+                    return
+                count = counts[OFFENSES]
+                
+                # Format offense count message based on number of offenses
+                if count == 1:
+                    count_msg = "This is their first offense."
+                elif count == 2:
+                    count_msg = "This is their second offense."
+                elif count == 3:
+                    count_msg = "This is their third offense. Consider taking stronger action."
                 else:
-                    print("Could not find the original message - skipping database recording")
-            except Exception as e:
-                print(f"Failed to record infraction in database: {str(e)}", exc_info=True)
-        else:
-            print("Database not initialized - skipping infraction recording")
+                    count_msg = f"This user has {count} total offenses. Immediate action recommended!"
+                
+                # Send the offense count to the mod channel
+                await mod_channel.send(f"**User Offense Tracking**: {user.name} (ID: {user.id})\n{count_msg}")
+                
+                # Recommend action based on offense count
+                if count >= 3:
+                    await mod_channel.send("**Recommended Action**: Ban user for repeated hate speech violations.")
+                elif count == 2:
+                    await mod_channel.send("**Recommended Action**: Issue a final warning to the user.")
+            else:
+                logger.warning("Could not find the original message - skipping infraction recording")
+        except Exception as e:
+            logger.error("Failed to record infraction: %s", e, exc_info=True)
 
-    async def call_llm_for_hate_speech(self, text, example=None):
+    async def call_llm_for_hate_speech(self, text, example=None, caller="automod"):
         """
         Calls an AI language model to evaluate text for hate speech.
         """
-        if not openai.api_key:
-            return {"error": "No OpenAI key found - can't check for hate speech", "hate_speech_detected": False}
-            
-        try:
-            # Call the OpenAI API
-            client = openai.OpenAI(api_key=openai.api_key)
-            response = client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    # Old prompt
-                    # {"role": "system", "content": "You're a content mod assistant. Analyze the text for hate speech. Respond in JSON with these fields: hate_speech_detected (boolean), confidence_score (number 0-1), category (string or null), explanation (string)."},
-                    # New prompt
-                    {"role": "system", "content": "You're a content mod assistant. Analyze the text for hate speech, specifically threats. Respond in JSON with these fields: hate_speech_detected (boolean), confidence_score (number 0-1), category (string or null), explanation (string)."},
-                    {"role": "user", "content": f"Check this text for hate speech (threats): '{text}'"}
-                ],
-                response_format={"type": "json_object"},
-                temperature=0.1,
-                max_tokens=300
-            )
-            result = response.choices[0].message.content
-            
-            # Try to parse the JSON response
-            try:
-                import json
-                return json.loads(result)
-            except:
-                # Simple error handling if parsing fails
-                print(f"Couldn't parse API response: {result}")
-                return {
-                    "hate_speech_detected": False,
-                    "confidence_score": 0,
-                    "explanation": "Error processing API response",
-                    "error": "Couldn't understand API response"
-                }
-                
-        except Exception as e:
-            print(f"API error: {e}")
-            return {
-                "error": f"API call failed: {str(e)}",
-                "hate_speech_detected": False
-            }
+        return await self.engine.call_llm_for_hate_speech(text, example, caller)
     
-    async def eval_text(self, message, example=None):
+    async def eval_text(self, message, example=None, caller="automod"):
         """
-        Evaluates text for hate speech using a two-step process:
-        1. First checks for slurs using regex
-        2. If no slurs found, checks with OpenAI API
+        Evaluates text for hate speech: regex slurs first, then the LLM
+        (see DetectionEngine.eval_text).
         """
-        detector = HateSpeechDetector()
-        
-        # Step 1: Check with regex first
-        regex_results = detector.detect_with_regex_slurs(message)
-        
-        # Convert regex results to dictionary
-        regex_dict = {
-            "method": regex_results.method.value,
-            "is_hate_speech": regex_results.is_hate_speech,
-            "confidence": regex_results.confidence,
-            "category": regex_results.category,
-            "explanation": regex_results.explanation,
-            "detected_terms": regex_results.detected_terms
-        }
-        
-        # If regex found slurs, return those results immediately
-        if regex_results.is_hate_speech:
-            return {
-                "is_hate_speech": True,
-                "confidence": 1.0,  # High confidence for direct slur matches
-                "categories": [regex_results.category] if regex_results.category else ["N/A"],
-                "explanations": [regex_results.explanation] if regex_results.explanation else ["No explanation provided"],
-                "method_results": [regex_dict]
-            }
-            
-        # Step 2: If no slurs found, check with OpenAI API
-        openai_results = await detector.detect_with_openai_api(message)
-        
-        # Convert OpenAI results to dictionary
-        openai_dict = {
-            "method": openai_results.method.value,
-            "is_hate_speech": openai_results.is_hate_speech,
-            "confidence": openai_results.confidence,
-            "category": openai_results.category,
-            "explanation": openai_results.explanation,
-            "detected_terms": openai_results.detected_terms
-        }
-        
-        # Combine results
-        return {
-            "is_hate_speech": openai_results.is_hate_speech,
-            "confidence": openai_results.confidence,
-            "categories": [openai_results.category] if openai_results.category else ["N/A"],
-            "explanations": [openai_results.explanation] if openai_results.explanation else ["No explanation provided"],
-            "method_results": [regex_dict, openai_dict]
-        }
+        return await self.engine.eval_text(message, example, caller)
 
     def code_format(self, analysis):
         """
@@ -655,6 +791,24 @@ class ModBot(commands.Bot):
         return formatted
 
 
-# Initialize and run the bot
-client = ModBot()
-client.run(discord_token)
\ No newline at end of file
+def load_discord_token():
+    """Reads the Discord token from tokens.json, explaining what to do if it is missing."""
+    try:
+        return load_tokens(required=True)['discord']
+    except FileNotFoundError:
+        print(f"Error: {TOKENS_PATH} not found!")
+        print(f"Current working directory: {os.getcwd()}")
+        print("Make sure to create a tokens.json file with your Discord token.")
+        print("Format should be: { \"discord\": \"your_token_here\", \"openai\": \"your_openai_key_here\" }")
+        raise
+
+
+if __name__ == "__main__":
+    # Set up logging to the console and discord.log (see log_config.py). Only
+    # here, so tools that import this module do not truncate the bot's log
+    configure_logging()
+    discord_token = load_discord_token()
+    # Initialize and run the bot
+    client = ModBot()
+    # Logging is configured above; stop discord.py installing its own handler
+    client.run(discord_token, log_handler=None)
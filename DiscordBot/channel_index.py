@@ -0,0 +1,88 @@
+# channel_index.py
+import discord
+
+# Channel roles, derived from the channel names for the bot's group number
+MONITORED = "monitored"  # group-N: messages are scanned by automod
+MOD = "mod"  # group-N-mod: reports are posted and moderators reply here
+ESCALATION = "escalation"  # group-N-escalation: escalated reports go here
+ROLES = (MONITORED, MOD, ESCALATION)
+
+
+class ChannelIndex:
+    """
+    Index of the channels the bot cares about, by channel ID and by guild.
+
+    Built once from the guild cache when the bot is ready and kept current from
+    the gateway's channel create/update/delete and guild join/remove events, so
+    routing a message is a dict lookup instead of a name comparison or a scan
+    of every channel.
+    """
+    def __init__(self):
+        self.group_num = None
+        self.roles = {}  # Map from channel ID to its role
+        self.channels = {role: {} for role in ROLES}  # Map from role to {guild ID: channel}
+
+    def role_for_name(self, name):
+        if self.group_num is None:
+            return None
+        prefix = f'group-{self.group_num}'
+        if name == prefix:
+            return MONITORED
+        if name == f'{prefix}-mod':
+            return MOD
+        if name == f'{prefix}-escalation':
+            return ESCALATION
+        return None
+
+    def build(self, guilds, group_num):
+        """Indexes every text channel of every guild for the given group number."""
+        self.group_num = group_num
+        self.roles.clear()
+        for channels in self.channels.values():
+            channels.clear()
+        for guild in guilds:
+            self.add_guild(guild)
+
+    def add_guild(self, guild):
+        for channel in guild.text_channels:
+            self.add(channel)
+
+    def remove_guild(self, guild):
+        for channel_id in [c.id for c in guild.text_channels]:
+            self.roles.pop(channel_id, None)
+        for channels in self.channels.values():
+            channels.pop(guild.id, None)
+
+    def add(self, channel):
+        if not isinstance(channel, discord.TextChannel):
+            return
+        role = self.role_for_name(channel.name)
+        if role:
+            self.roles[channel.id] = role
+            self.channels[role][channel.guild.id] = channel
+
+    def remove(self, channel):
+        role = self.roles.pop(channel.id, None)
+        if not role:
+            return
+        guild_channels = self.channels[role]
+        current = guild_channels.get(channel.guild.id)
+        if current and current.id == channel.id:
+            del guild_channels[channel.guild.id]
+            # Fall back to another channel with the same name, if the guild has one
+            for other in channel.guild.text_channels:
+                if other.id != channel.id and self.roles.get(other.id) == role:
+                    guild_channels[channel.guild.id] = other
+                    break
+
+    def update(self, before, after):
+        self.remove(before)
+        self.add(after)
+
+    def role(self, channel_id):
+        """Returns the role of a channel, or None if the bot does not use it."""
+        return self.roles.get(channel_id)
+
+    def channel(self, guild_id, role):
+        """Returns the guild's channel with the given role, or None."""
+        return self.channels[role].get(guild_id)
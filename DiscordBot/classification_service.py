@@ -0,0 +1,210 @@
+# classification_service.py
+import asyncio
+import json
+import time
+from collections import OrderedDict, deque
+
+from metrics import CLASSIFIER_REQUESTS
+from usage import UsageMeter, SpendCapReached
+from tracing import span
+
+
+class RateLimiter:
+    """
+    Spaces out calls so no more than `requests_per_minute` start in any minute.
+    A limit of None disables limiting.
+    """
+    def __init__(self, requests_per_minute=None):
+        self.interval = 60.0 / requests_per_minute if requests_per_minute else 0.0
+        self._next_slot = 0.0
+
+    async def acquire(self):
+        if not self.interval:
+            return
+        now = time.monotonic()
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+class LatencyStats:
+    """Call count, error count and latency percentiles for one caller."""
+    def __init__(self, window=500):
+        self.calls = 0
+        self.errors = 0
+        self.cache_hits = 0
+        self.total_seconds = 0.0
+        self.recent = deque(maxlen=window)
+
+    def record(self, seconds, error=False):
+        self.calls += 1
+        self.errors += int(error)
+        self.total_seconds += seconds
+        self.recent.append(seconds)
+
+    def summary(self):
+        ordered = sorted(self.recent)
+
+        def percentile(p):
+            return ordered[min(len(ordered) - 1, int(p * len(ordered)))] if ordered else 0.0
+
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "cache_hits": self.cache_hits,
+            "avg_ms": 1000 * self.total_seconds / self.calls if self.calls else 0.0,
+            "p50_ms": 1000 * percentile(0.50),
+            "p95_ms": 1000 * percentile(0.95),
+            "max_ms": 1000 * (ordered[-1] if ordered else 0.0),
+        }
+
+
+class ClassificationService:
+    """
+    Process-wide gateway to the OpenAI chat API used by automod, the report
+    flow and the evaluation harness.
+
+    One instance is shared by every caller so they use the same HTTP connection
+    pool, concurrency and rate limits, and response cache. Latency is tracked
+    separately per caller (e.g. "automod", "report", "evaluation").
+
+    `base_url` points the client at another OpenAI-compatible server (such as
+    stub_server.py), and `cassette` records or replays every call (replay.py).
+    `usage` meters tokens and cost and applies per-guild spend caps (usage.py).
+    """
+    def __init__(self, api_key=None, max_concurrency=8, requests_per_minute=None, cache_size=1024,
+                 base_url=None, cassette=None, usage=None):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.cassette = cassette
+        self.usage = usage or UsageMeter()
+        self._client = None
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.rate_limiter = RateLimiter(requests_per_minute)
+        self.cache_size = cache_size
+        self._cache = OrderedDict()  # Map from request key to response, most recent last
+        self._stats = {}  # Map from caller to LatencyStats
+        self.waiting = 0  # Requests queued for a concurrency or rate limit slot
+        self.in_flight = 0  # Requests currently waiting on the API
+
+    @property
+    def available(self):
+        """Whether chat calls can be served: with an API key, or from a replay cassette."""
+        return bool(self.api_key) or bool(self.cassette and self.cassette.offline)
+
+    @property
+    def client(self):
+        """The shared async OpenAI client, created on first use."""
+        if self._client is None:
+            # Imported here: the openai package is slow to import and not needed until the first call
+            import openai
+            self._client = openai.AsyncOpenAI(api_key=self.api_key, base_url=self.base_url)
+        return self._client
+
+    async def chat(self, messages, caller="unknown", model="gpt-3.5-turbo", use_cache=True, method="unknown",
+                   **params):
+        """
+        Sends a chat completion request through the shared client.
+
+        Args:
+            messages: Chat messages in OpenAI format
+            caller: Name of the calling flow, used for latency stats and usage
+            model: OpenAI model name, possibly downgraded by the guild's spend cap
+            use_cache: Whether identical requests may be served from the cache
+            method: Name of the detection method, used for usage accounting
+            **params: Extra arguments for chat.completions.create
+
+        Returns:
+            The OpenAI chat completion response
+
+        Raises:
+            SpendCapReached: The current guild has used up its daily spend cap
+        """
+        with span("openai.chat", caller=caller, method=method, model=model) as traced:
+            stats = self._stats.setdefault(caller, LatencyStats())
+            key = json.dumps([model, messages, params], sort_keys=True, default=str)
+
+            if use_cache and key in self._cache:
+                self._cache.move_to_end(key)
+                stats.cache_hits += 1
+                CLASSIFIER_REQUESTS.inc(caller=caller, result="cache_hit")
+                if traced:
+                    traced.set(cache_hit=True)
+                return self._cache[key]
+
+            try:
+                chosen = self.usage.choose_model(model)
+            except SpendCapReached:
+                CLASSIFIER_REQUESTS.inc(caller=caller, result="capped")
+                raise
+            if chosen != model:
+                model = chosen
+                key = json.dumps([model, messages, params], sort_keys=True, default=str)
+
+            self.waiting += 1
+            queued = True
+            queued_at = time.perf_counter()
+            try:
+                async with self._semaphore:
+                    await self.rate_limiter.acquire()
+                    self.waiting -= 1
+                    queued = False
+                    self.in_flight += 1
+                    start = time.perf_counter()
+                    if traced:
+                        traced.set(queued_ms=round((start - queued_at) * 1000, 1))
+                    try:
+                        response = await self._create(model, messages, params)
+                    except Exception:
+                        stats.record(time.perf_counter() - start, error=True)
+                        CLASSIFIER_REQUESTS.inc(caller=caller, result="error")
+                        raise
+                    finally:
+                        self.in_flight -= 1
+                    stats.record(time.perf_counter() - start)
+                    CLASSIFIER_REQUESTS.inc(caller=caller, result="ok")
+                    if not (self.cassette and self.cassette.offline):  # Replayed responses cost nothing
+                        self.usage.record(model, getattr(response, 'usage', None), caller, method)
+            finally:
+                if queued:
+                    self.waiting -= 1
+
+            if traced:
+                usage = getattr(response, 'usage', None)
+                traced.set(
+                    model=model,
+                    response_id=getattr(response, 'id', None),
+                    prompt_tokens=getattr(usage, 'prompt_tokens', None),
+                    completion_tokens=getattr(usage, 'completion_tokens', None)
+                )
+            if use_cache and self.cache_size:
+                self._cache[key] = response
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+            return response
+
+    async def _create(self, model, messages, params):
+        async def send():
+            return await self.client.chat.completions.create(model=model, messages=messages, **params)
+
+        if self.cassette is None:
+            return await send()
+        from openai.types.chat import ChatCompletion
+        return await self.cassette.call(
+            "openai",
+            {"model": model, "messages": messages, **params},
+            send,
+            serialize=lambda response: response.model_dump(mode="json"),
+            deserialize=ChatCompletion.model_validate
+        )
+
+    def clear_cache(self):
+        """Empties the response cache. Returns the number of responses dropped."""
+        dropped = len(self._cache)
+        self._cache.clear()
+        return dropped
+
+    def latency_stats(self):
+        """Returns {caller: summary dict} for every caller seen so far."""
+        return {caller: stats.summary() for caller, stats in self._stats.items()}
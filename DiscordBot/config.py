@@ -0,0 +1,24 @@
+# config.py
+import json
+import os
+
+TOKENS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tokens.json')
+
+_tokens = {}  # Map from tokens.json path to its parsed contents
+
+
+def load_tokens(path=TOKENS_PATH, required=False):
+    """
+    Returns the parsed tokens.json, reading the file only once per process.
+
+    A missing file gives an empty dict, or FileNotFoundError when `required`.
+    The returned dict is shared; callers must not modify it.
+    """
+    if path not in _tokens:
+        if not os.path.isfile(path):
+            if required:
+                raise FileNotFoundError(f"{path} not found!")
+            return {}
+        with open(path) as f:
+            _tokens[path] = json.load(f)
+    return _tokens[path]
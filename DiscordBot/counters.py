@@ -0,0 +1,145 @@
+# counters.py
+import asyncio
+import logging
+
+logger = logging.getLogger('modbot.counters')
+
+# Counter kinds served to the moderation flow
+OFFENSES = "offenses"
+SUSPENSIONS = "suspensions"
+FALSE_REPORTS = "false_reports"
+WARNINGS = "warnings"
+KINDS = (OFFENSES, SUSPENSIONS, FALSE_REPORTS, WARNINGS)
+
+# Infraction types that are not counted as offenses. A moderator warning is
+# usually issued for a message that already has its own offense row (e.g. an
+# automod hit), so it is counted separately rather than as a second offense
+INFRACTION_TYPE_KINDS = {
+    "suspension": SUSPENSIONS,
+    "false_report": FALSE_REPORTS,
+    "warning": WARNINGS,
+}
+
+
+def kind_for_infraction_type(infraction_type):
+    """Maps an infraction type stored in the database to a counter kind."""
+    return INFRACTION_TYPE_KINDS.get(infraction_type, OFFENSES)
+
+
+class CounterError(Exception):
+    """Raised when the database could not load a user's counters or store an infraction."""
+
+
+class UserCounters:
+    """
+    Warm cache of per-user offense, suspension, false-report and warning counts.
+
+    Counts for a (guild, user) pair are loaded from the database the first time
+    they are needed and are then kept current by routing every infraction write
+    through `record_infraction`, so reads never hit the database again.
+    Works purely in memory when no database is configured.
+    """
+    def __init__(self, db=None):
+        self.db = db
+        self._cache = {}  # Map from (guild_id, user_id) to {kind: count}
+        self._loading = {}  # Map from (guild_id, user_id) to the in-flight load
+
+    async def get(self, user_id, guild_id):
+        """
+        Returns all counters for a user in a guild.
+
+        Returns:
+            dict: {OFFENSES: int, SUSPENSIONS: int, FALSE_REPORTS: int, WARNINGS: int}
+
+        Raises:
+            CounterError: The counts could not be loaded from the database
+        """
+        return dict(await self._ensure_loaded(user_id, guild_id))
+
+    async def get_count(self, user_id, guild_id, kind=OFFENSES):
+        """Returns a single counter for a user in a guild. Raises CounterError like `get`."""
+        if user_id is None:
+            return 0
+        counts = await self._ensure_loaded(user_id, guild_id)
+        return counts[kind]
+
+    async def record_infraction(self, user_id, guild_id, infraction_type, **fields):
+        """
+        Writes an infraction to the database and updates the cached counters.
+
+        Args:
+            user_id: Discord user ID
+            guild_id: Discord guild ID
+            infraction_type: Type of infraction (e.g. "hate_speech", "warning",
+                "suspension", "false_report")
+            **fields: Remaining columns passed to InfractionDatabase.add_infraction
+
+        Returns:
+            dict: The user's counters after this infraction, or None when they
+            could not be loaded (the infraction is still written)
+
+        Raises:
+            CounterError: The infraction could not be written to the database
+        """
+        # Load before writing so the lazy load can never double count this row
+        try:
+            counts = await self._ensure_loaded(user_id, guild_id)
+        except CounterError:
+            counts = None  # Nothing cached, so the next successful load includes this row
+
+        if self.db:
+            row = await self.db.add_infraction(
+                user_id=user_id,
+                guild_id=guild_id,
+                infraction_type=infraction_type,
+                **fields
+            )
+            if row is None:
+                raise CounterError(f"{infraction_type} was not saved to the database")
+
+        if counts is None:
+            return None
+        counts[kind_for_infraction_type(infraction_type)] += 1
+        return dict(counts)
+
+    def invalidate(self, user_id=None, guild_id=None):
+        """
+        Drops cached counters so they are reloaded on next use.
+        With no arguments the whole cache is cleared.
+        """
+        if user_id is None and guild_id is None:
+            self._cache.clear()
+            return
+        for key in list(self._cache):
+            if (guild_id is None or key[0] == guild_id) and (user_id is None or key[1] == user_id):
+                del self._cache[key]
+
+    def __len__(self):
+        return len(self._cache)
+
+    async def _ensure_loaded(self, user_id, guild_id):
+        key = (guild_id, user_id)
+        counts = self._cache.get(key)
+        if counts is not None:
+            return counts
+
+        # Share one database round trip between concurrent first reads
+        task = self._loading.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._load(user_id, guild_id))
+            self._loading[key] = task
+            task.add_done_callback(lambda _: self._loading.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _load(self, user_id, guild_id):
+        key = (guild_id, user_id)
+        by_type = await self.db.get_user_infraction_counts(user_id, guild_id) if self.db else {}
+        if by_type is None:
+            # Failed lookups are not cached so the next read retries the database
+            logger.error("Could not load infraction counts for user %s in guild %s", user_id, guild_id)
+            raise CounterError("infraction counts could not be loaded from the database")
+
+        counts = dict.fromkeys(KINDS, 0)
+        for infraction_type, count in by_type.items():
+            counts[kind_for_infraction_type(infraction_type)] += count
+        return self._cache.setdefault(key, counts)
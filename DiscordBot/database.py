@@ -1,22 +1,21 @@
 import os
-from supabase import create_client, Client
 from datetime import datetime
 import json
 import logging
+from config import load_tokens, TOKENS_PATH
+from metrics import DB_SECONDS, DB_ERRORS
+from tracing import span
 
-# Set up logging
-logging.basicConfig(level=logging.DEBUG)
+# Handlers and levels are configured once by log_config.configure_logging
 logger = logging.getLogger(__name__)
 
 class InfractionDatabase:
     def __init__(self):
         # Load configuration from tokens.json
-        token_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tokens.json')
-        if not os.path.isfile(token_path):
-            raise ValueError(f"Error: {token_path} not found!")
-            
-        with open(token_path) as f:
-            tokens = json.load(f)
+        try:
+            tokens = load_tokens(required=True)
+        except FileNotFoundError:
+            raise ValueError(f"Error: {TOKENS_PATH} not found!")
             
         # Get Supabase credentials
         url = tokens.get('supabase_url')
@@ -25,9 +24,20 @@ class InfractionDatabase:
         if not url or not key:
             raise ValueError("SUPABASE_URL and SUPABASE_KEY must be set in tokens.json")
             
-        logger.info(f"Initializing Supabase connection to {url}")
-        self.supabase: Client = create_client(url, key)
+        logger.info("Initializing Supabase connection to %s", url)
+        # Imported here so modules that only reference the database stay fast to import
+        from supabase import create_client
+        self.supabase = create_client(url, key)
         logger.info("Supabase connection initialized successfully")
+
+    def _execute(self, operation, query):
+        """Runs a query builder, recording its round trip time and any failure by operation."""
+        with DB_SECONDS.time(operation=operation), span(f"db.{operation}"):
+            try:
+                return query.execute()
+            except Exception:
+                DB_ERRORS.inc(operation=operation)
+                raise
         
     async def add_infraction(self, user_id: int, user_name: str, infraction_type: str, 
                            reason: str, message_content: str, channel_id: int, 
@@ -50,7 +60,6 @@ class InfractionDatabase:
             category: Category of the infraction if applicable (optional)
         """
         try:
-            logger.debug(f"Attempting to add infraction for user {user_name} (ID: {user_id})")
             data = {
                 "user_id": user_id,
                 "user_name": user_name,
@@ -66,104 +75,187 @@ class InfractionDatabase:
                 "category": category
             }
             
-            logger.debug(f"Inserting data: {json.dumps(data, indent=2)}")
-            result = self.supabase.table("infractions").insert(data).execute()
-            logger.info(f"Successfully added infraction. Result: {json.dumps(result.data, indent=2)}")
-            return result.data[0] if result.data else None
+            result = self._execute("add_infraction", self.supabase.table("infractions").insert(data))
+            row = result.data[0] if result.data else None
+            logger.debug("Added infraction", extra={
+                "infraction_id": row.get("id") if row else None,
+                "user_id": user_id,
+                "guild_id": guild_id,
+                "infraction_type": infraction_type,
+            })
+            return row
             
         except Exception as e:
-            logger.error(f"Error adding infraction to database: {str(e)}", exc_info=True)
+            logger.error("Error adding infraction to database: %s", e, exc_info=True)
             return None
             
-    async def get_user_infractions(self, user_id: int, guild_id: int = None):
+    async def get_user_infractions(self, user_id: int, guild_id: int = None, columns: str = "*"):
         """
         Get all infractions for a specific user.
         
+        Loads the whole history into memory; prefer `iter_user_infractions`
+        for users with long histories.
+        
         Args:
             user_id: Discord user ID
             guild_id: Optional guild ID to filter by specific server
+            columns: Comma-separated columns to fetch
             
         Returns:
-            List of infractions
+            List of infractions, newest first, or an empty list on error
         """
         try:
-            query = self.supabase.table("infractions").select("*").eq("user_id", user_id)
-            
-            if guild_id:
-                query = query.eq("guild_id", guild_id)
-                
-            result = query.execute()
-            return result.data
-            
-        except Exception as e:
-            print(f"Error fetching user infractions: {str(e)}")
+            return [row async for row in self.iter_user_infractions(user_id, guild_id, columns=columns)]
+        except Exception:
             return []
             
-    async def get_recent_infractions(self, guild_id: int, limit: int = 10):
+    async def get_recent_infractions(self, guild_id: int, limit: int = 10, columns: str = "*"):
         """
         Get recent infractions for a specific guild.
         
         Args:
             guild_id: Discord guild ID
             limit: Maximum number of infractions to return
+            columns: Comma-separated columns to fetch
             
         Returns:
             List of recent infractions
         """
         try:
-            result = (self.supabase.table("infractions")
-                     .select("*")
+            result = self._execute("get_recent_infractions", self.supabase.table("infractions")
+                     .select(columns)
                      .eq("guild_id", guild_id)
                      .order("timestamp", desc=True)
-                     .limit(limit)
-                     .execute())
+                     .order("id", desc=True)
+                     .limit(limit))
             return result.data
             
         except Exception as e:
-            print(f"Error fetching recent infractions: {str(e)}")
+            logger.error("Error fetching recent infractions: %s", e)
             return []
             
-    async def get_infraction_stats(self, guild_id: int):
+    async def iter_user_infractions(self, user_id: int, guild_id: int = None,
+                                    columns: str = "*", page_size: int = 100,
+                                    since: str = None):
+        """
+        Stream a user's infractions, newest first, one page at a time.
+        
+        Args:
+            user_id: Discord user ID
+            guild_id: Optional guild ID to filter by specific server
+            columns: Comma-separated columns to fetch
+            page_size: Number of rows fetched per round trip
+            since: Optional ISO timestamp; older infractions are not returned
+            
+        Yields:
+            Infraction rows as dictionaries
+            
+        Raises:
+            Exception: A page could not be fetched; rows already yielded are not a complete history
+        """
+        filters = {"user_id": user_id}
+        if guild_id:
+            filters["guild_id"] = guild_id
+        async for row in self._iter_infractions(filters, columns, page_size, since):
+            yield row
+            
+    async def iter_guild_infractions(self, guild_id: int, columns: str = "*",
+                                     page_size: int = 100, since: str = None):
+        """
+        Stream a guild's infractions, newest first, one page at a time.
+        
+        Args:
+            guild_id: Discord guild ID
+            columns: Comma-separated columns to fetch
+            page_size: Number of rows fetched per round trip
+            since: Optional ISO timestamp; older infractions are not returned
+            
+        Yields:
+            Infraction rows as dictionaries
+            
+        Raises:
+            Exception: A page could not be fetched (see `iter_user_infractions`)
+        """
+        async for row in self._iter_infractions({"guild_id": guild_id}, columns, page_size, since):
+            yield row
+            
+    async def _iter_infractions(self, filters: dict, columns: str, page_size: int, since: str = None):
+        """
+        Keyset pagination over infractions ordered by (timestamp, id) descending.
+        Each page continues strictly after the last row of the previous one, so
+        every round trip costs the same no matter how deep into the history it is.
+        """
+        # The cursor columns must always be fetched
+        if columns != "*":
+            selected = [c.strip() for c in columns.split(",")]
+            for key in ("id", "timestamp"):
+                if key not in selected:
+                    selected.append(key)
+            columns = ",".join(selected)
+        
+        cursor = None
+        while True:
+            try:
+                query = self.supabase.table("infractions").select(columns)
+                for column, value in filters.items():
+                    query = query.eq(column, value)
+                if since:
+                    query = query.gte("timestamp", since)
+                if cursor:
+                    last_ts, last_id = cursor
+                    query = query.or_(f'timestamp.lt."{last_ts}",'
+                                      f'and(timestamp.eq."{last_ts}",id.lt.{last_id})')
+                result = self._execute("infraction_page", query.order("timestamp", desc=True)
+                         .order("id", desc=True)
+                         .limit(page_size))
+            except Exception as e:
+                # Stopping here would pass a truncated history off as complete
+                logger.error("Error fetching infraction page: %s", e)
+                raise
+            
+            rows = result.data or []
+            for row in rows:
+                yield row
+            
+            if len(rows) < page_size:
+                return
+            cursor = (rows[-1]["timestamp"], rows[-1]["id"])
+            
+    async def get_infraction_stats(self, guild_id: int, days: int = 30):
         """
         Get statistics about infractions in a guild.
         
+        Counts come from the `get_infraction_stats` RPC, which reads rollup
+        tables maintained by triggers (see sql/infraction_stats.sql), so the
+        cost does not grow with the guild's infraction history.
+        
         Args:
             guild_id: Discord guild ID
+            days: Number of most recent days to include in the daily breakdown
             
         Returns:
-            Dictionary containing infraction statistics
+            Dictionary containing the total count and counts per infraction
+            type, detection method and day
         """
         try:
-            # Get total infractions
-            total_result = (self.supabase.table("infractions")
-                          .select("*", count="exact")
-                          .eq("guild_id", guild_id)
-                          .execute())
-            
-            # Get infractions by type
-            type_result = (self.supabase.table("infractions")
-                         .select("infraction_type", count="exact")
-                         .eq("guild_id", guild_id)
-                         .execute())
-            
-            # Get infractions by detection method
-            detection_result = (self.supabase.table("infractions")
-                              .select("detected_by", count="exact")
-                              .eq("guild_id", guild_id)
-                              .execute())
+            result = self._execute("get_infraction_stats", self.supabase.rpc(
+                "get_infraction_stats", {"p_guild_id": guild_id, "p_days": days}))
+            stats = result.data or {}
             
             return {
-                "total_infractions": total_result.count,
-                "by_type": type_result.data,
-                "by_detection": detection_result.data
+                "total_infractions": stats.get("total_infractions", 0),
+                "by_type": stats.get("by_type") or {},
+                "by_detection": stats.get("by_detection") or {},
+                "by_day": stats.get("by_day") or {}
             }
             
         except Exception as e:
-            print(f"Error fetching infraction stats: {str(e)}")
+            logger.error("Error fetching infraction stats: %s", e)
             return {
                 "total_infractions": 0,
-                "by_type": [],
-                "by_detection": []
+                "by_type": {},
+                "by_detection": {},
+                "by_day": {}
             }
             
     async def get_user_infraction_count(self, user_id: int, guild_id: int) -> int:
@@ -178,12 +270,31 @@ class InfractionDatabase:
             Number of infractions
         """
         try:
-            result = (self.supabase.table("infractions")
+            result = self._execute("get_user_infraction_count", self.supabase.table("infractions")
                      .select("*", count="exact")
                      .eq("user_id", user_id)
-                     .eq("guild_id", guild_id)
-                     .execute())
+                     .eq("guild_id", guild_id))
             return result.count if result.count is not None else 0
         except Exception as e:
-            print(f"Error getting user infraction count: {str(e)}")
-            return 0 
\ No newline at end of file
+            logger.error("Error getting user infraction count: %s", e)
+            return 0
+            
+    async def get_user_infraction_counts(self, user_id: int, guild_id: int) -> dict:
+        """
+        Get a user's infraction counts in a guild, grouped by infraction type.
+        
+        Args:
+            user_id: Discord user ID
+            guild_id: Discord guild ID
+            
+        Returns:
+            Dictionary mapping infraction type to number of infractions,
+            or None if the lookup failed
+        """
+        try:
+            result = self._execute("get_user_infraction_counts", self.supabase.rpc(
+                "get_user_infraction_counts", {"p_user_id": user_id, "p_guild_id": guild_id}))
+            return result.data or {}
+        except Exception as e:
+            logger.error("Error getting user infraction counts: %s", e)
+            return None
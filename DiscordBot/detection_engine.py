@@ -0,0 +1,190 @@
+# detection_engine.py
+import json
+import logging
+import os
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from classification_service import ClassificationService
+from hate_speech_detector import HateSpeechDetector, DEFAULT_PERSPECTIVE_API_URL
+from config import load_tokens, TOKENS_PATH
+from metrics import STAGE_SECONDS
+from replay import Cassette, CassetteMiss
+from usage import UsageMeter, USAGE_LOG_PATH
+from tracing import span
+
+logger = logging.getLogger('modbot.engine')
+
+@dataclass
+class DetectionConfig:
+    """Everything the detection pipeline needs, with no Discord or database settings."""
+    openai_api_key: Optional[str] = None
+    perspective_api_key: Optional[str] = None
+    openai_base_url: Optional[str] = None  # Another OpenAI-compatible server, e.g. stub_server.py
+    perspective_api_url: str = DEFAULT_PERSPECTIVE_API_URL
+    cassette: Optional[Cassette] = None  # Records or replays API calls, see replay.py
+    max_concurrency: int = 8
+    requests_per_minute: Optional[int] = None
+    cache_size: int = 1024
+    usage_log: Optional[str] = None  # JSONL file token usage and cost are flushed to, see usage.py
+    guild_spend_caps: Optional[Dict[int, float]] = None  # Daily LLM spend cap in USD per guild ID
+
+    @classmethod
+    def from_env(cls, tokens_path=TOKENS_PATH, **overrides):
+        """
+        Builds a config from tokens.json (if present) and the OPENAI_BASE_URL,
+        PERSPECTIVE_API_URL, MODBOT_CASSETTE, MODBOT_USAGE_LOG and
+        MODBOT_GUILD_SPEND_CAPS (JSON, e.g. '{"123": 5.0}') environment
+        variables. Spend caps may also come from a "guild_spend_caps" field in
+        tokens.json. Keyword arguments override any field.
+        """
+        tokens = load_tokens(tokens_path) if tokens_path else {}
+        caps = os.environ.get("MODBOT_GUILD_SPEND_CAPS")
+        settings = {
+            "openai_api_key": tokens.get("openai"),
+            "perspective_api_key": tokens.get("perspective_api_key"),
+            "openai_base_url": os.environ.get("OPENAI_BASE_URL"),
+            "perspective_api_url": os.environ.get("PERSPECTIVE_API_URL", DEFAULT_PERSPECTIVE_API_URL),
+            "cassette": Cassette.from_env(),
+            "usage_log": os.environ.get("MODBOT_USAGE_LOG", USAGE_LOG_PATH),
+            "guild_spend_caps": json.loads(caps) if caps else tokens.get("guild_spend_caps"),
+        }
+        settings.update(overrides)
+        return cls(**settings)
+
+
+class DetectionEngine:
+    """
+    The hate speech detection pipeline (regex slurs, then the LLM) without
+    the Discord client.
+
+    The bot, the evaluation harness and benchmarks all build one of these from
+    a DetectionConfig. Importing this module loads neither discord.py nor
+    supabase, and constructing an engine makes no network calls.
+    """
+    def __init__(self, config: Optional[DetectionConfig] = None):
+        self.config = config or DetectionConfig()
+        # One classification service shared by every caller of the engine
+        self.classifier = ClassificationService(
+            api_key=self.config.openai_api_key,
+            max_concurrency=self.config.max_concurrency,
+            requests_per_minute=self.config.requests_per_minute,
+            cache_size=self.config.cache_size,
+            base_url=self.config.openai_base_url,
+            cassette=self.config.cassette,
+            usage=UsageMeter(self.config.usage_log, self.config.guild_spend_caps)
+        )
+        self.detector = HateSpeechDetector(
+            classifier=self.classifier,
+            perspective_api_key=self.config.perspective_api_key,
+            perspective_api_url=self.config.perspective_api_url
+        )
+
+    async def call_llm_for_hate_speech(self, text, example=None, caller="automod"):
+        """
+        Calls an AI language model to evaluate text for hate speech.
+        """
+        if not self.classifier.available:
+            return {"error": "No OpenAI key found - can't check for hate speech", "hate_speech_detected": False}
+
+        try:
+            # Call the OpenAI API
+            response = await self.classifier.chat(
+                caller=caller,
+                method="call_llm_for_hate_speech",
+                model="gpt-3.5-turbo",
+                messages=[
+                    # Old prompt
+                    # {"role": "system", "content": "You're a content mod assistant. Analyze the text for hate speech. Respond in JSON with these fields: hate_speech_detected (boolean), confidence_score (number 0-1), category (string or null), explanation (string)."},
+                    # New prompt
+                    {"role": "system", "content": "You're a content mod assistant. Analyze the text for hate speech, specifically threats. Respond in JSON with these fields: hate_speech_detected (boolean), confidence_score (number 0-1), category (string or null), explanation (string)."},
+                    {"role": "user", "content": f"Check this text for hate speech (threats): '{text}'"}
+                ],
+                response_format={"type": "json_object"},
+                temperature=0.1,
+                max_tokens=300
+            )
+            result = response.choices[0].message.content
+
+            # Try to parse the JSON response
+            try:
+                return json.loads(result)
+            except:
+                # Simple error handling if parsing fails
+                logger.warning("Couldn't parse API response: %s", result)
+                return {
+                    "hate_speech_detected": False,
+                    "confidence_score": 0,
+                    "explanation": "Error processing API response",
+                    "error": "Couldn't understand API response"
+                }
+
+        except CassetteMiss:
+            raise  # An unrecorded request in replay must not be scored as clean
+        except Exception as e:
+            logger.error("API error: %s", e)
+            return {
+                "error": f"API call failed: {str(e)}",
+                "hate_speech_detected": False
+            }
+
+    async def eval_text(self, message, example=None, caller="automod"):
+        """
+        Evaluates text for hate speech using a two-step process:
+        1. First checks for slurs using regex
+        2. If no slurs found, checks with OpenAI API
+        """
+        with STAGE_SECONDS.time(stage="eval_text"), span("eval_text", caller=caller, length=len(message)) as traced:
+            scores = await self._eval_text(message, caller)
+            if traced:
+                traced.set(is_hate_speech=scores["is_hate_speech"], confidence=scores["confidence"],
+                           tiers=len(scores["method_results"]))
+            return scores
+
+    async def _eval_text(self, message, caller):
+        detector = self.detector
+
+        # Step 1: Check with regex first
+        regex_results = detector.detect_with_regex_slurs(message)
+
+        # Convert regex results to dictionary
+        regex_dict = {
+            "method": regex_results.method.value,
+            "is_hate_speech": regex_results.is_hate_speech,
+            "confidence": regex_results.confidence,
+            "category": regex_results.category,
+            "explanation": regex_results.explanation,
+            "detected_terms": regex_results.detected_terms
+        }
+
+        # If regex found slurs, return those results immediately
+        if regex_results.is_hate_speech:
+            return {
+                "is_hate_speech": True,
+                "confidence": 1.0,  # High confidence for direct slur matches
+                "categories": [regex_results.category] if regex_results.category else ["N/A"],
+                "explanations": [regex_results.explanation] if regex_results.explanation else ["No explanation provided"],
+                "method_results": [regex_dict]
+            }
+
+        # Step 2: If no slurs found, check with OpenAI API
+        openai_results = await detector.detect_with_openai_api(message, caller=caller)
+
+        # Convert OpenAI results to dictionary
+        openai_dict = {
+            "method": openai_results.method.value,
+            "is_hate_speech": openai_results.is_hate_speech,
+            "confidence": openai_results.confidence,
+            "category": openai_results.category,
+            "explanation": openai_results.explanation,
+            "detected_terms": openai_results.detected_terms
+        }
+
+        # Combine results
+        return {
+            "is_hate_speech": openai_results.is_hate_speech,
+            "confidence": openai_results.confidence,
+            "categories": [openai_results.category] if openai_results.category else ["N/A"],
+            "explanations": [openai_results.explanation] if openai_results.explanation else ["No explanation provided"],
+            "method_results": [regex_dict, openai_dict]
+        }
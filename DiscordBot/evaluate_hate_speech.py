@@ -1,13 +1,17 @@
+import argparse
 import asyncio
 import csv
+import hashlib
 import json
 import os
+import re
+import time
 import pandas as pd
 import numpy as np
 from sklearn.metrics import confusion_matrix, classification_report
 import matplotlib.pyplot as plt
 import seaborn as sns
-from bot import ModBot
+from detection_engine import DetectionEngine, DetectionConfig
 from datasets import load_dataset as _load_dataset
 
 # Get the absolute path to the project directory
@@ -17,73 +21,95 @@ PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 # DATASET_PATH = os.path.join(PROJECT_DIR, "data", "Stanford Class H.S5 Sub-Sample.csv")
 DATASET_PATH = "google/civil_comments"
 # DATASET_PATH = "ucberkeley-dlab/measuring-hate-speech"
-RESULTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cc_evaluation_results.json")
+RESULTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cc_evaluation_results.jsonl")
 SAMPLE_SIZE = 200  # Specify number for partial testing (e.g., 20) or None for full dataset
+CONCURRENCY = 8  # Number of dataset rows scored at the same time
+OPENAI_REQUESTS_PER_MINUTE = 500  # OpenAI rate limit for evaluation runs (None for no limit)
+PROGRESS_INTERVAL = 2.0  # Seconds between progress updates
+
+HURTLEX_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "hurtlex_EN.tsv")
+HURTLEX_URL = "https://raw.githubusercontent.com/valeriobasile/hurtlex/master/lexica/EN/1.2/hurtlex_EN.tsv"
+LABEL_BATCH_SIZE = 1000  # Rows per batch when labeling a Hugging Face dataset
+
+_slur_pattern = None  # Compiled HurtLex matcher, built on first use
+
+def slur_pattern():
+    """
+    Compiled regex matching any conservative PS-category HurtLex term as a
+    substring of lowercased text, downloading the lexicon on first use.
+    Returns None if the lexicon is unavailable.
+    """
+    global _slur_pattern
+    if _slur_pattern is not None:
+        return _slur_pattern
+
+    # Download HurtLex if not already present
+    if not os.path.exists(HURTLEX_PATH):
+        try:
+            import requests
+        except ImportError:
+            print("Warning: requests library not installed. Install with: pip install requests")
+            return None
+        print("Downloading HurtLex lexicon...")
+        response = requests.get(HURTLEX_URL)
+        if response.status_code != 200:
+            print("Failed to download HurtLex lexicon.")
+            return None
+        with open(HURTLEX_PATH, 'w', encoding='utf-8') as f:
+            f.write(response.text)
+        print("HurtLex lexicon downloaded successfully.")
+
+    hurtlex_terms = set()
+    try:
+        with open(HURTLEX_PATH, 'r', encoding='utf-8') as f:
+            for line in f:
+                parts = line.strip().split('\t')
+                if len(parts) >= 6:  # Ensure we have enough columns
+                    category = parts[2]  # The category column (3rd column, 0-indexed)
+                    if category == 'ps' and parts[5] == "conservative":  # Only load terms with PS category
+                        hurtlex_terms.add(parts[4].lower())  # The lemma column (5th column, 0-indexed)
+    except Exception as e:
+        print(f"Error loading HurtLex lexicon: {e}")
+        return None
+    print(f"Loaded {len(hurtlex_terms)} PS category terms from HurtLex lexicon.")
+
+    # One alternation scans each text once instead of once per term
+    _slur_pattern = re.compile('|'.join(re.escape(term) for term in sorted(hurtlex_terms, key=len, reverse=True)))
+    return _slur_pattern
 
 def contains_slur(text):
     """
     Check if text contains slurs using the HurtLex lexicon.
     Returns True if slurs are detected, False otherwise.
     """
-    try:
-        import requests
-        import os
-        import re
-        
-        # Path to store the HurtLex lexicon locally
-        hurtlex_path = os.path.join(os.path.dirname(__file__), "hurtlex_EN.tsv")
-        
-        # Download HurtLex if not already present
-        if not os.path.exists(hurtlex_path):
-            print("Downloading HurtLex lexicon...")
-            url = "https://raw.githubusercontent.com/valeriobasile/hurtlex/master/lexica/EN/1.2/hurtlex_EN.tsv"
-            response = requests.get(url)
-            if response.status_code == 200:
-                with open(hurtlex_path, 'w', encoding='utf-8') as f:
-                    f.write(response.text)
-                print("HurtLex lexicon downloaded successfully.")
-            else:
-                print("Failed to download HurtLex lexicon.")
-                return False
-        
-        # Load HurtLex terms if not already loaded
-        if not hasattr(contains_slur, '_hurtlex_terms'):
-            hurtlex_terms = set()
-            try:
-                with open(hurtlex_path, 'r', encoding='utf-8') as f:
-                    for line in f:
-                        parts = line.strip().split('\t')
-                        if len(parts) >= 5:  # Ensure we have enough columns
-                            category = parts[2]  # The category column (3rd column, 0-indexed)
-                            if category == 'ps' and parts[5] == "conservative":  # Only load terms with PS category
-                                term = parts[4].lower()  # The lemma column (5th column, 0-indexed)
-                                hurtlex_terms.add(term)
-                contains_slur._hurtlex_terms = hurtlex_terms
-                print(f"Loaded {len(hurtlex_terms)} PS category terms from HurtLex lexicon.")
-            except Exception as e:
-                print(f"Error loading HurtLex lexicon: {e}")
-                return False
-        
-        # Check if text contains any HurtLex terms
-        text_lower = text.lower()
-        # words = re.findall(r'\b\w+\b', text_lower)
-        
-        # for word in words:
-        #     if word in contains_slur._hurtlex_terms:
-        #         return True
+    pattern = slur_pattern()
+    return bool(pattern and pattern.search(text.lower()))
 
-        for term in contains_slur._hurtlex_terms:
-            if term in text_lower:
-                return True
-        
-        return False
-    
-    except ImportError:
-        print("Warning: requests library not installed. Install with: pip install requests")
-        return False
-    except Exception as e:
-        print(f"Error checking for slurs: {e}")
-        return False
+def label_slurs(batch):
+    """Batched `dataset.map` function adding a contains_slur column"""
+    pattern = slur_pattern()
+    return {'contains_slur': [bool(pattern and pattern.search(text.lower())) for text in batch['text']]}
+
+def balanced_sample_indices(is_positive, sample_size):
+    """
+    Indices of up to `sample_size` rows, half positive and half negative,
+    topping up from the other class when one runs short.
+    """
+    positive_indices = np.flatnonzero(is_positive)
+    negative_indices = np.flatnonzero(~is_positive)
+
+    # Sample equal numbers from each class (or as many as available)
+    samples_per_class = sample_size // 2
+    pos_sample_size = min(samples_per_class, len(positive_indices))
+    neg_sample_size = min(samples_per_class, len(negative_indices))
+
+    # If we can't get enough from one class, take more from the other
+    if pos_sample_size < samples_per_class:
+        neg_sample_size = min(sample_size - pos_sample_size, len(negative_indices))
+    elif neg_sample_size < samples_per_class:
+        pos_sample_size = min(sample_size - neg_sample_size, len(positive_indices))
+
+    return np.concatenate([positive_indices[:pos_sample_size], negative_indices[:neg_sample_size]])
 
 
 async def load_dataset(path, sample_size=None):
@@ -100,13 +126,15 @@ async def load_dataset(path, sample_size=None):
         
         # Select only the available columns we want to keep
         dataset = dataset.select_columns(available_columns)
-        # Add slur detection label
+        # Add slur detection label. Load the lexicon here so worker processes inherit it
         print("Adding slur detection labels...")
-        dataset = dataset.map(lambda x: {**x, 'contains_slur': contains_slur(x['text'])})
+        slur_pattern()
+        dataset = dataset.map(label_slurs, batched=True, batch_size=LABEL_BATCH_SIZE, num_proc=os.cpu_count())
+        is_slur = np.asarray(dataset['contains_slur'], dtype=bool)
 
         # Print statistics about slur detection
         total_samples = len(dataset)
-        slur_count = sum(1 for x in dataset if x['contains_slur'] == True)
+        slur_count = int(is_slur.sum())
         non_slur_count = total_samples - slur_count
         
         print(f"Dataset statistics:")
@@ -117,51 +145,24 @@ async def load_dataset(path, sample_size=None):
 
         # Print examples of texts with slurs
         print("\nExamples of texts containing slurs:")
-        slur_examples = [x['text'] for x in dataset if x['contains_slur'] == True][:5]
+        slur_examples = dataset.select(np.flatnonzero(is_slur)[:5])['text']
         for i, example in enumerate(slur_examples, 1):
             print(f"  Example {i}: {example}")
 
         # Print examples of texts without slurs
         print("\nExamples of texts without slurs:")
-        non_slur_examples = [x['text'] for x in dataset if x['contains_slur'] == False][:5]
+        non_slur_examples = dataset.select(np.flatnonzero(~is_slur)[:5])['text']
         for i, example in enumerate(non_slur_examples, 1):
             print(f"  Example {i}: {example}")
 
-        # Filter to sample_size if specified
+        # Filter to sample_size if specified, with equal positive and negative examples
         if sample_size is not None and sample_size < len(dataset):
-            # Create balanced sample with equal positive and negative examples
-            positive_indices = [i for i, x in enumerate(dataset) if x['contains_slur'] == True]
-            negative_indices = [i for i, x in enumerate(dataset) if x['contains_slur'] == False]
-            
-            # Calculate how many of each class to sample
-            samples_per_class = sample_size // 2
-            
-            # Sample equal numbers from each class (or as many as available)
-            pos_sample_size = min(samples_per_class, len(positive_indices))
-            neg_sample_size = min(samples_per_class, len(negative_indices))
-            
-            # If we can't get enough from one class, take more from the other
-            if pos_sample_size < samples_per_class:
-                neg_sample_size = min(sample_size - pos_sample_size, len(negative_indices))
-            elif neg_sample_size < samples_per_class:
-                pos_sample_size = min(sample_size - neg_sample_size, len(positive_indices))
-            
-            # Select the indices
-            selected_pos = positive_indices[:pos_sample_size]
-            selected_neg = negative_indices[:neg_sample_size]
-            selected_indices = selected_pos + selected_neg
-            
-            # Select the balanced sample
-            dataset = dataset.select(selected_indices)
-
-        # Convert threat column to binary labels if it exists
-        if 'contains_slur' in dataset.column_names:
-            dataset = dataset.map(lambda x: {**x, 'label': int(x['contains_slur'] == True)})
-        
-        # Add content_text column for compatibility
-        dataset = dataset.map(lambda x: {'label': x['label'], 'contains_slur':x['contains_slur'], 'content_text': x['text']})
+            dataset = dataset.select(balanced_sample_indices(is_slur, sample_size))
 
-        df = pd.DataFrame(dataset)
+        df = dataset.to_pandas()
+        df['label'] = df['contains_slur'].astype(int)
+        # Add content_text column for compatibility
+        df['content_text'] = df['text']
 
         return df
 
@@ -177,41 +178,16 @@ async def load_dataset(path, sample_size=None):
         # Select only the available columns we want to keep
         dataset = dataset.select_columns(available_columns)
 
-        # Filter to sample_size if specified
+        # Filter to sample_size if specified, with equal positive and negative examples
         if sample_size is not None and sample_size < len(dataset):
-            # Create balanced sample with equal positive and negative examples
-            positive_indices = [i for i, x in enumerate(dataset) if x['threat'] >= 0.5]
-            negative_indices = [i for i, x in enumerate(dataset) if x['threat'] < 0.5]
-            
-            # Calculate how many of each class to sample
-            samples_per_class = sample_size // 2
-            
-            # Sample equal numbers from each class (or as many as available)
-            pos_sample_size = min(samples_per_class, len(positive_indices))
-            neg_sample_size = min(samples_per_class, len(negative_indices))
-            
-            # If we can't get enough from one class, take more from the other
-            if pos_sample_size < samples_per_class:
-                neg_sample_size = min(sample_size - pos_sample_size, len(negative_indices))
-            elif neg_sample_size < samples_per_class:
-                pos_sample_size = min(sample_size - neg_sample_size, len(positive_indices))
-            
-            # Select the indices
-            selected_pos = positive_indices[:pos_sample_size]
-            selected_neg = negative_indices[:neg_sample_size]
-            selected_indices = selected_pos + selected_neg
-            
-            # Select the balanced sample
-            dataset = dataset.select(selected_indices)
-
-        # Convert threat column to binary labels if it exists
-        if 'threat' in dataset.column_names:
-            dataset = dataset.map(lambda x: {**x, 'label': int(x['threat'] >= 0.5)})
-        
-        # Add content_text column for compatibility
-        dataset = dataset.map(lambda x: {'label': x['label'], 'threat':x['threat'], 'content_text': x['text']})
+            is_threat = np.asarray(dataset['threat']) >= 0.5
+            dataset = dataset.select(balanced_sample_indices(is_threat, sample_size))
 
-        df = pd.DataFrame(dataset)
+        df = dataset.to_pandas()
+        # Convert threat column to binary labels
+        df['label'] = (df['threat'] >= 0.5).astype(int)
+        # Add content_text column for compatibility
+        df['content_text'] = df['text']
 
         return df
 
@@ -225,52 +201,148 @@ async def load_dataset(path, sample_size=None):
         return df.sample(sample_size, random_state=42)
     return df
 
-async def evaluate_detection(bot, dataset):
-    """Evaluate the bot's hate speech detection on the dataset"""
+def format_progress(done, total, elapsed):
+    """Formats a progress line with throughput and estimated time remaining"""
+    rate = done / elapsed if elapsed > 0 else 0
+    eta = (total - done) / rate if rate > 0 else float('inf')
+    eta_text = f"{eta:.0f}s" if eta != float('inf') else "unknown"
+    return f"Processed {done}/{total} ({done / total * 100:.1f}%) - {rate:.1f} items/s - ETA {eta_text}"
+
+def row_ids(texts):
+    """
+    Stable IDs for dataset rows: a hash of the text plus an occurrence number
+    for duplicate texts, so IDs survive changes to sampling or row order.
+    """
+    seen = {}
+    ids = []
+    for text in texts:
+        digest = hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]
+        seen[digest] = seen.get(digest, 0) + 1
+        ids.append(f"{digest}-{seen[digest]}")
+    return ids
+
+def load_results(path):
+    """
+    Load results streamed to a JSONL file by evaluate_detection.
+    A truncated last line (e.g. from a crash mid-write) is ignored.
+    """
     results = []
-    true_labels = []
-    predicted_labels = []
+    if not os.path.isfile(path):
+        return results
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                results.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return results
+
+def drop_partial_line(path):
+    """Truncates a results file after its last complete line, so appended records start on a fresh line."""
+    if not os.path.isfile(path):
+        return
+    with open(path, 'rb+') as f:
+        end = f.seek(0, os.SEEK_END)
+        pos = end
+        while pos > 0:
+            step = min(4096, pos)
+            f.seek(pos - step)
+            chunk = f.read(step)
+            newline = chunk.rfind(b"\n")
+            if newline != -1:
+                pos = pos - step + newline + 1
+                break
+            pos -= step
+        if pos != end:
+            f.truncate(pos)
+
+def write_results(path, results, extra=()):
+    """Rewrites the results file with `results` in dataset order, followed by `extra` rows."""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as out:
+        for result in list(results) + list(extra):
+            out.write(json.dumps(result) + "\n")
+    os.replace(tmp_path, path)
+
+async def evaluate_detection(engine, dataset, concurrency=CONCURRENCY, results_path=RESULTS_PATH, resume=False):
+    """
+    Evaluate the bot's hate speech detection on the dataset.
+    
+    Up to `concurrency` rows are scored at once; API rate limits are enforced
+    by the engine's shared classification service. Each result is appended to
+    `results_path` (JSONL) as soon as it completes, so the file is in
+    completion order while the run is in progress. With `resume`, rows whose
+    ID is already in that file are not scored again. Once every row is scored
+    the file is rewritten, and the results returned, in dataset order.
+    """
+    texts = list(dataset['content_text'])
+    labels = list(dataset['label'])
+    ids = row_ids(texts)
+    total = len(texts)
+    results = [None] * total
     
-    print(f"Processing {len(dataset)} dataset entries...")
+    previous = {}
+    if resume:
+        # A run killed mid-write leaves a partial last line; the next record must not join it
+        drop_partial_line(results_path)
+        previous = {r['row_id']: r for r in load_results(results_path) if 'row_id' in r}
+        for idx, row_id in enumerate(ids):
+            results[idx] = previous.get(row_id)
+    pending = [idx for idx in range(total) if results[idx] is None]
     
-    for idx, (text, label) in enumerate(zip(dataset['content_text'], dataset['label'])):
-        if idx % 10 == 0:
-            print(f"Processing item {idx}/{len(dataset)}...")
-        
+    print(f"Processing {len(pending)} of {total} dataset entries with concurrency {concurrency}...")
+    
+    semaphore = asyncio.Semaphore(concurrency)
+    start = time.monotonic()
+    done = 0
+    last_report = start
+    
+    async def score(idx, out):
+        nonlocal done, last_report
         # Strip out all non-ASCII characters to avoid encoding issues
-        cleaned_text = ''.join(char for char in text if ord(char) < 128)
+        cleaned_text = ''.join(char for char in texts[idx] if ord(char) < 128)
         
-        # Get prediction from the bot
-        prediction = await bot.eval_text(cleaned_text)
+        async with semaphore:
+            # Get prediction from the detection engine
+            prediction = await engine.eval_text(cleaned_text, caller="evaluation")
         
         # Check if hate speech was detected
         is_hate_speech = prediction.get('is_hate_speech', False)
         
         # Store results
-        results.append({
+        results[idx] = {
+            'row_id': ids[idx],
             'text': cleaned_text,
-            'true_label': int(label),  # 1 for hate speech, 0 for not
+            'true_label': int(labels[idx]),  # 1 for hate speech, 0 for not
             'predicted': int(is_hate_speech),  # 1 for detected, 0 for not detected
             'confidence': prediction.get('confidence_score', 'N/A'),
             'category': prediction.get('category', 'N/A'),
             'explanation': prediction.get('explanation', 'N/A')
-        })
+        }
+        out.write(json.dumps(results[idx]) + "\n")
+        out.flush()
         
-        true_labels.append(int(label))
-        predicted_labels.append(int(is_hate_speech))
+        done += 1
+        now = time.monotonic()
+        if now - last_report >= PROGRESS_INTERVAL or done == len(pending):
+            last_report = now
+            print(format_progress(done, len(pending), now - start))
     
+    with open(results_path, 'a' if resume else 'w', encoding='utf-8') as out:
+        await asyncio.gather(*(score(idx, out) for idx in pending))
+    # Rows from the previous run that are not in this dataset sample are kept at the end
+    current = set(ids)
+    write_results(results_path, results, (r for row_id, r in previous.items() if row_id not in current))
+    print(f"Results saved to {results_path}")
+    
+    true_labels = [r['true_label'] for r in results]
+    predicted_labels = [r['predicted'] for r in results]
     return results, true_labels, predicted_labels
 
-def save_results(results, path):
-    """Save evaluation results to JSON file"""
-    with open(path, 'w') as f:
-        json.dump(results, f, indent=2)
-    print(f"Results saved to {path}")
-
 def create_confusion_matrix(true_labels, predicted_labels):
     """Generate and display confusion matrix"""
-    # Calculate confusion matrix
-    cm = confusion_matrix(true_labels, predicted_labels)
+    # Calculate confusion matrix (both labels given so partial results with one class still work)
+    cm = confusion_matrix(true_labels, predicted_labels, labels=[0, 1])
     
     # Display confusion matrix as text
     tn, fp, fn, tp = cm.ravel()
@@ -305,13 +377,32 @@ def create_confusion_matrix(true_labels, predicted_labels):
     
     # Prepare detailed classification report
     print("\nDetailed Classification Report:")
-    report = classification_report(true_labels, predicted_labels, 
-                                  target_names=['Not Hate Speech', 'Hate Speech'])
+    report = classification_report(true_labels, predicted_labels, labels=[0, 1],
+                                  target_names=['Not Hate Speech', 'Hate Speech'], zero_division=0)
     print(report)
     
     return cm, accuracy, precision, recall, f1
 
-async def main():
+def summarize_results(results):
+    """Print metrics and sample errors for a (possibly partial) list of results"""
+    true_labels = [r['true_label'] for r in results]
+    predicted_labels = [r['predicted'] for r in results]
+    
+    # Create and display confusion matrix
+    cm, accuracy, precision, recall, f1 = create_confusion_matrix(true_labels, predicted_labels)
+    
+    # Additional analysis
+    print("\nSample False Positives (Non-hate speech classified as hate speech):")
+    false_positives = [r for r in results if r['true_label'] == 0 and r['predicted'] == 1]
+    for i, fp in enumerate(false_positives[:5]):  # Show first 5
+        print(f"{i+1}. \"{fp['text']}\" - Explanation: {str(fp['explanation'])[:100]}...")
+    
+    print("\nSample False Negatives (Hate speech not detected):")
+    false_negatives = [r for r in results if r['true_label'] == 1 and r['predicted'] == 0]
+    for i, fn in enumerate(false_negatives[:5]):  # Show first 5
+        print(f"{i+1}. \"{fn['text']}\" - Explanation: {str(fn['explanation'])[:100]}...")
+
+async def main(concurrency=CONCURRENCY, requests_per_minute=OPENAI_REQUESTS_PER_MINUTE, resume=False):
     """Main evaluation process"""
     print("Starting evaluation of hate speech detection...")
     
@@ -346,8 +437,12 @@ async def main():
     else:
         dataset_path = DATASET_PATH
     
-    # Initialize the bot
-    bot = ModBot()
+    # Initialize the detection pipeline; no Discord client or database is needed.
+    # Only the LLM tier calls an external API; the regex tier is not limited
+    engine = DetectionEngine(DetectionConfig.from_env(
+        max_concurrency=concurrency,
+        requests_per_minute=requests_per_minute
+    ))
     
     try:
         # Load the dataset
@@ -355,25 +450,25 @@ async def main():
         dataset = await load_dataset(dataset_path, SAMPLE_SIZE)
         print(f"Loaded {len(dataset)} entries")
         
-        # Evaluate the bot on the dataset
-        results, true_labels, predicted_labels = await evaluate_detection(bot, dataset)
+        # Evaluate the bot on the dataset, streaming results to RESULTS_PATH
+        results, true_labels, predicted_labels = await evaluate_detection(
+            engine, dataset, concurrency, RESULTS_PATH, resume
+        )
         
-        # Save detailed results
-        save_results(results, RESULTS_PATH)
+        summarize_results(results)
         
-        # Create and display confusion matrix
-        cm, accuracy, precision, recall, f1 = create_confusion_matrix(true_labels, predicted_labels)
-        
-        # Additional analysis
-        print("\nSample False Positives (Non-hate speech classified as hate speech):")
-        false_positives = [r for r in results if r['true_label'] == 0 and r['predicted'] == 1]
-        for i, fp in enumerate(false_positives[:5]):  # Show first 5
-            print(f"{i+1}. \"{fp['text']}\" - Explanation: {fp['explanation'][:100]}...")
-        
-        print("\nSample False Negatives (Hate speech not detected):")
-        false_negatives = [r for r in results if r['true_label'] == 1 and r['predicted'] == 0]
-        for i, fn in enumerate(false_negatives[:5]):  # Show first 5
-            print(f"{i+1}. \"{fn['text']}\" - Explanation: {fn['explanation'][:100]}...")
+        # API latency per caller
+        print("\nClassification API latency:")
+        for caller, stats in engine.classifier.latency_stats().items():
+            print(f"  {caller}: {stats['calls']} calls, {stats['cache_hits']} cache hits, "
+                  f"p50 {stats['p50_ms']:.0f} ms, p95 {stats['p95_ms']:.0f} ms, {stats['errors']} errors")
+        usage = engine.classifier.usage
+        usage.flush()
+        print(f"LLM usage: {usage.lifetime['prompt_tokens']} prompt + {usage.lifetime['completion_tokens']} "
+              f"completion tokens, ~${usage.lifetime['cost_usd']:.4f} at list prices")
+        cassette = engine.classifier.cassette
+        if cassette:
+            print(f"Cassette ({cassette.mode}): {cassette.hits} replayed, {cassette.misses} missing")
     
     except Exception as e:
         print(f"Error during evaluation: {str(e)}")
@@ -383,4 +478,29 @@ async def main():
     print("\nEvaluation completed.")
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description="Evaluate the bot's hate speech detection")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY,
+                        help="number of dataset rows scored at the same time")
+    parser.add_argument("--rpm", type=int, default=OPENAI_REQUESTS_PER_MINUTE,
+                        help="maximum OpenAI requests per minute")
+    parser.add_argument("--resume", action="store_true",
+                        help=f"skip rows already scored in {os.path.basename(RESULTS_PATH)}")
+    parser.add_argument("--metrics-only", action="store_true",
+                        help="print metrics from the results file so far without scoring anything")
+    cassette_group = parser.add_mutually_exclusive_group()
+    cassette_group.add_argument("--record", metavar="PATH",
+                                help="save every API response to PATH for later offline runs")
+    cassette_group.add_argument("--replay", metavar="PATH",
+                                help="serve API responses from PATH only; never call the network")
+    args = parser.parse_args()
+    # DetectionConfig.from_env picks the cassette up from the environment
+    if args.record or args.replay:
+        os.environ["MODBOT_CASSETTE"] = args.record or args.replay
+        os.environ["MODBOT_CASSETTE_MODE"] = "record" if args.record else "replay"
+    if args.metrics_only:
+        partial = load_results(RESULTS_PATH)
+        print(f"Loaded {len(partial)} results from {RESULTS_PATH}")
+        if partial:
+            summarize_results(partial)
+    else:
+        asyncio.run(main(args.concurrency, args.rpm, args.resume))
@@ -2,16 +2,16 @@ import os
 import re
 import csv
 import json
-import openai
 from typing import Dict, List, Optional
 from dataclasses import dataclass
 from enum import Enum
+from classification_service import ClassificationService
+from metrics import STAGE_SECONDS
+from usage import SpendCapReached
+from replay import CassetteMiss
+from tracing import span
 
-# Load tokens from tokens.json
-with open(os.path.join(os.path.dirname(__file__), "tokens.json")) as f:
-    tokens = json.load(f)
-openai_api_key = tokens.get("openai")
-perspective_api_key = tokens.get("perspective_api_key")
+DEFAULT_PERSPECTIVE_API_URL = "https://commentanalyzer.googleapis.com/v1alpha1/comments:analyze"
 
 class DetectionMethod(Enum):
     PERSPECTIVE_API = "perspective_api"
@@ -28,9 +28,16 @@ class DetectionResult:
     detected_terms: Optional[List[str]] = None
 
 class HateSpeechDetector:
-    def __init__(self):
-        self.openai_api_key = openai_api_key
+    def __init__(self, classifier: Optional[ClassificationService] = None,
+                 perspective_api_key: Optional[str] = None,
+                 perspective_api_url: str = DEFAULT_PERSPECTIVE_API_URL):
+        # Keys are passed in (see detection_engine.DetectionConfig); nothing is read at import
+        self.classifier = classifier or ClassificationService()
+        self.openai_api_key = self.classifier.api_key
         self.perspective_api_key = perspective_api_key
+        self.perspective_api_url = perspective_api_url
+        # Record/replay for Perspective calls follows the classification service
+        self.cassette = self.classifier.cassette
         self.slurs = self._load_slurs()
 
     def _load_slurs(self) -> set:
@@ -48,7 +55,7 @@ class HateSpeechDetector:
         return slurs
 
     async def detect_with_perspective_api(self, text: str) -> DetectionResult:
-        if not self.perspective_api_key:
+        if not self.perspective_api_key and not (self.cassette and self.cassette.offline):
             return DetectionResult(
                 method=DetectionMethod.PERSPECTIVE_API,
                 is_hate_speech=False,
@@ -57,7 +64,7 @@ class HateSpeechDetector:
             )
         try:
             import aiohttp
-            url = f"https://commentanalyzer.googleapis.com/v1alpha1/comments:analyze?key={self.perspective_api_key}"
+            url = f"{self.perspective_api_url}?key={self.perspective_api_key}"
             headers = {"Content-Type": "application/json"}
             data = {
                 "comment": {"text": text},
@@ -72,29 +79,37 @@ class HateSpeechDetector:
                 },
                 "doNotStore": True
             }
-            async with aiohttp.ClientSession() as session:
-                async with session.post(url, headers=headers, json=data) as resp:
-                    result = await resp.json()
-                    if "attributeScores" not in result:
-                        return DetectionResult(
-                            method=DetectionMethod.PERSPECTIVE_API,
-                            is_hate_speech=False,
-                            confidence=0.0,
-                            explanation=f"Unexpected API response: {result}"
-                        )
-                    # Get the highest toxicity score
-                    scores = []
-                    for attr in result["attributeScores"]:
-                        scores.append(result["attributeScores"][attr]["summaryScore"]["value"])
-                    score = max(scores) if scores else 0.0
-                    is_hate = score > 0.7
-                    return DetectionResult(
-                        method=DetectionMethod.PERSPECTIVE_API,
-                        is_hate_speech=is_hate,
-                        confidence=score,
-                        category="TOXICITY" if is_hate else None,
-                        explanation=f"Perspective API highest toxicity score: {score:.2f}"
-                    )
+
+            async def send():
+                async with aiohttp.ClientSession() as session:
+                    async with session.post(url, headers=headers, json=data) as resp:
+                        return await resp.json()
+
+            # The key stays out of the recorded request
+            with STAGE_SECONDS.time(stage="perspective_call"), span("perspective_api"):
+                result = await self.cassette.call("perspective", data, send) if self.cassette else await send()
+            if "attributeScores" not in result:
+                return DetectionResult(
+                    method=DetectionMethod.PERSPECTIVE_API,
+                    is_hate_speech=False,
+                    confidence=0.0,
+                    explanation=f"Unexpected API response: {result}"
+                )
+            # Get the highest toxicity score
+            scores = []
+            for attr in result["attributeScores"]:
+                scores.append(result["attributeScores"][attr]["summaryScore"]["value"])
+            score = max(scores) if scores else 0.0
+            is_hate = score > 0.7
+            return DetectionResult(
+                method=DetectionMethod.PERSPECTIVE_API,
+                is_hate_speech=is_hate,
+                confidence=score,
+                category="TOXICITY" if is_hate else None,
+                explanation=f"Perspective API highest toxicity score: {score:.2f}"
+            )
+        except CassetteMiss:
+            raise  # An unrecorded request in replay must not be scored as clean
         except Exception as e:
             return DetectionResult(
                 method=DetectionMethod.PERSPECTIVE_API,
@@ -103,8 +118,8 @@ class HateSpeechDetector:
                 explanation=f"Error calling Perspective API: {str(e)}"
             )
 
-    async def detect_with_openai_api(self, text: str) -> DetectionResult:
-        if not self.openai_api_key:
+    async def detect_with_openai_api(self, text: str, caller: str = "automod") -> DetectionResult:
+        if not self.classifier.available:
             return DetectionResult(
                 method=DetectionMethod.OPENAI_API,
                 is_hate_speech=False,
@@ -112,18 +127,23 @@ class HateSpeechDetector:
                 explanation="OpenAI API key not configured"
             )
         try:
-            client = openai.OpenAI(api_key=self.openai_api_key)
-            response = client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "You're a content mod assistant. Analyze the text for hate speech. Respond in JSON with these fields: hate_speech_detected (boolean), confidence_score (number 0-1), category (string or null), explanation (string)."},
-                    {"role": "user", "content": f"Check this text for hate speech: '{text}'"}
-                ],
-                response_format={"type": "json_object"},
-                temperature=0.1,
-                max_tokens=300
-            )
-            result = json.loads(response.choices[0].message.content)
+            with STAGE_SECONDS.time(stage="llm_call"), span("openai_api", caller=caller) as traced:
+                response = await self.classifier.chat(
+                    caller=caller,
+                    method="detect_with_openai_api",
+                    model="gpt-3.5-turbo",
+                    messages=[
+                        {"role": "system", "content": "You're a content mod assistant. Analyze the text for hate speech. Respond in JSON with these fields: hate_speech_detected (boolean), confidence_score (number 0-1), category (string or null), explanation (string)."},
+                        {"role": "user", "content": f"Check this text for hate speech: '{text}'"}
+                    ],
+                    response_format={"type": "json_object"},
+                    temperature=0.1,
+                    max_tokens=300
+                )
+                result = json.loads(response.choices[0].message.content)
+                if traced:
+                    traced.set(is_hate_speech=result.get('hate_speech_detected'),
+                               confidence=result.get('confidence_score'), category=result.get('category'))
             return DetectionResult(
                 method=DetectionMethod.OPENAI_API,
                 is_hate_speech=result.get('hate_speech_detected', False),
@@ -131,6 +151,15 @@ class HateSpeechDetector:
                 category=result.get('category'),
                 explanation=result.get('explanation')
             )
+        except SpendCapReached as e:
+            return DetectionResult(
+                method=DetectionMethod.OPENAI_API,
+                is_hate_speech=False,
+                confidence=0.0,
+                explanation=f"OpenAI API skipped: {str(e)}"
+            )
+        except CassetteMiss:
+            raise  # An unrecorded request in replay must not be scored as clean
         except Exception as e:
             return DetectionResult(
                 method=DetectionMethod.OPENAI_API,
@@ -140,11 +169,14 @@ class HateSpeechDetector:
             )
 
     def detect_with_regex_slurs(self, text: str) -> DetectionResult:
-        text_lower = text.lower()
-        detected_terms = []
-        for slur in self.slurs:
-            if slur and slur in text_lower:
-                detected_terms.append(slur)
+        with STAGE_SECONDS.time(stage="lexicon_scan"), span("regex_slurs") as traced:
+            text_lower = text.lower()
+            detected_terms = []
+            for slur in self.slurs:
+                if slur and slur in text_lower:
+                    detected_terms.append(slur)
+            if traced:
+                traced.set(matches=len(detected_terms))
         return DetectionResult(
             method=DetectionMethod.REGEX_SLURS,
             is_hate_speech=len(detected_terms) > 0,
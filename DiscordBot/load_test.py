@@ -0,0 +1,307 @@
+# load_test.py
+"""
+Synthetic load generator for the bot's message pipeline.
+
+Feeds fake guild messages (text, plus optional .txt attachments) into
+ModBot.on_message at a fixed rate, with the LLM and database replaced by stubs
+of configurable latency and the mod channel replaced by an in-memory mock.
+Reports throughput, latency percentiles and memory growth over time, without
+connecting to Discord:
+
+    python load_test.py --rate 50 --duration 60 --duplicate-ratio 0.3 --attachment-ratio 0.1
+
+Messages are sent open-loop: a slow pipeline shows up as growing latency and
+in-flight counts rather than a lower send rate.
+"""
+import argparse
+import asyncio
+import itertools
+import logging
+import random
+import time
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from benchmarks import load_corpus, stub_completion
+from bot import ModBot
+from channel_index import MONITORED, MOD
+from counters import UserCounters
+from memory_monitor import rss_bytes
+from usage import UsageMeter
+
+GUILD_ID = 1000
+MONITORED_CHANNEL_ID = 2000
+MOD_CHANNEL_ID = 2001
+REPORT_INTERVAL = 5.0  # Seconds between progress lines
+
+_ids = itertools.count(10_000)  # Snowflake-like IDs for fake messages
+
+
+class MockUser:
+    def __init__(self, user_id, name=None):
+        self.id = user_id
+        self.name = name or f"user{user_id}"
+        self.dms = 0
+
+    async def send(self, content=None, **kwargs):
+        self.dms += 1
+
+
+class MockMessage:
+    def __init__(self, channel, content, author=None, attachments=(), reference_id=None):
+        self.id = next(_ids)
+        self.channel = channel
+        self.guild = channel.guild
+        self.content = content
+        self.author = author
+        self.attachments = list(attachments)
+        self.reference = SimpleNamespace(message_id=reference_id) if reference_id else None
+        self.created_at = datetime.now(timezone.utc)
+
+    async def add_reaction(self, emoji):
+        pass
+
+    async def edit(self, content=None, **kwargs):
+        self.content = content
+
+    async def delete(self):
+        pass
+
+
+class MockChannel:
+    """A text channel whose sends are counted and delayed instead of delivered."""
+    def __init__(self, channel_id, name, guild, latency=0.0):
+        self.id = channel_id
+        self.name = name
+        self.guild = guild
+        self.latency = latency
+        self.sent = 0
+
+    async def send(self, content=None, **kwargs):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self.sent += 1
+        return MockMessage(self, content)
+
+    async def fetch_message(self, message_id):
+        return SimpleNamespace(id=message_id)
+
+
+class MockGuild:
+    def __init__(self, guild_id, name="Load Test"):
+        self.id = guild_id
+        self.name = name
+        self.text_channels = []
+
+    async def fetch_member(self, user_id):
+        return MockUser(user_id)
+
+
+class MockAttachment:
+    def __init__(self, filename, text):
+        self.filename = filename
+        self._data = text.encode('utf-8')
+
+    async def read(self):
+        return self._data
+
+
+class StubDatabase:
+    """The InfractionDatabase calls automod makes, with a fixed delay and no storage."""
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.writes = 0
+
+    async def add_infraction(self, **fields):
+        await asyncio.sleep(self.latency)
+        self.writes += 1
+        return {"id": self.writes}
+
+    async def get_user_infraction_counts(self, user_id, guild_id=None):
+        await asyncio.sleep(self.latency)
+        return {}
+
+
+async def stub_bot(llm_latency, db_latency):
+    """A ModBot wired to stubs, with no channels: no gateway, no database, no API calls."""
+    bot = ModBot()
+    bot._connection.user = SimpleNamespace(id=1, name="Group 0 Bot")
+
+    async def create(model, messages, params):
+        await asyncio.sleep(llm_latency)
+        return stub_completion(messages[-1]["content"])
+
+    bot.classifier._create = create
+    bot.classifier.api_key = "load-test"  # Any key enables the LLM tier; requests never leave the process
+    bot.classifier.usage = UsageMeter()  # Metered in memory only, so stub calls never count toward real spend
+    bot.db = StubDatabase(db_latency)
+    bot.counters = UserCounters(bot.db)
+    bot.mock_guilds = {}  # Map from guild ID to MockGuild, served by get_guild
+    bot.get_guild = bot.mock_guilds.get
+    bot.channel_index.group_num = "0"
+
+    await bot.load_extension('moderation')
+    return bot
+
+
+def add_mock_channel(bot, guild_id, channel_id, role, latency=0.0):
+    """Adds a mock channel with the given role to the bot's channel index and returns it."""
+    guild = bot.mock_guilds.setdefault(guild_id, MockGuild(guild_id))
+    suffix = "" if role == MONITORED else f"-{role}"
+    channel = MockChannel(channel_id, f"group-0{suffix}", guild, latency)
+    guild.text_channels.append(channel)
+    bot.channel_index.roles[channel_id] = role
+    bot.channel_index.channels[role].setdefault(guild_id, channel)
+    return channel
+
+
+async def build_bot(llm_latency, db_latency, discord_latency):
+    """A stubbed ModBot with one monitored channel and one mod channel."""
+    bot = await stub_bot(llm_latency, db_latency)
+    monitored = add_mock_channel(bot, GUILD_ID, MONITORED_CHANNEL_ID, MONITORED, discord_latency)
+    mod = add_mock_channel(bot, GUILD_ID, MOD_CHANNEL_ID, MOD, discord_latency)
+    return bot, monitored, mod
+
+
+class MessageFactory:
+    """Produces fake messages from the corpus with the requested mix."""
+    def __init__(self, channel, corpus, duplicate_ratio, attachment_ratio, users, seed):
+        self.channel = channel
+        self.corpus = corpus
+        self.duplicate_ratio = duplicate_ratio
+        self.attachment_ratio = attachment_ratio
+        self.random = random.Random(seed)
+        self.authors = [MockUser(100 + i) for i in range(users)]
+        self.sent_texts = []
+
+    def make(self):
+        if self.sent_texts and self.random.random() < self.duplicate_ratio:
+            text = self.random.choice(self.sent_texts)
+        else:
+            text = self.random.choice(self.corpus)
+            self.sent_texts.append(text)
+        attachments = []
+        if self.random.random() < self.attachment_ratio:
+            body = "\n".join(self.random.choice(self.corpus) for _ in range(5))
+            attachments.append(MockAttachment("upload.txt", body))
+        return MockMessage(self.channel, text, self.random.choice(self.authors), attachments)
+
+
+class LoadStats:
+    def __init__(self):
+        self.sent = 0
+        self.completed = 0
+        self.errors = 0
+        self.latencies = []  # Seconds, for the whole run
+        self.window = []  # Seconds, since the last progress line
+
+    def record(self, seconds, error=False):
+        self.completed += 1
+        self.errors += int(error)
+        self.latencies.append(seconds)
+        self.window.append(seconds)
+
+    @staticmethod
+    def percentiles(samples):
+        if not samples:
+            return 0.0, 0.0, 0.0
+        ordered = sorted(samples)
+
+        def at(p):
+            return 1000 * ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+        return at(0.50), at(0.99), 1000 * ordered[-1]
+
+
+async def run_load(bot, factory, rate, duration, max_in_flight):
+    stats = LoadStats()
+    in_flight = set()
+
+    async def deliver(message):
+        start = time.perf_counter()
+        error = False
+        try:
+            await bot.on_message(message)
+        except Exception as e:
+            error = True
+            print(f"  error: {type(e).__name__}: {e}")
+        stats.record(time.perf_counter() - start, error)
+
+    start = time.perf_counter()
+    rss_start = rss_bytes()
+    next_report = start + REPORT_INTERVAL
+    print(f"{'time':>6} {'sent':>7} {'done':>7} {'msg/s':>7} {'p50 ms':>8} {'p99 ms':>8} "
+          f"{'in flight':>9} {'RSS MB':>8} {'mod_reports':>11} {'scores':>7}")
+
+    while time.perf_counter() - start < duration:
+        if len(in_flight) < max_in_flight:
+            task = asyncio.create_task(deliver(factory.make()))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+            stats.sent += 1
+        # Open loop: the next message is due at a fixed time whatever happened to this one
+        due = start + stats.sent / rate
+        await asyncio.sleep(max(0.0, due - time.perf_counter()))
+
+        now = time.perf_counter()
+        if now >= next_report:
+            p50, p99, _ = LoadStats.percentiles(stats.window)
+            print(f"{now - start:>5.0f}s {stats.sent:>7} {stats.completed:>7} "
+                  f"{len(stats.window) / REPORT_INTERVAL:>7.1f} {p50:>8.1f} {p99:>8.1f} {len(in_flight):>9} "
+                  f"{rss_bytes() / 2**20:>8.1f} {len(bot.mod_reports):>11} {len(bot.automod_scores):>7}")
+            stats.window = []
+            next_report += REPORT_INTERVAL
+
+    if in_flight:
+        await asyncio.wait(in_flight)
+    elapsed = time.perf_counter() - start
+    return stats, elapsed, rss_bytes() - rss_start
+
+
+async def main(args):
+    # Per-message logs would swamp the progress lines
+    for name in ('modbot', 'modbot.messages'):
+        logging.getLogger(name).setLevel(logging.WARNING)
+    bot, monitored, mod = await build_bot(
+        args.llm_latency_ms / 1000, args.db_latency_ms / 1000, args.discord_latency_ms / 1000
+    )
+    factory = MessageFactory(
+        monitored, load_corpus(size=args.corpus_size), args.duplicate_ratio, args.attachment_ratio,
+        args.users, args.seed
+    )
+    print(f"Sending {args.rate} msg/s for {args.duration}s "
+          f"({args.duplicate_ratio:.0%} duplicates, {args.attachment_ratio:.0%} with attachments)\n")
+
+    stats, elapsed, rss_growth = await run_load(bot, factory, args.rate, args.duration, args.max_in_flight)
+
+    p50, p99, worst = LoadStats.percentiles(stats.latencies)
+    print("\nSummary:")
+    print(f"  Messages: {stats.completed} handled of {stats.sent} sent, {stats.errors} errors")
+    print(f"  Throughput: {stats.completed / elapsed:.1f} msg/s")
+    print(f"  Latency: p50 {p50:.1f} ms, p99 {p99:.1f} ms, max {worst:.1f} ms")
+    print(f"  Mod channel messages: {mod.sent}, database writes: {bot.db.writes}")
+    print(f"  Memory growth: {rss_growth / 2**20:.1f} MB RSS")
+    for caller, summary in bot.classifier.latency_stats().items():
+        print(f"  Classifier ({caller}): {summary['calls']} calls, {summary['cache_hits']} cache hits")
+    usage = bot.classifier.usage.lifetime
+    print(f"  LLM usage: {usage['prompt_tokens']} prompt + {usage['completion_tokens']} completion tokens, "
+          f"~${usage['cost_usd']:.4f} at list prices")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Drive ModBot.on_message with synthetic traffic")
+    parser.add_argument("--rate", type=float, default=20, help="messages per second")
+    parser.add_argument("--duration", type=float, default=30, help="seconds to send for")
+    parser.add_argument("--duplicate-ratio", type=float, default=0.2,
+                        help="fraction of messages repeating an earlier text")
+    parser.add_argument("--attachment-ratio", type=float, default=0.05,
+                        help="fraction of messages with a .txt attachment")
+    parser.add_argument("--users", type=int, default=200, help="number of distinct authors")
+    parser.add_argument("--llm-latency-ms", type=float, default=300, help="stubbed OpenAI response time")
+    parser.add_argument("--db-latency-ms", type=float, default=30, help="stubbed database call time")
+    parser.add_argument("--discord-latency-ms", type=float, default=50, help="mock channel send time")
+    parser.add_argument("--max-in-flight", type=int, default=5000,
+                        help="stop sending while this many messages are still being handled")
+    parser.add_argument("--corpus-size", type=int, default=5000, help="texts sampled from the corpus")
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(main(parser.parse_args()))
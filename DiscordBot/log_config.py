@@ -0,0 +1,140 @@
+# log_config.py
+import atexit
+import copy
+import logging
+import logging.handlers
+import os
+import queue
+import random
+
+# Per-logger levels applied by configure_logging. Override with
+# MODBOT_LOG_LEVELS="database=DEBUG,discord=WARNING".
+DEFAULT_LEVELS = {
+    "discord": logging.INFO,
+    "discord.gateway": logging.WARNING,
+    "discord.http": logging.WARNING,
+    "database": logging.INFO,
+    "modbot": logging.INFO,
+    "modbot.messages": logging.INFO,
+}
+
+# Fraction of records kept for high-volume loggers (warnings and errors are
+# always kept). Override with MODBOT_LOG_SAMPLE="modbot.messages=0.5".
+DEFAULT_SAMPLE_RATES = {
+    "modbot.messages": 0.05,
+}
+
+# Attributes every LogRecord has; anything else was passed through `extra`
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+
+_listener = None
+
+
+class StructuredFormatter(logging.Formatter):
+    """
+    Formats records as `time level logger message key=value ...`.
+    Fields passed through `extra=` are appended as key=value pairs.
+    """
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)s %(name)s: %(message)s')
+
+    def format(self, record):
+        line = super().format(record)
+        fields = [f"{key}={value!r}" for key, value in record.__dict__.items()
+                  if key not in _RECORD_ATTRS and not key.startswith('_')]
+        if fields:
+            line += " " + " ".join(fields)
+        return line
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps only a fraction of the records below WARNING from selected loggers."""
+    def __init__(self, rates):
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self.rates.get(record.name)
+        return rate is None or random.random() < rate
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    Enqueues records with only their message merged. The stock QueueHandler
+    runs the full formatter on the calling thread; here the timestamp, layout
+    and extra fields are left to the listener thread so the event loop only
+    pays for `msg % args`.
+    """
+    _exc_formatter = logging.Formatter()
+
+    def prepare(self, record):
+        # Merge now: the args may be mutated, and the traceback keeps frames
+        # alive, by the time the listener thread gets to the record
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = self._exc_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def _parse_overrides(value, convert):
+    overrides = {}
+    for item in filter(None, (part.strip() for part in (value or "").split(","))):
+        name, _, setting = item.partition("=")
+        overrides[name.strip()] = convert(setting.strip())
+    return overrides
+
+
+def configure_logging(level=logging.INFO, levels=None, sample_rates=None,
+                      log_file='discord.log', console=True):
+    """
+    Configures logging for the whole bot. Safe to call more than once; only
+    the first call has an effect.
+
+    All records go through a queue to a background listener thread that does
+    the formatting and the console/file I/O.
+
+    Args:
+        level: Level for the root logger
+        levels: Per-logger levels, merged over DEFAULT_LEVELS
+        sample_rates: Per-logger sample rates, merged over DEFAULT_SAMPLE_RATES
+        log_file: Path of the log file, or None to disable file output
+        console: Whether to also log to stderr
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    levels = {**DEFAULT_LEVELS, **(levels or {}),
+              **_parse_overrides(os.environ.get("MODBOT_LOG_LEVELS"), str.upper)}
+    sample_rates = {**DEFAULT_SAMPLE_RATES, **(sample_rates or {}),
+                    **_parse_overrides(os.environ.get("MODBOT_LOG_SAMPLE"), float)}
+
+    formatter = StructuredFormatter()
+    handlers = []
+    if console:
+        handlers.append(logging.StreamHandler())
+    if log_file:
+        handlers.append(logging.FileHandler(filename=log_file, encoding='utf-8', mode='w'))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = _DeferredQueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter(sample_rates))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+    for name, logger_level in levels.items():
+        logging.getLogger(name).setLevel(logger_level)
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
@@ -0,0 +1,205 @@
+# memory_monitor.py
+import asyncio
+import logging
+import os
+import time
+import tracemalloc
+
+from metrics import REGISTRY
+
+logger = logging.getLogger('modbot.memory')
+
+# Resident memory the bot is expected to stay under; override with MODBOT_MEMORY_BUDGET_MB
+MEMORY_BUDGET_MB = 512
+
+# Fraction of the budget at which allocation tracing starts and moderators are warned
+WARN_FRACTION = 0.8
+
+# Seconds between memory checks
+CHECK_INTERVAL = 60
+
+# Further RSS growth, as a fraction of the budget, that triggers another report while over the warning level
+REPORT_GROWTH = 0.1
+
+# Frames kept per traced allocation, and allocation sites listed per report
+TRACE_FRAMES = 1
+TOP_N = 10
+
+OK, WARN, CRITICAL = 0, 1, 2
+LEVEL_NAMES = {OK: "ok", WARN: "warning", CRITICAL: "over budget"}
+
+
+def rss_bytes():
+    """Resident set size of this process, or 0 where /proc is unavailable."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return 0
+
+
+def trim_oldest(mapping, keep):
+    """Drops the earliest-inserted entries of a dict until `keep` remain. Returns the number dropped."""
+    excess = len(mapping) - keep
+    for key in list(mapping)[:max(0, excess)]:
+        del mapping[key]
+    return max(0, excess)
+
+
+def _mb(size):
+    if abs(size) < 2**20:
+        return f"{size / 2**10:.0f} KiB"
+    return f"{size / 2**20:.1f} MB"
+
+
+class MemoryMonitor:
+    """
+    Watches the bot's RSS against a budget and the sizes of its in-memory state.
+
+    `states` maps a name to a function returning that state's entry count.
+    When RSS first passes WARN_FRACTION of the budget (or grows another
+    REPORT_GROWTH while over it), tracemalloc starts and a baseline snapshot
+    is taken; the next check sends `post` a summary of state sizes and the
+    allocation sites that grew most since the baseline, then stops tracing
+    again. Over the budget, `evict` (if given) is called straight away to
+    trim state; it returns {state: entries dropped}. Snapshots are taken on
+    a worker thread.
+    """
+    def __init__(self, states, post=None, evict=None, budget_bytes=MEMORY_BUDGET_MB * 2**20,
+                 interval=CHECK_INTERVAL):
+        self.states = states
+        self.post = post
+        self.evict = evict
+        self.budget_bytes = budget_bytes
+        self.interval = interval
+        self.level = OK
+        self.last_report_rss = 0
+        self.baseline = None  # tracemalloc snapshot taken when tracing started
+        self.traced_since = None
+        self._task = None
+        REGISTRY.gauge("modbot_rss_bytes", "Resident memory of the bot process", rss_bytes)
+        REGISTRY.gauge("modbot_memory_budget_bytes", "Resident memory budget", lambda: self.budget_bytes)
+
+    @classmethod
+    def from_env(cls, states, post=None, evict=None):
+        """
+        Builds a monitor from MODBOT_MEMORY_BUDGET_MB and MODBOT_MEMORY_EVICT
+        ("1" trims state when over budget; otherwise moderators are only told).
+        """
+        budget_mb = float(os.environ.get("MODBOT_MEMORY_BUDGET_MB", MEMORY_BUDGET_MB))
+        return cls(
+            states,
+            post=post,
+            evict=evict if os.environ.get("MODBOT_MEMORY_EVICT") == "1" else None,
+            budget_bytes=int(budget_mb * 2**20)
+        )
+
+    def start(self):
+        """Starts checking every `interval` seconds on the running event loop."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._check_periodically())
+
+    async def _check_periodically(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.check()
+            except Exception as e:
+                logger.error("Memory check failed: %s", e, exc_info=True)
+
+    def state_sizes(self):
+        sizes = {}
+        for name, size in self.states.items():
+            try:
+                sizes[name] = size()
+            except Exception as e:
+                logger.debug("Could not size %s: %s", name, e)
+        return sizes
+
+    def level_for(self, rss):
+        if rss >= self.budget_bytes:
+            return CRITICAL
+        if rss >= self.budget_bytes * WARN_FRACTION:
+            return WARN
+        return OK
+
+    async def start_tracing(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACE_FRAMES)
+        self.baseline = await asyncio.to_thread(tracemalloc.take_snapshot)
+        self.traced_since = time.time()
+        logger.info("Started allocation tracing")
+
+    def stop_tracing(self):
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self.baseline = None
+        self.traced_since = None
+
+    async def top_allocations(self, limit=TOP_N):
+        """The allocation sites that grew most since the baseline, as (site, bytes, blocks)."""
+        baseline = self.baseline
+        if baseline is None or not tracemalloc.is_tracing():
+            return []
+        return await asyncio.to_thread(self._diff, baseline, limit)
+
+    @staticmethod
+    def _diff(baseline, limit):
+        ignore = (tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, "<frozen *>"))
+        snapshot = tracemalloc.take_snapshot().filter_traces(ignore)
+        sites = []
+        for stat in snapshot.compare_to(baseline.filter_traces(ignore), 'lineno')[:limit]:
+            frame = stat.traceback[0]
+            sites.append((f"{os.path.basename(frame.filename)}:{frame.lineno}", stat.size_diff, stat.count_diff))
+        return sites
+
+    async def check(self):
+        """Samples RSS and, when a threshold is newly crossed or RSS keeps growing, reports and evicts."""
+        rss = rss_bytes()
+        level = self.level_for(rss)
+        if level == OK:
+            if self.level != OK:
+                logger.info("Memory back under the warning level: %s", _mb(rss))
+            self.stop_tracing()
+            self.level = OK
+            self.last_report_rss = 0
+            return None
+
+        grown = rss >= self.last_report_rss + self.budget_bytes * REPORT_GROWTH
+        if level <= self.level and not grown:
+            return None
+        if self.baseline is None and level != CRITICAL:
+            # Report once allocations have been traced for an interval, so the diff has something in it
+            await self.start_tracing()
+            return None
+
+        self.level = level
+        evicted = self.evict() if level == CRITICAL and self.evict else None
+        self.last_report_rss = rss_bytes() if evicted else rss
+        summary = await self.summary(rss, evicted)
+        self.stop_tracing()  # Tracing slows every allocation; it restarts if RSS grows again
+        logger.warning("Memory %s: %s of %s budget", LEVEL_NAMES[level], _mb(rss), _mb(self.budget_bytes))
+        if self.post:
+            await self.post(summary)
+        return summary
+
+    async def summary(self, rss=None, evicted=None):
+        """A plain-text report of memory use, state sizes and top allocation sites."""
+        rss = rss_bytes() if rss is None else rss
+        lines = [
+            f"**Memory** ({LEVEL_NAMES[self.level_for(rss)]}): RSS {_mb(rss)} of {_mb(self.budget_bytes)} "
+            f"budget ({rss / self.budget_bytes:.0%})",
+            "**State** (entries)"
+        ]
+        for name, size in self.state_sizes().items():
+            lines.append(f"• {name}: {size}")
+        sites = await self.top_allocations()
+        if sites:
+            since = time.strftime('%H:%M UTC', time.gmtime(self.traced_since))
+            lines.append(f"**Top allocation sites** (growth since {since})")
+        for site, size, count in sites:
+            lines.append(f"• {site}: {'+' if size >= 0 else '-'}{_mb(abs(size))} ({count:+} blocks)")
+        dropped = [f"{name} {count}" for name, count in (evicted or {}).items() if count]
+        if dropped:
+            lines.append("**Evicted** (entries) " + ", ".join(dropped))
+        return "\n".join(lines)
@@ -0,0 +1,274 @@
+# metrics.py
+import bisect
+import logging
+import time
+
+logger = logging.getLogger('modbot.metrics')
+
+# Local port for the Prometheus text endpoint; override with MODBOT_METRICS_PORT ("0" disables)
+METRICS_PORT = 9152
+
+# Latency bucket upper bounds in seconds, from sub-millisecond regex scans to slow API calls
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self.values = {}  # Map from label key to count
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def get(self, **labels):
+        return self.values.get(_label_key(labels), 0)
+
+    def render(self):
+        for key, value in self.values.items():
+            yield f"{self.name}{_format_labels(key)} {value}"
+
+
+class Gauge:
+    """A value set directly, or read from `func` at scrape time."""
+    kind = "gauge"
+
+    def __init__(self, name, help_text, func=None):
+        self.name = name
+        self.help = help_text
+        self.func = func
+        self.values = {}
+
+    def set(self, value, **labels):
+        self.values[_label_key(labels)] = value
+
+    def render(self):
+        if self.func:
+            try:
+                yield f"{self.name} {self.func()}"
+            except Exception as e:
+                logger.debug("Gauge %s failed: %s", self.name, e)
+            return
+        for key, value in self.values.items():
+            yield f"{self.name}{_format_labels(key)} {value}"
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help_text, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self.series = {}  # Map from label key to [bucket counts..., +Inf count, sum]
+
+    def observe(self, value, **labels):
+        self._observe(_label_key(labels), value)
+
+    def _observe(self, key, value):
+        series = self.series.get(key)
+        if series is None:
+            series = self.series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def time(self, **labels):
+        """Observes the duration of the `with` block, including when it raises."""
+        return _Timer(self, _label_key(labels))
+
+    def count(self, **labels):
+        series = self.series.get(_label_key(labels))
+        return sum(series[:-1]) if series else 0
+
+    def quantile(self, q, **labels):
+        """Estimates a quantile by interpolating within buckets, as Prometheus does."""
+        series = self.series.get(_label_key(labels))
+        if not series:
+            return 0.0
+        counts = series[:-1]
+        rank = q * sum(counts)
+        seen = 0
+        for i, count in enumerate(counts):
+            if seen + count >= rank and count:
+                if i == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[i - 1] if i else 0.0
+                return lower + (self.buckets[i] - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+    def render(self):
+        for key, series in self.series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), series[:-1]):
+                cumulative += count
+                le = "+Inf" if bound == float('inf') else repr(bound)
+                yield f"{self.name}_bucket{_format_labels(key, [('le', le)])} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(key)} {series[-1]}"
+            yield f"{self.name}_count{_format_labels(key)} {cumulative}"
+
+
+class _Timer:
+    """Context manager for Histogram.time; a plain class allocates less than a generator on hot paths."""
+    __slots__ = ('histogram', 'key', 'start')
+
+    def __init__(self, histogram, key):
+        self.histogram = histogram
+        self.key = key
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        self.histogram._observe(self.key, time.perf_counter() - self.start)
+        return False
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}  # Map from metric name to metric, in registration order
+
+    def _register(self, metric):
+        # Registering twice returns the existing metric, so modules can declare what they use
+        return self.metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, help_text):
+        return self._register(Counter(name, help_text))
+
+    def gauge(self, name, help_text, func=None):
+        gauge = self._register(Gauge(name, help_text))
+        if func:
+            gauge.func = func
+        return gauge
+
+    def histogram(self, name, help_text, buckets=LATENCY_BUCKETS):
+        return self._register(Histogram(name, help_text, buckets))
+
+    def render(self):
+        """The Prometheus text exposition format of every metric."""
+        lines = []
+        for metric in self.metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "modbot_stage_seconds", "Time spent in each stage of message handling")
+MESSAGES = REGISTRY.counter(
+    "modbot_messages_total", "Monitored messages handled, by outcome")
+CLASSIFIER_REQUESTS = REGISTRY.counter(
+    "modbot_classifier_requests_total", "Classification requests by caller and result (ok, error, cache_hit, capped)")
+DB_SECONDS = REGISTRY.histogram(
+    "modbot_db_seconds", "Database round trip time by operation")
+DB_ERRORS = REGISTRY.counter(
+    "modbot_db_errors_total", "Failed database operations by operation")
+MOD_ACTIONS = REGISTRY.counter(
+    "modbot_mod_actions_total", "Moderator actions by action and result (ok, partial)")
+LLM_TOKENS = REGISTRY.counter(
+    "modbot_llm_tokens_total", "LLM tokens billed by caller, method and kind (prompt, completion)")
+LLM_COST = REGISTRY.counter(
+    "modbot_llm_cost_usd_total", "Estimated LLM spend in USD by caller and method")
+LLM_CAPPED = REGISTRY.counter(
+    "modbot_llm_capped_total", "LLM calls a guild spend cap downgraded or skipped, by action")
+
+
+def stats_summary(registry=REGISTRY):
+    """A short plain-text digest of the registry for the `.stats` mod command."""
+    lines = ["**Stage latency** (p50 / p95, count)"]
+    for key in sorted(STAGE_SECONDS.series):
+        labels = dict(key)
+        lines.append(
+            f"• {labels.get('stage')}: {STAGE_SECONDS.quantile(0.5, **labels) * 1000:.0f} ms / "
+            f"{STAGE_SECONDS.quantile(0.95, **labels) * 1000:.0f} ms, {STAGE_SECONDS.count(**labels)}"
+        )
+
+    callers = sorted({dict(key).get('caller') for key in CLASSIFIER_REQUESTS.values})
+    if callers:
+        lines.append("**Classifier** (cache hit rate, error rate)")
+    for caller in callers:
+        ok = CLASSIFIER_REQUESTS.get(caller=caller, result="ok")
+        errors = CLASSIFIER_REQUESTS.get(caller=caller, result="error")
+        hits = CLASSIFIER_REQUESTS.get(caller=caller, result="cache_hit")
+        capped = CLASSIFIER_REQUESTS.get(caller=caller, result="capped")
+        total = ok + errors + hits + capped
+        api_calls = ok + errors
+        lines.append(
+            f"• {caller}: {hits / total:.0%} cached, "
+            f"{errors / api_calls if api_calls else 0:.0%} errors of {api_calls} API calls"
+            + (f", {capped} skipped by spend caps" if capped else "")
+        )
+
+    usage = sorted({(dict(key).get('caller'), dict(key).get('method')) for key in LLM_COST.values})
+    if usage:
+        lines.append("**LLM usage** (tokens, estimated cost)")
+    for caller, method in usage:
+        prompt = LLM_TOKENS.get(caller=caller, method=method, kind="prompt")
+        completion = LLM_TOKENS.get(caller=caller, method=method, kind="completion")
+        lines.append(
+            f"• {caller} / {method}: {prompt} + {completion} tokens, "
+            f"${LLM_COST.get(caller=caller, method=method):.4f}"
+        )
+    capped = sorted(dict(key).get('action') for key in LLM_CAPPED.values)
+    if capped:
+        lines.append("• spend caps: " + ", ".join(f"{LLM_CAPPED.get(action=a)} {a}" for a in capped))
+
+    db_operations = sorted({dict(key).get('operation') for key in DB_SECONDS.series})
+    if db_operations:
+        lines.append("**Database** (p95, errors)")
+    for operation in db_operations:
+        lines.append(
+            f"• {operation}: {DB_SECONDS.quantile(0.95, operation=operation) * 1000:.0f} ms, "
+            f"{DB_ERRORS.get(operation=operation)} of {DB_SECONDS.count(operation=operation)} failed"
+        )
+
+    gauges = [m for m in registry.metrics.values() if m.kind == "gauge"]
+    if gauges:
+        lines.append("**Queues and state**")
+    for gauge in gauges:
+        for line in gauge.render():
+            name, value = line.rsplit(" ", 1)
+            lines.append(f"• {name.replace('modbot_', '')}: {value}")
+    return "\n".join(lines)
+
+
+async def start_metrics_server(port=METRICS_PORT, host="127.0.0.1", registry=REGISTRY):
+    """
+    Serves the registry at http://host:port/metrics. Returns the aiohttp
+    runner (call `cleanup()` to stop), or None if the port is unavailable.
+    """
+    from aiohttp import web
+
+    async def handle(request):
+        return web.Response(text=registry.render(), content_type="text/plain", charset="utf-8")
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle)
+    runner = web.AppRunner(app, access_log=None)  # Scrapes every few seconds would flood the log
+    await runner.setup()
+    try:
+        await web.TCPSite(runner, host, port).start()
+    except OSError as e:
+        logger.warning("Metrics endpoint not started on %s:%s: %s", host, port, e)
+        await runner.cleanup()
+        return None
+    logger.info("Serving metrics on http://%s:%s/metrics", host, port)
+    return runner
@@ -1,64 +1,203 @@
 # moderation.py
 import discord
 from discord.ext import commands
+import asyncio
 import time
+from datetime import timedelta
+from counters import OFFENSES, SUSPENSIONS, FALSE_REPORTS, WARNINGS, CounterError
+from channel_index import ESCALATION
+from actions import ActionExecutor
+from metrics import STAGE_SECONDS, MOD_ACTIONS
+from tracing import span, current_trace_id
+
+# Seconds to wait before editing a report card, so a burst of reports on the
+# same message results in a single edit
+REPORT_CARD_EDIT_DELAY = 5.0
+# Maximum number of reporter names listed on a report card
+MAX_LISTED_REPORTERS = 10
+# Discord's bulk-delete endpoint takes at most 100 messages, none older than 14 days
+BULK_DELETE_BATCH_SIZE = 100
+BULK_DELETE_MAX_AGE = timedelta(days=14)
+# Actions that close a report; later reports of the same message start a new card
+RESOLVING_ACTIONS = {"ban", "suspend", "warn", "dismiss"}
 
 class Moderation(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.report_cards = {}  # Map from reported message IDs to their aggregated user-report card
+        self.actions = ActionExecutor()  # Runs the side effects of moderator actions
 
     async def send_actionable_report_to_mods(self, guild_id, reported_message, reporter, reason, report_count=1, is_user_report=True):
         if guild_id in self.bot.mod_channels:
-            if is_user_report:
-                reporter_text = f"from {reporter.name} via DM"
-                reporter_id = reporter.id
-            else:
-                reporter_text = "from automatic detection"
-                reporter_id = None
-            
-            reported_user_offenses = self.bot.user_offense_counts.get(reported_message.author.id, 0)
-            reported_user_suspensions = self.bot.user_suspension_counts.get(reported_message.author.id, 0)
-            reporter_offenses = self.bot.user_offense_counts.get(reporter_id, 0) if reporter_id else 0
-            reporter_suspensions = self.bot.user_suspension_counts.get(reporter_id, 0) if reporter_id else 0
-            reporter_mistakes = self.bot.number_of_false_reports.get(reporter_id, 0) if reporter_id else 0
+            with STAGE_SECONDS.time(stage="mod_post"), span("send_actionable_report_to_mods", is_user_report=is_user_report):
+                mod_message = await self.bot.mod_channels[guild_id].send(
+                    await self.format_report_card(guild_id, reported_message, reporter, reason, report_count, is_user_report)
+                )
                 
-            mod_message = await self.bot.mod_channels[guild_id].send(
-                f'New report {reporter_text}:\n'
-                f'Reason: {reason}\n'
-                f'Message: {reported_message.author.name}: "{reported_message.content}"\n'
-                f'This message has been reported {report_count} time(s).\n\n'
-                f'**Offense counts**:\n'
-                f'• Reported User ({reported_message.author.name}): {reported_user_suspensions} suspensions(s)\n'
-                f'• Reported User ({reported_message.author.name}): {reported_user_offenses} warning(s)\n\n'
-                f'• Reporter ({reporter.name if is_user_report else "AutoMod"}): {reporter_suspensions} suspension(s)\n'
-                f'• Reporter ({reporter.name if is_user_report else "AutoMod"}): {reporter_offenses} warning(s)\n'
-                f'• Reporter ({reporter.name if is_user_report else "AutoMod"}): {reporter_mistakes} incorrect reports\n\n'
-                f'\n**Moderation Options:**\n'
-                f'• Reply with "Ban" to ban the reported user\n'
-                f'• Reply with "Suspend" to suspend the reported user\n'
-                f'• Reply with "Warn" to warn the reported user\n'
-                f'• Reply with "Ban Reporter" to ban the reporter\n'
-                f'• Reply with "Suspend Reporter" to suspend the reporter\n'
-                f'• Reply with "Warn Reporter" to warn the reporter\n'
-                f'• React with ⏫ for standard escalation\n'
-                f'• React with 🚔 for law enforcement escalation\n'
-                f'• Reply with "Dismiss" to dismiss report\n'
-            )
-            
-            await mod_message.add_reaction('⏫')
-            await mod_message.add_reaction('🚔')
+                await mod_message.add_reaction('⏫')
+                await mod_message.add_reaction('🚔')
             
             self.bot.mod_reports[mod_message.id] = {
                 'reported_message': reported_message,
                 'reporter': reporter,
                 'reason': reason,
                 'report_count': report_count,
-                'is_user_report': is_user_report
+                'is_user_report': is_user_report,
+                'trace_id': current_trace_id()  # Moderator actions on the card continue this trace
             }
             
             return mod_message
         return None
 
+    async def format_report_card(self, guild_id, reported_message, reporter, reason, report_count=1, is_user_report=True, reporters=None):
+        """
+        Builds the text of an actionable report. `reporters` lists everyone who
+        reported the message when several user reports were aggregated.
+        """
+        if is_user_report:
+            reporter_text = f"from {reporter.name} via DM"
+            reporter_id = reporter.id
+        else:
+            reporter_text = "from automatic detection"
+            reporter_id = None
+        
+        counters = self.bot.counters
+        try:
+            reported_user_offenses = await counters.get_count(reported_message.author.id, guild_id, OFFENSES)
+            reported_user_warnings = await counters.get_count(reported_message.author.id, guild_id, WARNINGS)
+            reported_user_suspensions = await counters.get_count(reported_message.author.id, guild_id, SUSPENSIONS)
+            reporter_offenses = await counters.get_count(reporter_id, guild_id, OFFENSES)
+            reporter_warnings = await counters.get_count(reporter_id, guild_id, WARNINGS)
+            reporter_suspensions = await counters.get_count(reporter_id, guild_id, SUSPENSIONS)
+            reporter_mistakes = await counters.get_count(reporter_id, guild_id, FALSE_REPORTS)
+        except CounterError:
+            # Show the card without history rather than with misleading zeros
+            reported_user_offenses = reported_user_warnings = reported_user_suspensions = "?"
+            reporter_offenses = reporter_warnings = reporter_suspensions = reporter_mistakes = "?"
+        
+        reporters_text = ''
+        if reporters and len(reporters) > 1:
+            names = ', '.join(r.name for r in reporters[:MAX_LISTED_REPORTERS])
+            if len(reporters) > MAX_LISTED_REPORTERS:
+                names += f' (+{len(reporters) - MAX_LISTED_REPORTERS} more)'
+            reporters_text = f'Reported by: {names}\n'
+            
+        return (
+            f'New report {reporter_text}:\n'
+            f'Reason: {reason}\n'
+            f'Message: {reported_message.author.name}: "{reported_message.content}"\n'
+            f'This message has been reported {report_count} time(s).\n'
+            f'{reporters_text}\n'
+            f'**Offense counts**:\n'
+            f'• Reported User ({reported_message.author.name}): {reported_user_suspensions} suspensions(s)\n'
+            f'• Reported User ({reported_message.author.name}): {reported_user_warnings} warning(s)\n'
+            f'• Reported User ({reported_message.author.name}): {reported_user_offenses} flagged offense(s)\n\n'
+            f'• Reporter ({reporter.name if is_user_report else "AutoMod"}): {reporter_suspensions} suspension(s)\n'
+            f'• Reporter ({reporter.name if is_user_report else "AutoMod"}): {reporter_warnings} warning(s)\n'
+            f'• Reporter ({reporter.name if is_user_report else "AutoMod"}): {reporter_offenses} flagged offense(s)\n'
+            f'• Reporter ({reporter.name if is_user_report else "AutoMod"}): {reporter_mistakes} incorrect reports\n\n'
+            f'\n**Moderation Options:**\n'
+            f'• Reply with "Ban" to ban the reported user\n'
+            f'• Reply with "Suspend" to suspend the reported user\n'
+            f'• Reply with "Warn" to warn the reported user\n'
+            f'• Reply with "Purge" to delete all recent flagged messages of the reported user\n'
+            f'• Reply with "Ban Reporter" to ban the reporter\n'
+            f'• Reply with "Suspend Reporter" to suspend the reporter\n'
+            f'• Reply with "Warn Reporter" to warn the reporter\n'
+            f'• React with ⏫ for standard escalation\n'
+            f'• React with 🚔 for law enforcement escalation\n'
+            f'• Reply with "Dismiss" to dismiss report\n'
+        )
+
+    async def aggregate_user_report(self, guild_id, reported_message, reporter, reason):
+        """
+        Routes a completed user report to the mod channel, keeping one card per
+        reported message. The first report posts the card; later ones bump its
+        count and reporter list, which is edited in place after a short delay.
+        """
+        card = self.report_cards.get(reported_message.id)
+        if card is None:
+            card = {
+                'guild_id': guild_id,
+                'reported_message': reported_message,
+                'reason': reason,
+                'reporters': [reporter],
+                'mod_message': None,
+                'edit_task': None
+            }
+            self.report_cards[reported_message.id] = card
+            try:
+                card['mod_message'] = await self.send_actionable_report_to_mods(
+                    guild_id, reported_message, reporter, reason, 1, is_user_report=True
+                )
+            finally:
+                if card['mod_message'] is None:
+                    self.report_cards.pop(reported_message.id, None)
+            # Reports that arrived while the card was being posted
+            if len(card['reporters']) > 1:
+                self._schedule_card_edit(reported_message.id)
+            return card['mod_message']
+        
+        if all(r.id != reporter.id for r in card['reporters']):
+            card['reporters'].append(reporter)
+        if card['mod_message']:
+            # The card's mod_reports entry may already have been evicted; the edit still goes out
+            report_info = self.bot.mod_reports.get(card['mod_message'].id)
+            if report_info:
+                report_info['report_count'] = len(card['reporters'])
+            self._schedule_card_edit(reported_message.id)
+        return card['mod_message']
+
+    def _schedule_card_edit(self, reported_message_id):
+        card = self.report_cards[reported_message_id]
+        if card['edit_task'] is None or card['edit_task'].done():
+            card['edit_task'] = asyncio.create_task(self._edit_report_card(reported_message_id))
+
+    async def _edit_report_card(self, reported_message_id):
+        while True:
+            await asyncio.sleep(REPORT_CARD_EDIT_DELAY)
+            card = self.report_cards.get(reported_message_id)
+            if not card or not card['mod_message']:
+                return
+            rendered = len(card['reporters'])
+            report_info = self.bot.mod_reports.get(card['mod_message'].id)
+            if report_info:
+                report_info['report_count'] = rendered
+            content = await self.format_report_card(
+                card['guild_id'], card['reported_message'], card['reporters'][0], card['reason'],
+                rendered, is_user_report=True, reporters=list(card['reporters'])
+            )
+            try:
+                await card['mod_message'].edit(content=content)
+            except discord.NotFound:
+                # The card was deleted; the next report posts a fresh one
+                self.report_cards.pop(reported_message_id, None)
+                return
+            # Reports that arrived while editing found this task still running and
+            # scheduled nothing, so go round again to show them
+            if len(card['reporters']) == rendered:
+                return
+
+    def drop_stale_cards(self):
+        """
+        Forgets aggregated report cards whose mod message is no longer in
+        bot.mod_reports and that have no edit pending. Returns the number dropped.
+        """
+        stale = [
+            message_id for message_id, card in self.report_cards.items()
+            if card['mod_message'] and card['mod_message'].id not in self.bot.mod_reports
+            and (card['edit_task'] is None or card['edit_task'].done())
+        ]
+        for message_id in stale:
+            del self.report_cards[message_id]
+        return len(stale)
+
+    def close_report_card(self, reported_message_id):
+        """Forgets the aggregated card for a reported message once a moderator has resolved it."""
+        card = self.report_cards.pop(reported_message_id, None)
+        if card and card['edit_task'] and not card['edit_task'].done():
+            card['edit_task'].cancel()
+
     async def escalate_report(self, original_message_id, report_info, escalated_by, guild):
         if original_message_id in self.bot.escalated_reports:
             return
@@ -83,12 +222,7 @@ class Moderation(commands.Cog):
             f"• React with 🚔 to escalate to law enforcement"
         )
         
-        escalation_channel = None
-        
-        for channel in guild.text_channels:
-            if channel.name == f'group-{self.bot.group_num}-escalation':
-                escalation_channel = channel
-                break
+        escalation_channel = self.bot.channel_index.channel(guild.id, ESCALATION)
         
         if not escalation_channel:
             escalation_channel = self.bot.mod_channels[guild.id]
@@ -119,6 +253,10 @@ class Moderation(commands.Cog):
         self.bot.law_enforcement_reports[reference_id] = escalation_record
         
         reported_msg = report_info['reported_message']
+        try:
+            previous_violations = await self.bot.counters.get_count(reported_msg.author.id, guild.id)
+        except CounterError:
+            previous_violations = "unknown"
         
         le_notification = (
             f"🚨🚔 **LAW ENFORCEMENT ESCALATION** 🚔🚨\n"
@@ -133,7 +271,7 @@ class Moderation(commands.Cog):
             f"• **Server**: {guild.name} (ID: `{guild.id}`)\n"
             f"• **Original Report**: {report_info['reason']}\n"
             f"• **Message Timestamp**: {reported_msg.created_at.strftime('%Y-%m-%d %H:%M:%S UTC')}\n"
-            f"• **User Offense History**: {self.bot.user_offense_counts.get(reported_msg.author.id, 0)} previous violations\n\n"
+            f"• **User Offense History**: {previous_violations} previous violations\n\n"
             
             f"**NEXT STEPS FOR MODERATORS**:\n"
             f"1. **Contact local law enforcement** if this involves immediate danger\n"
@@ -158,106 +296,217 @@ class Moderation(commands.Cog):
         
         return reference_id
 
-    async def execute_ban(self, reported_user, reported_info, mod_message):
+    async def record_action(self, user, reported_info, infraction_type, reason):
+        """Records a moderator action against a user through the shared counter service."""
+        reported_message = reported_info['reported_message']
+        await self.bot.counters.record_infraction(
+            user_id=user.id,
+            guild_id=reported_message.guild.id,
+            infraction_type=infraction_type,
+            user_name=user.name,
+            reason=reason,
+            message_content=reported_message.content,
+            channel_id=reported_message.channel.id,
+            message_id=reported_message.id,
+            detected_by="moderator"
+        )
+
+    async def run_action(self, action, target, reported_info, mod_message, steps, confirmation, escalated_confirmation):
+        """
+        Runs an action's side effects concurrently through the action executor
+        and posts one consolidated outcome to the channel the moderator used.
+        """
+        action_key = f"{reported_info['reported_message'].id}:{action}:{target.id}"
+        with span("mod_action", action=action, target_id=target.id) as traced:
+            outcome = await self.actions.run(action_key, steps)
+            if traced:
+                traced.set(ok=outcome.ok)
+        MOD_ACTIONS.inc(action=action, result="ok" if outcome.ok else "partial")
+        if action in RESOLVING_ACTIONS and outcome.ok:
+            self.close_report_card(reported_info['reported_message'].id)
+        
+        status = escalated_confirmation if reported_info.get('is_escalated') else confirmation
+        if outcome.ok:
+            text = f"✅ {status}"
+        elif outcome.succeeded or outcome.skipped:
+            text = f"⚠️ {status} (partially completed)"
+        else:
+            text = f"❌ Could not complete action against {target.name}."
+        if outcome.summary():
+            text += f"\n{outcome.summary()}"
+        await mod_message.channel.send(text)
+        return outcome
+
+    def _notify_reporter_step(self, reported_info, text):
+        """Step that DMs the original reporter, or None for automod reports."""
+        if isinstance(reported_info['reporter'], discord.Member):
+            return lambda: reported_info['reporter'].send(text)
+        return None
+
+    async def _delete_reported_message(self, reported_info):
         try:
-            await reported_user.send(f"⛔ You have been banned for: {reported_info['reason']}")
             await reported_info['reported_message'].delete()
-            
-            if reported_info.get('is_escalated'):
-                await mod_message.channel.send(f"✅ **ESCALATED REPORT RESOLVED** - Ban executed on {reported_user.name} by senior moderator.")
-            else:
-                await mod_message.channel.send(f"✅ Simulated ban message sent to {reported_user.name}.")
-                
-            if isinstance(reported_info['reporter'], discord.Member):
-                await reported_info['reporter'].send(f"The user you reported has been banned. Thank you for helping keep our community safe!")
-        except discord.Forbidden:
-            await mod_message.channel.send("❌ I couldn't send a message to that user (they may have DMs disabled).")
+        except discord.NotFound:
+            pass  # Already deleted
+
+    async def execute_ban(self, reported_user, reported_info, mod_message):
+        steps = {
+            "notify user": lambda: reported_user.send(f"⛔ You have been banned for: {reported_info['reason']}"),
+            "delete message": lambda: self._delete_reported_message(reported_info),
+            "notify reporter": self._notify_reporter_step(reported_info, "The user you reported has been banned. Thank you for helping keep our community safe!")
+        }
+        await self.run_action(
+            "ban", reported_user, reported_info, mod_message,
+            {name: step for name, step in steps.items() if step},
+            f"Simulated ban message sent to {reported_user.name}.",
+            f"**ESCALATED REPORT RESOLVED** - Ban executed on {reported_user.name} by senior moderator."
+        )
     
     async def execute_suspend(self, reported_user, reported_info, mod_message):
-        try:
-            await reported_user.send(f"⚠️ You have received a warning for: {reported_info['reason']}. If this happens 3 times you will be banned.")
-            await reported_info['reported_message'].delete()
-
-            self.bot.user_suspension_counts[reported_user.id] = self.bot.user_suspension_counts.get(reported_user.id, 0) + 1
-            
-            if reported_info.get('is_escalated'):
-                await mod_message.channel.send(f"✅ **ESCALATED REPORT RESOLVED** - Warning sent to {reported_user.name} by senior moderator.")
-            else:
-                await mod_message.channel.send(f"✅ Warning sent to {reported_user.name}.")
-                
-            if isinstance(reported_info['reporter'], discord.Member):
-                await reported_info['reporter'].send(f"The user you reported has been warned. Thank you for helping keep our community safe!")
-        except discord.Forbidden:
-            await mod_message.channel.send("❌ I couldn't send a warning to that user (they may have DMs disabled).")
+        steps = {
+            "notify user": lambda: reported_user.send(f"⚠️ You have received a warning for: {reported_info['reason']}. If this happens 3 times you will be banned."),
+            "delete message": lambda: self._delete_reported_message(reported_info),
+            "record suspension": lambda: self.record_action(reported_user, reported_info, "suspension", reported_info['reason']),
+            "notify reporter": self._notify_reporter_step(reported_info, "The user you reported has been warned. Thank you for helping keep our community safe!")
+        }
+        await self.run_action(
+            "suspend", reported_user, reported_info, mod_message,
+            {name: step for name, step in steps.items() if step},
+            f"Warning sent to {reported_user.name}.",
+            f"**ESCALATED REPORT RESOLVED** - Warning sent to {reported_user.name} by senior moderator."
+        )
 
 
     async def execute_warn(self, reported_user, reported_info, mod_message):
-        try:
-            await reported_user.send(f"⚠️ You have received a warning for: {reported_info['reason']}. If this happens 3 times you will be suspended.")
-            await reported_info['reported_message'].delete()
-
-            self.bot.user_offense_counts[reported_user.id] = self.bot.user_offense_counts.get(reported_user.id, 0) + 1
-            
-            if reported_info.get('is_escalated'):
-                await mod_message.channel.send(f"✅ **ESCALATED REPORT RESOLVED** - Warning sent to {reported_user.name} by senior moderator.")
-            else:
-                await mod_message.channel.send(f"✅ Warning sent to {reported_user.name}.")
-                
-            if isinstance(reported_info['reporter'], discord.Member):
-                await reported_info['reporter'].send(f"The user you reported has been warned. Thank you for helping keep our community safe!")
-        except discord.Forbidden:
-            await mod_message.channel.send("❌ I couldn't send a warning to that user (they may have DMs disabled).")
+        steps = {
+            "notify user": lambda: reported_user.send(f"⚠️ You have received a warning for: {reported_info['reason']}. If this happens 3 times you will be suspended."),
+            "delete message": lambda: self._delete_reported_message(reported_info),
+            "record warning": lambda: self.record_action(reported_user, reported_info, "warning", reported_info['reason']),
+            "notify reporter": self._notify_reporter_step(reported_info, "The user you reported has been warned. Thank you for helping keep our community safe!")
+        }
+        await self.run_action(
+            "warn", reported_user, reported_info, mod_message,
+            {name: step for name, step in steps.items() if step},
+            f"Warning sent to {reported_user.name}.",
+            f"**ESCALATED REPORT RESOLVED** - Warning sent to {reported_user.name} by senior moderator."
+        )
 
     async def dismiss_report(self, reporter, reported_info, mod_message):
-        print('here')
-        await mod_message.channel.send(f"✅ **ESCALATED REPORT DISMISSED** - No action taken after senior review.")
-        print('here2')
-        self.bot.number_of_false_reports[reporter.id] = self.bot.number_of_false_reports.get(reporter.id, 0) + 1
-        
-        if reported_info.get('is_user_report') and isinstance(reported_info['reporter'], discord.Member):
-            await reported_info['reporter'].send(f"Thank you for your report. After review, no action was deemed necessary, but we appreciate your vigilance in keeping our community safe.")
+        steps = {}
+        if reported_info.get('is_user_report'):
+            steps["record false report"] = lambda: self.record_action(reporter, reported_info, "false_report", "Report dismissed by moderator")
+            notify = self._notify_reporter_step(reported_info, "Thank you for your report. After review, no action was deemed necessary, but we appreciate your vigilance in keeping our community safe.")
+            if notify:
+                steps["notify reporter"] = notify
+        target = reporter if reported_info.get('is_user_report') else reported_info['reported_message'].author
+        await self.run_action(
+            "dismiss", target, reported_info, mod_message, steps,
+            "Report dismissed - no action taken.",
+            "**ESCALATED REPORT DISMISSED** - No action taken after senior review."
+        )
     
 
     async def execute_ban_reporter(self, reporter, reported_info, mod_message):
-        try:
-            await reporter.send(f"⛔ You have been banned for malicious reporting.")
-    
-            if reported_info.get('is_escalated'):
-                await mod_message.channel.send(f"✅ **ESCALATED REPORT RESOLVED** - Ban executed on {reporter.name} by senior moderator.")
-            else:
-                await mod_message.channel.send(f"✅ Simulated ban message sent to {reporter.name}.")
-                
-        except discord.Forbidden:
-            await mod_message.channel.send("❌ I couldn't send a message to that user (they may have DMs disabled).")
+        await self.run_action(
+            "ban_reporter", reporter, reported_info, mod_message,
+            {"notify reporter": lambda: reporter.send(f"⛔ You have been banned for malicious reporting.")},
+            f"Simulated ban message sent to {reporter.name}.",
+            f"**ESCALATED REPORT RESOLVED** - Ban executed on {reporter.name} by senior moderator."
+        )
     
     async def execute_suspend_reporter(self, reporter, reported_info, mod_message):
-        try:
-            await reporter.send(f"⚠️ You have received a suspension for malicious reporting. If this happens again you will be banned.")
-
-            self.bot.user_suspension_counts[reporter.id] = self.bot.user_suspension_counts.get(reporter.id, 0) + 1
-            
-            if reported_info.get('is_escalated'):
-                await mod_message.channel.send(f"✅ **ESCALATED REPORT RESOLVED** - Warning sent to {reporter.name} by senior moderator.")
-            else:
-                await mod_message.channel.send(f"✅ Warning sent to {reporter.name}.")
-                
-        except discord.Forbidden:
-            await mod_message.channel.send("❌ I couldn't send a warning to that user (they may have DMs disabled).")
+        await self.run_action(
+            "suspend_reporter", reporter, reported_info, mod_message,
+            {
+                "notify reporter": lambda: reporter.send(f"⚠️ You have received a suspension for malicious reporting. If this happens again you will be banned."),
+                "record suspension": lambda: self.record_action(reporter, reported_info, "suspension", "Malicious reporting")
+            },
+            f"Warning sent to {reporter.name}.",
+            f"**ESCALATED REPORT RESOLVED** - Warning sent to {reporter.name} by senior moderator."
+        )
 
     async def execute_warn_reporter(self, reporter, reported_info, mod_message):
-        try:
-            await reporter.send(f"⚠️ You have received a warning for malicious reporting. If this happens again you will be suspended.")
+        await self.run_action(
+            "warn_reporter", reporter, reported_info, mod_message,
+            {
+                "notify reporter": lambda: reporter.send(f"⚠️ You have received a warning for malicious reporting. If this happens again you will be suspended."),
+                "record warning": lambda: self.record_action(reporter, reported_info, "warning", "Malicious reporting")
+            },
+            f"Warning sent to {reporter.name}.",
+            f"**ESCALATED REPORT RESOLVED** - Warning sent to {reporter.name} by senior moderator."
+        )
 
-            self.bot.user_offense_counts[reporter.id] = self.bot.user_offense_counts.get(reporter.id, 0) + 1
-            
-            if reported_info.get('is_escalated'):
-                await mod_message.channel.send(f"✅ **ESCALATED REPORT RESOLVED** - Warning sent to {reporter.name} by senior moderator.")
-            else:
-                await mod_message.channel.send(f"✅ Warning sent to {reporter.name}.")
-                
-        except discord.Forbidden:
-            await mod_message.channel.send("❌ I couldn't send a warning to that user (they may have DMs disabled).")
 
+    async def find_flagged_messages(self, guild, user_id):
+        """
+        Collects the IDs of a user's flagged messages in a guild that are
+        still young enough for bulk deletion, from open reports and from the
+        infraction records detection wrote against them.
+
+        Returns:
+            dict: Map from channel ID to a set of message IDs
+        """
+        cutoff = discord.utils.utcnow() - BULK_DELETE_MAX_AGE
+        by_channel = {}
+        
+        for info in self.bot.mod_reports.values():
+            reported_message = info['reported_message']
+            if reported_message.author.id == user_id and reported_message.guild.id == guild.id:
+                by_channel.setdefault(reported_message.channel.id, set()).add(reported_message.id)
+        
+        if self.bot.db:
+            async for row in self.bot.db.iter_user_infractions(
+                user_id, guild.id, columns="message_id,channel_id,detected_by", since=cutoff.isoformat()
+            ):
+                # Moderator actions also record the reporter, against the message
+                # they reported; only rows from detection point at the user's own message
+                if row.get('detected_by') == "moderator":
+                    continue
+                if row.get('message_id') and row.get('channel_id'):
+                    by_channel.setdefault(int(row['channel_id']), set()).add(int(row['message_id']))
+        
+        # Message IDs encode their creation time; drop anything too old to bulk delete
+        for channel_id in list(by_channel):
+            by_channel[channel_id] = {m for m in by_channel[channel_id] if discord.utils.snowflake_time(m) > cutoff}
+            if not by_channel[channel_id]:
+                del by_channel[channel_id]
+        return by_channel
+
+    async def purge_user_messages(self, reported_user, reported_info, mod_message):
+        """
+        Deletes all of a user's recent flagged messages in the guild with
+        Discord's bulk-delete endpoint, one request per channel per 100 messages.
+        """
+        guild = reported_info['reported_message'].guild
+        try:
+            by_channel = await self.find_flagged_messages(guild, reported_user.id)
+        except Exception:
+            await mod_message.channel.send(
+                f"Could not read {reported_user.name}'s infraction history, so nothing was purged. Try again shortly."
+            )
+            return
+        
+        steps = {}
+        total = 0
+        for channel_id, message_ids in by_channel.items():
+            channel = guild.get_channel(channel_id)
+            if channel is None:
+                continue
+            ordered = sorted(message_ids)
+            for start in range(0, len(ordered), BULK_DELETE_BATCH_SIZE):
+                batch = [discord.Object(id=m) for m in ordered[start:start + BULK_DELETE_BATCH_SIZE]]
+                name = f"#{channel.name} {batch[0].id}-{batch[-1].id}"
+                steps[name] = lambda channel=channel, batch=batch: channel.delete_messages(batch)
+                total += len(batch)
+        
+        if not steps:
+            await mod_message.channel.send(f"No recent flagged messages from {reported_user.name} to purge.")
+            return
+        await self.run_action(
+            "purge", reported_user, reported_info, mod_message, steps,
+            f"Purged {total} flagged message(s) from {reported_user.name} across {len(by_channel)} channel(s).",
+            f"**ESCALATED REPORT RESOLVED** - Purged {total} flagged message(s) from {reported_user.name}."
+        )
 
     async def handle_le_escalation_reaction(self, payload, user, guild):
         escalation_record = None
@@ -0,0 +1,161 @@
+# profiler.py
+import asyncio
+import inspect
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+logger = logging.getLogger('modbot.profiler')
+
+# Seconds between stack samples of the event loop thread
+SAMPLE_INTERVAL = 0.005
+
+# Seconds between checks of the loop's tasks and scheduling delay
+WATCH_INTERVAL = 0.05
+
+# Length of a `.profile` run without an argument, and the longest allowed
+DEFAULT_PROFILE_SECONDS = 30
+MAX_PROFILE_SECONDS = 300
+
+# Entries listed per section of the summary
+TOP_N = 8
+
+
+def frame_label(code):
+    """A collapsed-stack frame name: qualified function name and where it is defined."""
+    name = getattr(code, 'co_qualname', code.co_name)
+    return f"{name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def task_label(task):
+    coro = task.get_coro()
+    return getattr(coro, '__qualname__', None) or task.get_name()
+
+
+class SamplingProfiler:
+    """
+    Samples the event loop thread's stack from a background thread, without
+    tracing or restarting anything.
+
+    Results are collapsed stacks ("outer;inner;leaf count" lines, the input
+    format of flamegraph.pl and speedscope) plus a summary of where the loop
+    spent its time: the hottest functions, the coroutines running on the loop
+    when sampled, the tasks that stayed pending longest, and the worst delay
+    in scheduling a callback (time the loop was blocked).
+    """
+    def __init__(self, interval=SAMPLE_INTERVAL, watch_interval=WATCH_INTERVAL):
+        self.interval = interval
+        self.watch_interval = watch_interval
+        self.stacks = Counter()  # Map from collapsed stack to samples
+        self.leaves = Counter()  # Map from innermost frame to samples, when not idle
+        self.coroutines = Counter()  # Map from outermost running coroutine to samples
+        self.samples = 0
+        self.idle = 0  # Samples with the loop waiting in its selector
+        self.task_seconds = {}  # Map from task coroutine name to the longest time one was seen pending
+        self.pending = {}  # Map from task to when it was first seen
+        self.max_stall = 0.0
+        self.duration = 0.0
+        self._stop_sampling = threading.Event()
+        self._stop_requested = asyncio.Event()
+
+    def stop(self):
+        """Ends a run early; `run` returns as soon as it notices."""
+        self._stop_requested.set()
+
+    async def run(self, seconds):
+        """Profiles the running loop for `seconds` (or until `stop`), then returns self."""
+        exclude = {asyncio.current_task()}
+        sampler = threading.Thread(
+            target=self._sample, args=(threading.get_ident(),), name="modbot-profiler", daemon=True
+        )
+        start = time.perf_counter()
+        sampler.start()
+        watcher = asyncio.create_task(self._watch(exclude))
+        stop_requested = asyncio.create_task(self._stop_requested.wait())
+        exclude.update((watcher, stop_requested))
+        try:
+            await asyncio.wait({stop_requested}, timeout=seconds)
+        finally:
+            self._stop_sampling.set()
+            watcher.cancel()
+            stop_requested.cancel()
+            sampler.join()
+            self.duration = time.perf_counter() - start
+        now = time.monotonic()
+        for task, first_seen in self.pending.items():
+            self._task_done(task_label(task) + " (still pending)", now - first_seen)
+        logger.info("Profiled the event loop for %.1fs: %d samples", self.duration, self.samples)
+        return self
+
+    def _sample(self, thread_id):
+        while not self._stop_sampling.wait(self.interval):
+            frame = sys._current_frames().get(thread_id)
+            if frame is not None:
+                self._record(frame)
+            del frame
+
+    def _record(self, frame):
+        leaf = frame.f_code
+        names = []
+        coroutine = None
+        while frame is not None:
+            code = frame.f_code
+            names.append(frame_label(code))
+            if code.co_flags & inspect.CO_COROUTINE:
+                coroutine = names[-1]  # Walking outwards, so the last one seen is the task's own coroutine
+            frame = frame.f_back
+        self.samples += 1
+        self.stacks[";".join(reversed(names))] += 1
+        if os.path.basename(leaf.co_filename) == "selectors.py":
+            self.idle += 1
+        else:
+            self.leaves[names[0]] += 1
+        if coroutine:
+            self.coroutines[coroutine] += 1
+
+    async def _watch(self, exclude):
+        try:
+            while True:
+                before = time.perf_counter()
+                await asyncio.sleep(self.watch_interval)
+                self.max_stall = max(self.max_stall, time.perf_counter() - before - self.watch_interval)
+
+                now = time.monotonic()
+                tasks = asyncio.all_tasks() - exclude
+                for task in tasks:
+                    self.pending.setdefault(task, now)
+                for task in [t for t in self.pending if t not in tasks]:
+                    self._task_done(task_label(task), now - self.pending.pop(task))
+        except asyncio.CancelledError:
+            pass
+
+    def _task_done(self, name, seconds):
+        self.task_seconds[name] = max(self.task_seconds.get(name, 0.0), seconds)
+
+    def collapsed(self):
+        """The samples as collapsed stacks, most frequent first."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def summary(self, top=TOP_N):
+        """A plain-text digest of the run for the mod channel."""
+        busy = 1 - self.idle / self.samples if self.samples else 0.0
+        lines = [
+            f"**Profile** of {self.duration:.1f}s: {self.samples} samples, loop busy {busy:.0%}, "
+            f"worst scheduling delay {self.max_stall * 1000:.0f} ms"
+        ]
+        if self.leaves:
+            lines.append("**Hottest functions** (share of samples)")
+        for name, count in self.leaves.most_common(top):
+            lines.append(f"• {name}: {count / self.samples:.1%}")
+        if self.coroutines:
+            lines.append("**Coroutines running on the loop** (share of samples)")
+        for name, count in self.coroutines.most_common(top):
+            lines.append(f"• {name}: {count / self.samples:.1%}")
+        if self.task_seconds:
+            lines.append("**Longest pending tasks** (seconds, from the start of the profile)")
+        for name, seconds in sorted(self.task_seconds.items(), key=lambda item: -item[1])[:top]:
+            lines.append(f"• {name}: {seconds:.2f}")
+        return "\n".join(lines)
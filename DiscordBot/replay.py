@@ -0,0 +1,97 @@
+# replay.py
+import hashlib
+import json
+import logging
+import os
+
+logger = logging.getLogger('modbot.replay')
+
+LIVE = "live"  # Call the real API, record nothing
+RECORD = "record"  # Call the real API and save every request/response pair
+REPLAY = "replay"  # Serve saved responses only; never touch the network
+MODES = (LIVE, RECORD, REPLAY)
+
+
+class CassetteMiss(Exception):
+    """Raised in replay mode when a request was never recorded."""
+
+
+class Cassette:
+    """
+    Record/replay store for detector API calls.
+
+    Requests are keyed by a hash of the provider name and the canonical JSON
+    of the request, and stored one pair per line in a JSONL file. Credentials
+    must not be part of the request passed in.
+    """
+    def __init__(self, path, mode=REPLAY):
+        if mode not in MODES:
+            raise ValueError(f"Unknown cassette mode {mode!r}; expected one of {MODES}")
+        self.path = path
+        self.mode = mode
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}  # Map from request key to recorded response
+        if mode != LIVE and os.path.isfile(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    self._entries[entry["key"]] = entry["response"]
+            logger.info("Loaded %d recorded responses from %s", len(self._entries), path)
+
+    @classmethod
+    def from_env(cls):
+        """
+        Builds a cassette from MODBOT_CASSETTE (file path) and
+        MODBOT_CASSETTE_MODE (record or replay, default replay), or returns
+        None when MODBOT_CASSETTE is not set.
+        """
+        path = os.environ.get("MODBOT_CASSETTE")
+        if not path:
+            return None
+        return cls(path, os.environ.get("MODBOT_CASSETTE_MODE", REPLAY))
+
+    @property
+    def offline(self):
+        return self.mode == REPLAY
+
+    @staticmethod
+    def request_key(provider, request):
+        canonical = json.dumps([provider, request], sort_keys=True, separators=(',', ':'), default=str)
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+    async def call(self, provider, request, send, serialize=None, deserialize=None):
+        """
+        Serves one API call through the cassette.
+
+        Args:
+            provider: API name, e.g. "openai" or "perspective"
+            request: JSON-serializable request, without credentials
+            send: Zero-argument coroutine function performing the real call
+            serialize: Converts the real response to JSON-serializable data
+            deserialize: Converts recorded data back to the response type
+
+        Returns:
+            The live or recorded response
+        """
+        if self.mode == LIVE:
+            return await send()
+
+        key = self.request_key(provider, request)
+        if self.mode == REPLAY:
+            if key not in self._entries:
+                self.misses += 1
+                raise CassetteMiss(f"No recorded {provider} response for this request")
+            self.hits += 1
+            data = self._entries[key]
+            return deserialize(data) if deserialize else data
+
+        response = await send()
+        data = serialize(response) if serialize else response
+        self._entries[key] = data
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps({"key": key, "provider": provider, "request": request, "response": data}) + "\n")
+        return response
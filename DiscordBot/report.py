@@ -1,8 +1,8 @@
 from enum import Enum, auto
+import asyncio
 import discord
 import re
-import openai
-import os
+from usage import guild_scope
 
 class State(Enum):
     REPORT_START = auto()
@@ -45,18 +45,42 @@ class Context(Enum):
     DISCUSSION = "discussion"
 
 class HateSpeechClassifier:
-    def __init__(self):
-        openai.api_key = os.environ.get("OPENAI_API_KEY")
-    
-    async def classify_message(self, message_content):
+    def __init__(self, service):
+        # Shared ClassificationService (see ModBot.classifier)
+        self.service = service
+
+    @staticmethod
+    def from_automod_scores(scores):
+        """
+        Converts the scores automod already computed for a message (see
+        DetectionEngine.eval_text) into the classify_message result format.
+        """
+        if not scores.get("is_hate_speech"):
+            return (False, None, "High", "No hate speech detected")
+        category = str((scores.get("categories") or ["other"])[0]).lower()
+        mapped_type = ReportReason.OTHER
+        for rtype in ReportReason:
+            if rtype.value.rstrip("s") in category:
+                mapped_type = rtype
+                break
+        confidence = scores.get("confidence") or 0.0
+        confidence = "High" if confidence >= 0.8 else "Medium" if confidence >= 0.5 else "Low"
+        explanation = (scores.get("explanations") or [""])[0]
+        return (True, mapped_type, confidence, explanation)
+
+    async def classify_message(self, message_content, caller="report", guild_id=None):
         try:
-            response = openai.ChatCompletion.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "You are an AI trained to detect and classify hate speech in messages."},
-                    {"role": "user", "content": f"Analyze this message for hate speech: '{message_content}'. If it contains hate speech, specify the type (slurs, sexual content, discrimination, harassment, other) and provide a brief explanation. Format your response as: CONTAINS_HATE_SPEECH: [Yes/No], TYPE: [type if applicable], CONFIDENCE: [High/Medium/Low], EXPLANATION: [brief explanation]"}
-                ]
-            )
+            # Usage and spend caps are charged to the reported message's guild
+            with guild_scope(guild_id):
+                response = await self.service.chat(
+                    caller=caller,
+                    method="classify_message",
+                    model="gpt-4",
+                    messages=[
+                        {"role": "system", "content": "You are an AI trained to detect and classify hate speech in messages."},
+                        {"role": "user", "content": f"Analyze this message for hate speech: '{message_content}'. If it contains hate speech, specify the type (slurs, sexual content, discrimination, harassment, other) and provide a brief explanation. Format your response as: CONTAINS_HATE_SPEECH: [Yes/No], TYPE: [type if applicable], CONFIDENCE: [High/Medium/Low], EXPLANATION: [brief explanation]"}
+                    ]
+                )
             result = response.choices[0].message.content
             contains_hate = "CONTAINS_HATE_SPEECH: Yes" in result
             if contains_hate:
@@ -85,6 +109,8 @@ class Report:
     START_KEYWORD = "report"
     CANCEL_KEYWORD = "cancel"
     HELP_KEYWORD = "help"
+    # How long the reason prompt waits for the AI suggestion before moving on
+    LLM_PREVIEW_TIMEOUT = 3.0
 
     def __init__(self, client, reference_message=None):
         self.state = State.MESSAGE_IDENTIFIED if reference_message else State.REPORT_START
@@ -96,12 +122,60 @@ class Report:
         self.context = None
         self.additional_context = None
         self.is_immediate_threat = False
-        self.llm_classifier = HateSpeechClassifier()
+        self.llm_classifier = client.report_classifier
         self.llm_analysis_result = None
+        self.llm_analysis_task = None
+        self.llm_suggestion_pending = False
+        self.message_ids = None  # (guild, channel, message) IDs of a message still to be re-fetched
+
+    def _start_llm_analysis(self):
+        """
+        Starts classifying the reported message in the background as soon as
+        it is known. Messages automod already scored reuse those scores.
+        """
+        if self.llm_analysis_task or self.llm_analysis_result:
+            return
+        automod_scores = getattr(self.client, 'automod_scores', {}).get(self.message.id)
+        if automod_scores is not None:
+            self.llm_analysis_result = HateSpeechClassifier.from_automod_scores(automod_scores)
+            return
+        self.llm_analysis_task = asyncio.create_task(
+            self.llm_classifier.classify_message(
+                self.message.content, guild_id=self.message.guild.id if getattr(self.message, 'guild', None) else None
+            )
+        )
+
+    async def _await_llm_analysis(self, timeout=None):
+        """Returns the analysis result, or None if it is not ready within `timeout` seconds."""
+        if self.llm_analysis_result is None and self.llm_analysis_task:
+            done, _ = await asyncio.wait({self.llm_analysis_task}, timeout=timeout)
+            if done:
+                self.llm_analysis_result = self.llm_analysis_task.result()
+        return self.llm_analysis_result
+
+    def _llm_suggestion(self):
+        is_hate, hate_type, confidence, explanation = self.llm_analysis_result
+        if not is_hate:
+            return []
+        return [
+            f"Our AI suggests this might contain {hate_type.value} (confidence: {confidence})",
+            f"AI explanation: {explanation}"
+        ]
 
     async def handle_message(self, message):
+        responses = await self._handle_message(message)
+        # Show an AI suggestion that was still running when the message was identified
+        if self.llm_suggestion_pending and not self.report_complete():
+            if await self._await_llm_analysis(timeout=0):
+                self.llm_suggestion_pending = False
+                responses = self._llm_suggestion() + responses
+        return responses
+
+    async def _handle_message(self, message):
         if message.content == self.CANCEL_KEYWORD:
             self.state = State.REPORT_COMPLETE
+            if self.llm_analysis_task:
+                self.llm_analysis_task.cancel()
             return ["Report cancelled."]
         if message.content == self.HELP_KEYWORD:
             return ["This is the reporting system. Follow the prompts to report a message. You can say `cancel` at any time to cancel the report."]
@@ -138,18 +212,20 @@ class Report:
             except discord.errors.NotFound:
                 return ["It seems this message was deleted or never existed. Please try again or say `cancel` to cancel."]
             self.state = State.MESSAGE_IDENTIFIED
+            self._start_llm_analysis()
 
         if self.state == State.MESSAGE_IDENTIFIED:
             if self.message:
-                is_hate, hate_type, confidence, explanation = await self.llm_classifier.classify_message(self.message.content)
-                self.llm_analysis_result = (is_hate, hate_type, confidence, explanation)
+                self._start_llm_analysis()
                 reply = [
                     "I found this message:",
                     f"``````"
                 ]
-                if is_hate:
-                    reply.append(f"Our AI suggests this might contain {hate_type.value} (confidence: {confidence})")
-                    reply.append(f"AI explanation: {explanation}")
+                if await self._await_llm_analysis(timeout=self.LLM_PREVIEW_TIMEOUT):
+                    reply.extend(self._llm_suggestion())
+                else:
+                    self.llm_suggestion_pending = True
+                    reply.append("Our AI is still analyzing this message; any suggestion will follow.")
                 reply.extend([
                     "What is the reason for reporting this message? Please choose one of the following:",
                     "1. slurs", "2. spam", "3. sexual content", "4. discrimination", "5. harassment", "6. other",
@@ -283,3 +359,58 @@ class Report:
 
     def report_complete(self):
         return self.state == State.REPORT_COMPLETE
+
+    def to_dict(self):
+        """
+        Compact serializable form of the report state: enum values and the
+        IDs of the reported message instead of Discord objects.
+        """
+        data = {"state": self.state.name}
+        if self.message:
+            data["message"] = [self.message.guild.id, self.message.channel.id, self.message.id]
+        elif self.message_ids:
+            data["message"] = list(self.message_ids)
+        for field in ("reason", "slur_type", "target_group", "context"):
+            value = getattr(self, field)
+            if value is not None:
+                data[field] = value.value
+        if self.additional_context:
+            data["additional_context"] = self.additional_context
+        if self.is_immediate_threat:
+            data["is_immediate_threat"] = True
+        return data
+
+    @classmethod
+    def from_dict(cls, client, data):
+        """
+        Rebuilds a report from `to_dict` output. The reported message is
+        re-fetched by `restore_message` before the report is used.
+        """
+        report = cls(client)
+        report.state = State[data["state"]]
+        report.message_ids = tuple(data["message"]) if data.get("message") else None
+        report.reason = ReportReason(data["reason"]) if "reason" in data else None
+        report.slur_type = SlurType(data["slur_type"]) if "slur_type" in data else None
+        report.target_group = TargetGroup(data["target_group"]) if "target_group" in data else None
+        report.context = Context(data["context"]) if "context" in data else None
+        report.additional_context = data.get("additional_context")
+        report.is_immediate_threat = data.get("is_immediate_threat", False)
+        return report
+
+    async def restore_message(self):
+        """
+        Re-fetches the reported message of a restored report. If it is gone,
+        the reporter is asked for the message link again.
+        """
+        if not self.message_ids:
+            return
+        guild_id, channel_id, message_id = self.message_ids
+        self.message_ids = None
+        guild = self.client.get_guild(guild_id)
+        channel = guild.get_channel(channel_id) if guild else None
+        try:
+            self.message = await channel.fetch_message(message_id) if channel else None
+        except discord.errors.HTTPException:
+            self.message = None
+        if not self.message:
+            self.state = State.AWAITING_MESSAGE
@@ -0,0 +1,159 @@
+# report_sessions.py
+import asyncio
+import atexit
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+
+from report import Report
+
+logger = logging.getLogger('modbot.sessions')
+
+# Seconds between saves of changed sessions to disk
+SAVE_INTERVAL = 5
+
+
+class ReportSessionStore:
+    """
+    In-progress DM report sessions, keyed by reporter user ID.
+
+    Sessions idle for longer than `idle_timeout` seconds are dropped, and at
+    most `max_sessions` are kept (the least recently active go first), so spam
+    of the `report` keyword cannot grow memory without bound. When `path` is
+    set, sessions are saved there in compact form and restored on startup.
+    Changes are batched: `start` saves them every `save_interval` seconds off
+    the event loop, and whatever is left is saved at exit.
+    """
+    def __init__(self, client, path=None, idle_timeout=30 * 60, max_sessions=1000, save_interval=SAVE_INTERVAL):
+        self.client = client
+        self.path = path
+        self.idle_timeout = idle_timeout
+        self.max_sessions = max_sessions
+        self.save_interval = save_interval
+        self._sessions = OrderedDict()  # Map from user ID to [report, last active time], least recent first
+        self._dirty = False
+        self._task = None
+        if path:
+            atexit.register(self.save)
+
+    def __contains__(self, user_id):
+        self.expire_idle()
+        return user_id in self._sessions
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def __setitem__(self, user_id, report):
+        self._sessions[user_id] = [report, time.time()]
+        self._sessions.move_to_end(user_id)
+        self._dirty = True
+        while len(self._sessions) > self.max_sessions:
+            evicted_id, (evicted, _) = self._sessions.popitem(last=False)
+            if evicted.llm_analysis_task:
+                evicted.llm_analysis_task.cancel()
+            logger.info("Evicted report session", extra={"user_id": evicted_id})
+
+    async def get(self, user_id):
+        """
+        Returns the user's active report and marks it as recently used, or
+        None if there is none. Restored sessions get their message re-fetched.
+        """
+        self.expire_idle()
+        entry = self._sessions.get(user_id)
+        if entry is None:
+            return None
+        entry[1] = time.time()
+        self._sessions.move_to_end(user_id)
+        report = entry[0]
+        if report.message_ids:
+            await report.restore_message()
+        return report
+
+    def changed(self):
+        """Marks the sessions as needing a save, e.g. after a report handled a message."""
+        self._dirty = True
+
+    def pop(self, user_id, default=None):
+        entry = self._sessions.pop(user_id, None)
+        if entry is None:
+            return default
+        self._dirty = True
+        return entry[0]
+
+    def expire_idle(self):
+        """Drops sessions that have been idle longer than the timeout."""
+        cutoff = time.time() - self.idle_timeout
+        while self._sessions:
+            user_id, (report, last_active) = next(iter(self._sessions.items()))
+            if last_active >= cutoff:
+                break
+            self._sessions.popitem(last=False)
+            self._dirty = True
+            if report.llm_analysis_task:
+                report.llm_analysis_task.cancel()
+
+    def _snapshot(self):
+        return {
+            str(user_id): {"report": report.to_dict(), "last_active": int(last_active)}
+            for user_id, (report, last_active) in self._sessions.items()
+        }
+
+    def _write(self, data):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f, separators=(',', ':'))
+        os.replace(tmp_path, self.path)
+
+    def save(self):
+        """Writes the sessions to `path` now if anything changed since the last save."""
+        if not self.path or not self._dirty:
+            return
+        self._write(self._snapshot())
+        self._dirty = False
+
+    async def save_in_background(self):
+        """Like `save`, but the file is written on a worker thread."""
+        if not self.path or not self._dirty:
+            return
+        data = self._snapshot()
+        self._dirty = False
+        try:
+            await asyncio.to_thread(self._write, data)
+        except Exception as e:
+            self._dirty = True
+            logger.error("Could not save report sessions to %s: %s", self.path, e)
+
+    def start(self):
+        """Starts saving changes every `save_interval` seconds on the running event loop."""
+        if self._task is None and self.path:
+            self._task = asyncio.create_task(self._save_periodically())
+
+    async def _save_periodically(self):
+        while True:
+            await asyncio.sleep(self.save_interval)
+            await self.save_in_background()
+
+    def load(self):
+        """Restores sessions saved by `save`, skipping any that have since expired."""
+        if not self.path or not os.path.isfile(self.path):
+            return
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning("Could not read report sessions from %s: %s", self.path, e)
+            return
+        cutoff = time.time() - self.idle_timeout
+        for user_id, entry in data.items():
+            if entry["last_active"] < cutoff:
+                continue
+            try:
+                report = Report.from_dict(self.client, entry["report"])
+            except (KeyError, ValueError) as e:
+                logger.warning("Skipping unreadable report session: %s", e)
+                continue
+            self[int(user_id)] = report
+            self._sessions[int(user_id)][1] = entry["last_active"]
+        logger.info("Restored %d report sessions", len(self._sessions))
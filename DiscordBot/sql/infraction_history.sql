@@ -0,0 +1,12 @@
+-- Indexes backing the keyset-paginated history reads in database.py
+-- (iter_user_infractions / iter_guild_infractions).
+--
+-- Run this once in the Supabase SQL editor. Pages are ordered by
+-- (timestamp, id) descending and resume after the last row seen, so each page
+-- is a single index range scan regardless of how far back it reaches.
+
+create index if not exists infractions_user_history_idx
+    on infractions (user_id, guild_id, "timestamp" desc, id desc);
+
+create index if not exists infractions_guild_history_idx
+    on infractions (guild_id, "timestamp" desc, id desc);
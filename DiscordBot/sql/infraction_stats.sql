@@ -0,0 +1,99 @@
+-- Grouped infraction statistics for InfractionDatabase.get_infraction_stats.
+--
+-- Run this once in the Supabase SQL editor. Two rollup tables are kept up to
+-- date by triggers on `infractions`, so reading a guild's stats only touches a
+-- handful of pre-aggregated rows instead of scanning its whole history.
+
+-- All-time counts per guild, infraction type and detector.
+create table if not exists infraction_totals (
+    guild_id        bigint not null,
+    infraction_type text   not null,
+    detected_by     text   not null,
+    count           bigint not null default 0,
+    primary key (guild_id, infraction_type, detected_by)
+);
+
+-- Daily counts per guild, infraction type and detector.
+create table if not exists infraction_daily_rollups (
+    guild_id        bigint not null,
+    day             date   not null,
+    infraction_type text   not null,
+    detected_by     text   not null,
+    count           bigint not null default 0,
+    primary key (guild_id, day, infraction_type, detected_by)
+);
+
+create or replace function bump_infraction_rollups() returns trigger as $$
+declare
+    row_data infractions;
+    delta    integer;
+begin
+    if tg_op = 'INSERT' then
+        row_data := new;
+        delta := 1;
+    else
+        row_data := old;
+        delta := -1;
+    end if;
+
+    insert into infraction_totals (guild_id, infraction_type, detected_by, count)
+    values (row_data.guild_id, coalesce(row_data.infraction_type, 'unknown'),
+            coalesce(row_data.detected_by, 'unknown'), delta)
+    on conflict (guild_id, infraction_type, detected_by)
+    do update set count = infraction_totals.count + excluded.count;
+
+    insert into infraction_daily_rollups (guild_id, day, infraction_type, detected_by, count)
+    values (row_data.guild_id, (row_data."timestamp")::date,
+            coalesce(row_data.infraction_type, 'unknown'),
+            coalesce(row_data.detected_by, 'unknown'), delta)
+    on conflict (guild_id, day, infraction_type, detected_by)
+    do update set count = infraction_daily_rollups.count + excluded.count;
+
+    return null;
+end;
+$$ language plpgsql;
+
+drop trigger if exists infractions_rollup on infractions;
+create trigger infractions_rollup
+    after insert or delete on infractions
+    for each row execute function bump_infraction_rollups();
+
+-- Backfill the rollups from existing history (safe to re-run).
+insert into infraction_totals (guild_id, infraction_type, detected_by, count)
+select guild_id, coalesce(infraction_type, 'unknown'), coalesce(detected_by, 'unknown'), count(*)
+from infractions
+group by 1, 2, 3
+on conflict (guild_id, infraction_type, detected_by)
+do update set count = excluded.count;
+
+insert into infraction_daily_rollups (guild_id, day, infraction_type, detected_by, count)
+select guild_id, ("timestamp")::date, coalesce(infraction_type, 'unknown'),
+       coalesce(detected_by, 'unknown'), count(*)
+from infractions
+group by 1, 2, 3, 4
+on conflict (guild_id, day, infraction_type, detected_by)
+do update set count = excluded.count;
+
+-- Returns {"total_infractions": n, "by_type": {...}, "by_detection": {...},
+-- "by_day": {"YYYY-MM-DD": n, ...}} for one guild. `by_day` covers the last
+-- p_days days.
+create or replace function get_infraction_stats(p_guild_id bigint, p_days integer default 30)
+returns json as $$
+    select json_build_object(
+        'total_infractions',
+            coalesce((select sum(count) from infraction_totals where guild_id = p_guild_id), 0),
+        'by_type',
+            coalesce((select json_object_agg(infraction_type, n) from (
+                select infraction_type, sum(count) as n from infraction_totals
+                where guild_id = p_guild_id group by infraction_type) t), '{}'::json),
+        'by_detection',
+            coalesce((select json_object_agg(detected_by, n) from (
+                select detected_by, sum(count) as n from infraction_totals
+                where guild_id = p_guild_id group by detected_by) d), '{}'::json),
+        'by_day',
+            coalesce((select json_object_agg(day, n order by day) from (
+                select day, sum(count) as n from infraction_daily_rollups
+                where guild_id = p_guild_id and day > current_date - p_days
+                group by day) r), '{}'::json)
+    );
+$$ language sql stable;
@@ -0,0 +1,20 @@
+-- Per-user infraction counts for InfractionDatabase.get_user_infraction_counts.
+--
+-- Run this once in the Supabase SQL editor. The bot loads these counts lazily
+-- the first time it needs a user's numbers and keeps them current in memory
+-- (see counters.py), so this is called at most once per user per process.
+
+create index if not exists infractions_user_guild_idx
+    on infractions (guild_id, user_id);
+
+-- Returns {"<infraction_type>": n, ...} for one user in one guild.
+create or replace function get_user_infraction_counts(p_user_id bigint, p_guild_id bigint)
+returns json as $$
+    select coalesce(json_object_agg(infraction_type, n), '{}'::json)
+    from (
+        select coalesce(infraction_type, 'unknown') as infraction_type, count(*) as n
+        from infractions
+        where user_id = p_user_id and guild_id = p_guild_id
+        group by 1
+    ) t;
+$$ language sql stable;
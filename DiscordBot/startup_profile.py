@@ -0,0 +1,94 @@
+# startup_profile.py
+"""
+Reports how long each component of the bot takes to import and initialize,
+up to the point where the bot is ready to connect to the gateway.
+
+Run it in a fresh process so nothing is already imported:
+
+    python startup_profile.py                # exit with status 1 if over STARTUP_BUDGET
+    python startup_profile.py --budget 1.5   # ... or over 1.5 s; --budget 0 only reports
+
+tests/test_startup.py runs it as a regression test.
+
+No connection to Discord is made. The database step contacts nothing until
+the first query, but needs Supabase credentials in tokens.json to be timed.
+"""
+import argparse
+import asyncio
+import importlib
+import os
+import sys
+import time
+
+# Startup time budget in seconds, from process start of this script to a
+# constructed bot with its extensions loaded
+STARTUP_BUDGET = 2.0
+
+# Modules in the order the bot loads them; each is timed excluding anything
+# an earlier entry already imported
+IMPORT_ORDER = [
+    "log_config",
+    "config",
+    "classification_service",
+    "hate_speech_detector",
+    "detection_engine",
+    "database",
+    "discord",
+    "report",
+    "report_sessions",
+    "actions",
+    "moderation",
+    "bot",
+]
+
+
+def timed(label, timings, func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    timings.append((label, time.perf_counter() - start))
+    return result
+
+
+def profile_startup():
+    """Returns a list of (step, seconds) for every import and init step."""
+    # setup_hook would otherwise bind the metrics port, which a running bot may hold
+    os.environ["MODBOT_METRICS_PORT"] = "0"
+    timings = []
+    for module in IMPORT_ORDER:
+        timed(f"import {module}", timings, importlib.import_module, module)
+
+    from config import load_tokens
+    from detection_engine import DetectionEngine, DetectionConfig
+    from bot import ModBot
+
+    timed("init tokens", timings, load_tokens)
+    timed("init detection engine", timings, lambda: DetectionEngine(DetectionConfig.from_env()))
+    client = timed("init ModBot", timings, ModBot)
+    # setup_hook loads the moderation extension, the last step before connecting
+    timed("init extensions", timings, lambda: asyncio.run(client.setup_hook()))
+    return timings
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Profile bot startup time per component")
+    parser.add_argument("--budget", type=float, default=STARTUP_BUDGET,
+                        help=f"fail if time-to-ready exceeds this many seconds (default {STARTUP_BUDGET}, 0 to only report)")
+    args = parser.parse_args()
+
+    already_loaded = [m for m in IMPORT_ORDER if m in sys.modules]
+    if already_loaded:
+        print(f"Warning: already imported, timings will be low: {', '.join(already_loaded)}")
+
+    timings = profile_startup()
+    total = sum(seconds for _, seconds in timings)
+
+    print("\nStartup profile:")
+    for step, seconds in sorted(timings, key=lambda t: t[1], reverse=True):
+        print(f"  {step:<32} {seconds * 1000:8.1f} ms  {seconds / total * 100:5.1f}%")
+    print(f"  {'time-to-ready':<32} {total * 1000:8.1f} ms")
+
+    if args.budget:
+        if total > args.budget:
+            print(f"\nFAIL: startup took {total:.2f}s, over the {args.budget:.2f}s budget")
+            sys.exit(1)
+        print(f"\nOK: startup took {total:.2f}s, within the {args.budget:.2f}s budget")
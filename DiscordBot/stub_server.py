@@ -0,0 +1,111 @@
+# stub_server.py
+"""
+Local stand-in for the OpenAI chat and Perspective APIs, for benchmarking the
+detection pipeline without network calls or API spend.
+
+Responses are deterministic for a given request text, and the simulated
+latency and error rate are configurable. Point the bot at it with:
+
+    OPENAI_BASE_URL=http://localhost:8089/v1
+    PERSPECTIVE_API_URL=http://localhost:8089/v1alpha1/comments:analyze
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import time
+
+from aiohttp import web
+
+# Words that make the stub report hate speech, so runs exercise both branches
+FLAGGED_WORDS = ("kill", "hate", "die", "attack")
+
+
+def score_text(text):
+    """Deterministic pseudo-score in [0, 1) for a text, higher for flagged words."""
+    digest = hashlib.sha256(text.encode('utf-8')).digest()
+    base = digest[0] / 256 * 0.5
+    if any(word in text.lower() for word in FLAGGED_WORDS):
+        base += 0.5
+    return base
+
+
+class StubServer:
+    def __init__(self, latency_ms=200, jitter_ms=50, error_rate=0.0, seed=0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.requests = 0
+
+    async def simulate(self):
+        """Sleeps for the configured latency; returns an error response or None."""
+        self.requests += 1
+        delay = max(0.0, self.latency_ms + self.random.uniform(-self.jitter_ms, self.jitter_ms))
+        await asyncio.sleep(delay / 1000)
+        if self.random.random() < self.error_rate:
+            return web.json_response({"error": {"message": "Simulated server error"}}, status=500)
+        return None
+
+    async def chat_completions(self, request):
+        body = await request.json()
+        error = await self.simulate()
+        if error:
+            return error
+        text = body["messages"][-1]["content"]
+        score = score_text(text)
+        content = json.dumps({
+            "hate_speech_detected": score >= 0.5,
+            "confidence_score": round(score, 2),
+            "category": "threat" if score >= 0.5 else None,
+            "explanation": "Stub response"
+        })
+        return web.json_response({
+            "id": f"chatcmpl-stub-{self.requests}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "gpt-3.5-turbo"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop"
+            }],
+            "usage": {"prompt_tokens": len(text.split()), "completion_tokens": 40,
+                      "total_tokens": len(text.split()) + 40}
+        })
+
+    async def analyze_comment(self, request):
+        body = await request.json()
+        error = await self.simulate()
+        if error:
+            return error
+        score = score_text(body["comment"]["text"])
+        return web.json_response({
+            "attributeScores": {
+                attribute: {"summaryScore": {"value": score, "type": "PROBABILITY"}}
+                for attribute in body.get("requestedAttributes", {"TOXICITY": {}})
+            }
+        })
+
+    def app(self):
+        app = web.Application()
+        app.router.add_post('/v1/chat/completions', self.chat_completions)
+        app.router.add_post('/v1alpha1/comments:analyze', self.analyze_comment)
+        return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve stub OpenAI and Perspective APIs locally")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency-ms", type=float, default=200,
+                        help="mean simulated response time")
+    parser.add_argument("--jitter-ms", type=float, default=50,
+                        help="maximum deviation from the mean response time")
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="fraction of requests answered with HTTP 500")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="seed for latency jitter and errors, for repeatable runs")
+    args = parser.parse_args()
+    server = StubServer(args.latency_ms, args.jitter_ms, args.error_rate, args.seed)
+    web.run_app(server.app(), port=args.port)
@@ -0,0 +1,6 @@
+# conftest.py
+import os
+import sys
+
+# The bot's modules are imported as top-level modules, as when running bot.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
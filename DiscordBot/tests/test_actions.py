@@ -0,0 +1,72 @@
+# test_actions.py
+import asyncio
+
+from actions import ActionExecutor
+
+
+def test_transient_failure_is_retried():
+    attempts = []
+
+    async def flaky():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise asyncio.TimeoutError()
+        return "sent"
+
+    outcome = asyncio.run(ActionExecutor(retries=2, base_delay=0).run("1:warn:2", {"notify user": flaky}))
+    assert outcome.ok
+    assert outcome.succeeded == ["notify user"]
+    assert len(attempts) == 2
+
+
+def test_permanent_failure_is_not_retried():
+    attempts = []
+
+    async def broken():
+        attempts.append(1)
+        raise ValueError("bad request")
+
+    outcome = asyncio.run(ActionExecutor(retries=2, base_delay=0).run("1:warn:2", {"record warning": broken}))
+    assert outcome.failed == {"record warning": "bad request"}
+    assert len(attempts) == 1
+
+
+def test_same_key_does_not_repeat_a_completed_step():
+    sent = []
+
+    async def notify():
+        sent.append(1)
+
+    executor = ActionExecutor(base_delay=0)
+
+    async def run():
+        first = await executor.run("1:ban:2", {"notify user": notify})
+        second = await executor.run("1:ban:2", {"notify user": notify})
+        other = await executor.run("3:ban:2", {"notify user": notify})
+        return first, second, other
+
+    first, second, other = asyncio.run(run())
+    assert first.succeeded == ["notify user"]
+    assert second.skipped == ["notify user"] and not second.succeeded
+    assert other.succeeded == ["notify user"]
+    assert len(sent) == 2
+
+
+def test_concurrent_runs_share_an_in_flight_step():
+    sent = []
+
+    async def notify():
+        await asyncio.sleep(0.01)
+        sent.append(1)
+
+    executor = ActionExecutor(base_delay=0)
+
+    async def run():
+        return await asyncio.gather(
+            executor.run("1:ban:2", {"notify user": notify}),
+            executor.run("1:ban:2", {"notify user": notify})
+        )
+
+    outcomes = asyncio.run(run())
+    assert all(outcome.ok for outcome in outcomes)
+    assert len(sent) == 1
@@ -0,0 +1,97 @@
+# test_counters.py
+import asyncio
+
+import pytest
+
+from counters import UserCounters, CounterError, OFFENSES, WARNINGS
+
+GUILD_ID = 1000
+USER_ID = 1
+
+
+class CountingDatabase:
+    """Serves stored infraction counts and records writes, counting lookups."""
+    def __init__(self, by_type=None):
+        self.by_type = by_type if by_type is not None else {}
+        self.lookups = 0
+        self.rows = []
+        self.fail_writes = False
+
+    async def get_user_infraction_counts(self, user_id, guild_id):
+        self.lookups += 1
+        return self.by_type
+
+    async def add_infraction(self, **fields):
+        if self.fail_writes:
+            return None
+        self.rows.append(fields)
+        return {"id": len(self.rows)}
+
+
+def test_cache_miss_loads_from_the_database_once():
+    db = CountingDatabase({"hate_speech": 2, "warning": 1})
+    counters = UserCounters(db)
+
+    async def run():
+        first = await counters.get_count(USER_ID, GUILD_ID)
+        second = await counters.get_count(USER_ID, GUILD_ID, WARNINGS)
+        return first, second
+
+    assert asyncio.run(run()) == (2, 1)
+    assert db.lookups == 1
+
+
+def test_recorded_infraction_updates_the_cached_count():
+    db = CountingDatabase({"hate_speech": 2})
+    counters = UserCounters(db)
+
+    async def run():
+        await counters.get_count(USER_ID, GUILD_ID)
+        counts = await counters.record_infraction(USER_ID, GUILD_ID, "hate_speech")
+        return counts[OFFENSES], await counters.get_count(USER_ID, GUILD_ID)
+
+    assert asyncio.run(run()) == (3, 3)
+    assert db.lookups == 1
+    assert len(db.rows) == 1
+
+
+def test_failed_write_leaves_the_cached_count_unchanged():
+    db = CountingDatabase({"hate_speech": 2})
+    db.fail_writes = True
+    counters = UserCounters(db)
+
+    async def run():
+        with pytest.raises(CounterError):
+            await counters.record_infraction(USER_ID, GUILD_ID, "hate_speech")
+        return await counters.get_count(USER_ID, GUILD_ID)
+
+    assert asyncio.run(run()) == 2
+
+
+def test_invalidated_counts_are_reloaded():
+    db = CountingDatabase({"hate_speech": 2})
+    counters = UserCounters(db)
+
+    async def run():
+        await counters.get_count(USER_ID, GUILD_ID)
+        db.by_type = {"hate_speech": 5}
+        counters.invalidate(USER_ID, GUILD_ID)
+        return await counters.get_count(USER_ID, GUILD_ID)
+
+    assert asyncio.run(run()) == 5
+    assert db.lookups == 2
+
+
+def test_failed_lookup_raises_and_is_retried():
+    db = CountingDatabase()
+    db.by_type = None
+    counters = UserCounters(db)
+
+    async def run():
+        with pytest.raises(CounterError):
+            await counters.get_count(USER_ID, GUILD_ID)
+        db.by_type = {"hate_speech": 1}
+        return await counters.get_count(USER_ID, GUILD_ID)
+
+    assert asyncio.run(run()) == 1
+    assert db.lookups == 2
@@ -0,0 +1,16 @@
+# test_metrics.py
+import pytest
+
+from metrics import REGISTRY, STAGE_SECONDS, stats_summary
+
+
+def test_timed_block_is_rendered_and_summarized():
+    with STAGE_SECONDS.time(stage="test_stage"):
+        pass
+    with pytest.raises(ValueError):
+        with STAGE_SECONDS.time(stage="test_stage"):
+            raise ValueError
+
+    assert STAGE_SECONDS.count(stage="test_stage") == 2
+    assert 'modbot_stage_seconds_count{stage="test_stage"} 2' in REGISTRY.render()
+    assert "• test_stage:" in stats_summary()
@@ -0,0 +1,92 @@
+# test_moderation.py
+import asyncio
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import discord
+
+from moderation import Moderation
+
+GUILD_ID = 1000
+CHANNEL_ID = 2000
+AUTHOR_ID = 1
+REPORTER_ID = 2
+
+
+def recent_message_id(offset=0):
+    return discord.utils.time_snowflake(datetime.now(timezone.utc)) + offset
+
+
+class HistoryDatabase:
+    """Serves iter_user_infractions from a fixed list of rows."""
+    def __init__(self, rows):
+        self.rows = rows
+
+    async def iter_user_infractions(self, user_id, guild_id=None, columns="*", page_size=100, since=None):
+        for row in self.rows:
+            if row["user_id"] == user_id:
+                yield row
+
+
+def find_flagged(rows, user_id):
+    bot = SimpleNamespace(mod_reports={}, db=HistoryDatabase(rows))
+    guild = SimpleNamespace(id=GUILD_ID)
+    return asyncio.run(Moderation(bot).find_flagged_messages(guild, user_id))
+
+
+def test_purge_skips_moderator_rows_against_a_reporter():
+    reported = recent_message_id()
+    rows = [
+        # The author's automod hit, and the reporter's dismissed report of that same message
+        {"user_id": AUTHOR_ID, "infraction_type": "hate_speech", "detected_by": "automod",
+         "message_id": reported, "channel_id": CHANNEL_ID},
+        {"user_id": REPORTER_ID, "infraction_type": "false_report", "detected_by": "moderator",
+         "message_id": reported, "channel_id": CHANNEL_ID},
+    ]
+
+    assert find_flagged(rows, REPORTER_ID) == {}
+    assert find_flagged(rows, AUTHOR_ID) == {CHANNEL_ID: {reported}}
+
+
+def test_purge_includes_open_reports_of_the_users_messages():
+    author = SimpleNamespace(id=AUTHOR_ID)
+    guild = SimpleNamespace(id=GUILD_ID)
+    channel = SimpleNamespace(id=CHANNEL_ID)
+    own = SimpleNamespace(id=recent_message_id(), author=author, guild=guild, channel=channel)
+    other = SimpleNamespace(id=recent_message_id(1), author=SimpleNamespace(id=REPORTER_ID), guild=guild, channel=channel)
+    bot = SimpleNamespace(
+        mod_reports={1: {'reported_message': own}, 2: {'reported_message': other}},
+        db=None
+    )
+
+    assert asyncio.run(Moderation(bot).find_flagged_messages(guild, AUTHOR_ID)) == {CHANNEL_ID: {own.id}}
+
+
+def test_report_card_shows_reports_that_arrive_during_an_edit(monkeypatch):
+    monkeypatch.setattr("moderation.REPORT_CARD_EDIT_DELAY", 0)
+    counts = SimpleNamespace(get_count=lambda *args: asyncio.sleep(0, result=0))
+    bot = SimpleNamespace(mod_reports={}, counters=counts)
+    moderation = Moderation(bot)
+    reporters = [SimpleNamespace(id=i, name=f"reporter{i}") for i in (10, 11, 12)]
+    edits = []
+
+    async def edit(content):
+        edits.append(content)
+        if len(edits) == 1:
+            # A report lands while the first edit is in flight
+            card['reporters'].append(reporters[2])
+
+    reported = SimpleNamespace(id=recent_message_id(), content="text", author=SimpleNamespace(id=AUTHOR_ID, name="author"))
+    card = {
+        'guild_id': GUILD_ID, 'reported_message': reported, 'reason': "reason",
+        'reporters': reporters[:2], 'mod_message': SimpleNamespace(id=1, edit=edit), 'edit_task': None
+    }
+    moderation.report_cards[reported.id] = card
+
+    async def run():
+        moderation._schedule_card_edit(reported.id)
+        await card['edit_task']
+
+    asyncio.run(run())
+    assert len(edits) == 2
+    assert "reported 3 time(s)" in edits[-1]
@@ -0,0 +1,16 @@
+# test_replay.py
+import asyncio
+
+import pytest
+
+from detection_engine import DetectionEngine, DetectionConfig
+from replay import Cassette, CassetteMiss
+
+
+def test_unrecorded_request_fails_instead_of_scoring_clean(tmp_path):
+    path = tmp_path / "cassette.jsonl"
+    path.write_text("")
+    engine = DetectionEngine(DetectionConfig(cassette=Cassette(str(path), mode="replay"), cache_size=0))
+
+    with pytest.raises(CassetteMiss):
+        asyncio.run(engine.eval_text("a perfectly ordinary sentence", caller="evaluation"))
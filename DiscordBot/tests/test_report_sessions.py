@@ -0,0 +1,61 @@
+# test_report_sessions.py
+import asyncio
+import os
+from types import SimpleNamespace
+
+import report_sessions
+from report import Report, ReportReason, State
+from report_sessions import ReportSessionStore
+
+USER_ID = 1
+
+
+def make_client():
+    return SimpleNamespace(report_classifier=None)
+
+
+def test_idle_session_is_expired(monkeypatch):
+    now = 1_000_000.0
+    monkeypatch.setattr(report_sessions.time, "time", lambda: now)
+    store = ReportSessionStore(make_client(), idle_timeout=60)
+    store[USER_ID] = Report(store.client)
+    assert USER_ID in store
+
+    now += 61
+    assert USER_ID not in store
+    assert len(store) == 0
+
+
+def test_saved_sessions_are_restored(tmp_path):
+    path = str(tmp_path / "sessions.json")
+    store = ReportSessionStore(make_client(), path=path)
+    report = Report(store.client)
+    report.state = State.AWAITING_REASON
+    report.reason = ReportReason.SPAM
+    store[USER_ID] = report
+    store.save()
+
+    restored = ReportSessionStore(make_client(), path=path)
+    restored.load()
+    session = asyncio.run(restored.get(USER_ID))
+    assert session.state == State.AWAITING_REASON
+    assert session.reason == ReportReason.SPAM
+
+
+def test_changes_are_saved_in_the_background(tmp_path):
+    path = str(tmp_path / "sessions.json")
+    store = ReportSessionStore(make_client(), path=path, save_interval=0.01)
+
+    async def run():
+        store.start()
+        await store.get(USER_ID)
+        await asyncio.sleep(0.05)
+        assert not os.path.exists(path)  # Lookups alone change nothing
+        store[USER_ID] = Report(store.client)
+        await asyncio.sleep(0.05)
+        store._task.cancel()
+
+    asyncio.run(run())
+    restored = ReportSessionStore(make_client(), path=path)
+    restored.load()
+    assert USER_ID in restored
@@ -0,0 +1,17 @@
+# test_startup.py
+import os
+import subprocess
+import sys
+
+from startup_profile import STARTUP_BUDGET
+
+BOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_time_to_ready_within_budget():
+    # A fresh interpreter, so the imports being timed are not already loaded
+    result = subprocess.run(
+        [sys.executable, "startup_profile.py", "--budget", str(STARTUP_BUDGET)],
+        cwd=BOT_DIR, capture_output=True, text=True, timeout=60
+    )
+    assert result.returncode == 0, result.stdout + result.stderr
@@ -0,0 +1,218 @@
+# tracing.py
+import argparse
+import atexit
+import contextvars
+import json
+import logging
+import os
+import random
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger('modbot.tracing')
+
+# Spans written between flushes to disk
+FLUSH_EVERY = 100
+
+_current_span = contextvars.ContextVar('modbot_span', default=None)
+
+
+class Span:
+    """One timed step of a trace. `set` adds attributes shown with it in the trace viewer."""
+    __slots__ = ('tracer', 'trace_id', 'span_id', 'parent_id', 'name', 'attributes')
+
+    def __init__(self, tracer, trace_id, name, parent_id=None, attributes=None):
+        self.tracer = tracer
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.name = name
+        self.attributes = attributes or {}
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+
+def current_span():
+    return _current_span.get()
+
+
+def current_trace_id():
+    """The ID of the trace the caller is running in, or None outside one."""
+    span = _current_span.get()
+    return span.trace_id if span else None
+
+
+@contextmanager
+def _run(active):
+    token = _current_span.set(active)
+    start_wall = time.time()
+    start = time.perf_counter()
+    try:
+        yield active
+    except BaseException as e:
+        active.set(error=type(e).__name__)
+        raise
+    finally:
+        _current_span.reset(token)
+        active.tracer.write(active, start_wall, time.perf_counter() - start)
+
+
+class _NoSpan:
+    """Stands in for a span outside a trace, so untraced calls allocate nothing."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+def span(name, **attributes):
+    """
+    Times the `with` block as a child of the current span. Outside a trace
+    (tracing disabled or the message not sampled) this does nothing and
+    yields None.
+    """
+    parent = _current_span.get()
+    if parent is None:
+        return _NO_SPAN
+    return _run(Span(parent.tracer, parent.trace_id, name, parent.span_id, attributes))
+
+
+class Tracer:
+    """
+    Writes one trace per handled message, following it through detection,
+    the mod channel and later moderator actions, in the Chrome trace event
+    format (open the file in ui.perfetto.dev or chrome://tracing).
+
+    Each trace is drawn as its own row, labelled by the root span. Moderator
+    actions continue the trace of the report card they act on, using the
+    trace ID stored with it in bot.mod_reports. With no `path` the tracer is
+    disabled and every span is a no-op.
+    """
+    def __init__(self, path=None, sample_rate=1.0):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.spans = 0
+        self.pid = os.getpid()
+        self._file = None
+        if path:
+            self._file = open(path, 'a', encoding='utf-8')
+            if self._file.tell() == 0:
+                self._file.write("[\n")  # Viewers accept the array left unterminated
+            atexit.register(self.close)
+            logger.info("Writing traces to %s (sampling %.0f%% of messages)", path, sample_rate * 100)
+
+    @classmethod
+    def from_env(cls):
+        """
+        Builds a tracer from MODBOT_TRACE_LOG (file path) and
+        MODBOT_TRACE_SAMPLE (fraction of messages traced, default 1).
+        The tracer is disabled when MODBOT_TRACE_LOG is not set.
+        """
+        return cls(
+            os.environ.get("MODBOT_TRACE_LOG"),
+            sample_rate=float(os.environ.get("MODBOT_TRACE_SAMPLE", 1.0))
+        )
+
+    @property
+    def enabled(self):
+        return self._file is not None
+
+    def trace(self, name, trace_id=None, **attributes):
+        """
+        Starts a root span: a new sampled trace, or a continuation of
+        `trace_id` (always recorded, since its start was). Yields the span, or
+        None when nothing is recorded.
+        """
+        if not self.enabled or (trace_id is None and random.random() >= self.sample_rate):
+            return _NO_SPAN
+        root = Span(self, trace_id or f"{random.getrandbits(64):016x}", name, attributes=attributes)
+        self._write_event({
+            "name": "thread_name", "ph": "M", "pid": self.pid, "tid": self._tid(root.trace_id),
+            "args": {"name": f"trace {root.trace_id}"}
+        })
+        return _run(root)
+
+    @staticmethod
+    def _tid(trace_id):
+        return int(trace_id[:8], 16)
+
+    def write(self, span, start, seconds):
+        if self._file is None or self._file.closed:
+            return
+        self._write_event({
+            "name": span.name,
+            "cat": "modbot",
+            "ph": "X",
+            "ts": int(start * 1_000_000),
+            "dur": int(seconds * 1_000_000),
+            "pid": self.pid,
+            "tid": self._tid(span.trace_id),
+            "args": {
+                "trace_id": span.trace_id,
+                "span_id": span.span_id,
+                "parent_id": span.parent_id,
+                **span.attributes
+            },
+        })
+        self.spans += 1
+        if self.spans % FLUSH_EVERY == 0:
+            self._file.flush()
+
+    def _write_event(self, event):
+        if self._file is None or self._file.closed:
+            return
+        self._file.write(json.dumps(event, separators=(',', ':'), default=str) + ",\n")
+
+    def close(self):
+        if self._file and not self._file.closed:
+            self._file.close()
+
+
+def load_trace(path):
+    """Reads a trace file written by Tracer, skipping a truncated last line."""
+    events = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip().rstrip(',')
+            if not line or line == "[":
+                continue
+            try:
+                events.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return events
+
+
+def print_slowest(events, count=5):
+    """Prints the slowest root spans with their steps, indented under their parents."""
+    spans = [event for event in events if event.get("ph") == "X"]
+    children = {}
+    for event in spans:
+        children.setdefault(event["args"].get("parent_id"), []).append(event)
+
+    def show(event, depth):
+        args = {k: v for k, v in event["args"].items() if k not in ("trace_id", "span_id", "parent_id")}
+        details = " ".join(f"{k}={v}" for k, v in args.items())
+        print(f"{'  ' * depth}{event['dur'] / 1000:>8.1f} ms  {event['name']}  {details}")
+        for child in sorted(children.get(event["args"]["span_id"], []), key=lambda e: e["ts"]):
+            show(child, depth + 1)
+
+    roots = sorted(children.get(None, []), key=lambda e: -e["dur"])[:count]
+    for root in roots:
+        print(f"\nTrace {root['args']['trace_id']}")
+        show(root, 1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Show the slowest traces in a MODBOT_TRACE_LOG file")
+    parser.add_argument("path", help="trace file written with MODBOT_TRACE_LOG")
+    parser.add_argument("--count", type=int, default=5, help="number of traces to show")
+    args = parser.parse_args()
+    print_slowest(load_trace(args.path), args.count)
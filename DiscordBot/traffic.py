@@ -0,0 +1,142 @@
+# traffic.py
+import atexit
+import hashlib
+import hmac
+import json
+import logging
+import os
+import time
+
+logger = logging.getLogger('modbot.traffic')
+
+# Events written between flushes to disk
+FLUSH_EVERY = 100
+
+MESSAGE = "m"
+REACTION = "r"
+
+
+def content_hash(text, salt=None):
+    """
+    A 16-hex-digit digest of `text`. With a salt it is an HMAC, so short or
+    common messages cannot be recovered by hashing guesses.
+    """
+    if salt:
+        return hmac.new(salt.encode('utf-8'), text.encode('utf-8'), hashlib.sha256).hexdigest()[:16]
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]
+
+
+class TrafficRecorder:
+    """
+    Opt-in capture of the gateway events the bot handles, for replay with
+    traffic_replay.py.
+
+    Each event is one compact JSON line. Message text and attachment names
+    (apart from the extension) are stored only as hashes unless
+    `include_content` is set. With a `salt` those hashes are keyed by it and
+    user IDs are replaced by salted hashes, so a log can be shared without
+    exposing who said what. Channel and guild IDs are kept so the routing can
+    be replayed.
+
+    Keys: t time, k kind (m message / r reaction), g guild, c channel, role
+    channel role, m message, a author, u reacting user, h content hash,
+    n content length, x content, f attachments [[filename or hashed name, size]], e emoji,
+    s ID of the reported message when the event targets a mod report card.
+    """
+    def __init__(self, path, include_content=False, salt=None):
+        self.path = path
+        self.include_content = include_content
+        self.salt = salt
+        self.events = 0
+        self._file = open(path, 'a', encoding='utf-8')
+        atexit.register(self.close)
+        logger.info("Recording traffic to %s (content %s)", path, "included" if include_content else "hashed")
+
+    @classmethod
+    def from_env(cls):
+        """
+        Builds a recorder from MODBOT_TRAFFIC_LOG (file path),
+        MODBOT_TRAFFIC_CONTENT ("1" to store message text) and
+        MODBOT_TRAFFIC_SALT (pseudonymizes user IDs), or returns None when
+        MODBOT_TRAFFIC_LOG is not set.
+        """
+        path = os.environ.get("MODBOT_TRAFFIC_LOG")
+        if not path:
+            return None
+        return cls(
+            path,
+            include_content=os.environ.get("MODBOT_TRAFFIC_CONTENT") == "1",
+            salt=os.environ.get("MODBOT_TRAFFIC_SALT")
+        )
+
+    def _user(self, user_id):
+        if not self.salt:
+            return user_id
+        return int(hashlib.sha256(f"{self.salt}:{user_id}".encode()).hexdigest()[:15], 16)
+
+    def _filename(self, filename):
+        if self.include_content:
+            return filename
+        # The extension decides how the bot reads an attachment, so replay needs it
+        stem, ext = os.path.splitext(filename)
+        return content_hash(stem, self.salt) + ext
+
+    def record_message(self, message, role=None, source_id=None):
+        content = message.content or ""
+        event = {
+            "t": round(time.time(), 3),
+            "k": MESSAGE,
+            "g": message.guild.id if message.guild else None,
+            "c": message.channel.id,
+            "role": role,
+            "m": message.id,
+            "a": self._user(message.author.id),
+            "h": content_hash(content, self.salt),
+            "n": len(content),
+        }
+        if self.include_content:
+            event["x"] = content
+        if message.attachments:
+            event["f"] = [[self._filename(a.filename), a.size] for a in message.attachments]
+        if source_id:
+            event["s"] = source_id
+        self._write(event)
+
+    def record_reaction(self, payload, source_id=None):
+        event = {
+            "t": round(time.time(), 3),
+            "k": REACTION,
+            "g": payload.guild_id,
+            "c": payload.channel_id,
+            "m": payload.message_id,
+            "u": self._user(payload.user_id),
+            "e": payload.emoji.name,
+        }
+        if source_id:
+            event["s"] = source_id
+        self._write(event)
+
+    def _write(self, event):
+        if self._file.closed:
+            return
+        self._file.write(json.dumps(event, separators=(',', ':'), ensure_ascii=False) + "\n")
+        self.events += 1
+        if self.events % FLUSH_EVERY == 0:
+            self._file.flush()
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+
+def load_traffic(path):
+    """Reads a traffic log, skipping a truncated last line, in time order."""
+    events = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                events.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    events.sort(key=lambda event: event["t"])
+    return events
@@ -0,0 +1,194 @@
+# traffic_replay.py
+"""
+Replays a traffic log captured by traffic.TrafficRecorder through a stubbed
+ModBot (see load_test.py), to reproduce incidents or benchmark pipeline
+changes on real traffic shapes:
+
+    python traffic_replay.py traffic.jsonl               # original timing
+    python traffic_replay.py traffic.jsonl --speed 10    # ten times faster
+    python traffic_replay.py traffic.jsonl --speed 0     # one event at a time, as fast as possible
+
+Messages in monitored channels go through on_message. Moderator replies and
+reactions on report cards are re-targeted at the cards the replay itself
+created for the same reported message. Text that was only recorded as a hash
+is replaced by a corpus text chosen by that hash, so repeated messages stay
+repeated. DMs (the report flow) are not replayed.
+"""
+import argparse
+import asyncio
+import logging
+import time
+from types import SimpleNamespace
+
+from benchmarks import load_corpus
+from channel_index import MONITORED, MOD, ESCALATION
+from load_test import (
+    LoadStats, MockAttachment, MockMessage, MockUser, add_mock_channel, stub_bot
+)
+from memory_monitor import rss_bytes
+from traffic import MESSAGE, REACTION, load_traffic
+
+
+class TrafficReplayer:
+    def __init__(self, bot, corpus, discord_latency=0.0):
+        self.bot = bot
+        self.corpus = corpus
+        self.discord_latency = discord_latency
+        self.channels = {}  # Map from recorded channel ID to mock channel
+        self.replayed_ids = {}  # Map from recorded message ID to the replayed message's ID
+        self.users = {}  # Map from recorded user ID to MockUser
+        self.skipped = {}  # Map from reason to count
+        self.stats = LoadStats()
+
+    def skip(self, reason):
+        self.skipped[reason] = self.skipped.get(reason, 0) + 1
+
+    def user(self, user_id):
+        if user_id not in self.users:
+            self.users[user_id] = MockUser(user_id)
+        return self.users[user_id]
+
+    def channel(self, event):
+        channel = self.channels.get(event["c"])
+        if channel is None:
+            channel = add_mock_channel(self.bot, event["g"], event["c"], event["role"], self.discord_latency)
+            self.channels[event["c"]] = channel
+        return channel
+
+    def prepare(self, events):
+        """Creates every channel in the log up front, plus a mod channel for guilds recorded without one."""
+        for event in events:
+            if event["k"] == MESSAGE and event["g"] is not None and event["role"]:
+                self.channel(event)
+        for guild_id in list(self.bot.mock_guilds):
+            if self.bot.channel_index.channel(guild_id, MOD) is None:
+                add_mock_channel(self.bot, guild_id, -guild_id, MOD, self.discord_latency)
+
+    def stand_in(self, digest, length=None):
+        """A corpus text chosen by a content hash, so equal hashes give equal text."""
+        return self.corpus[int(digest, 16) % len(self.corpus)][:length]
+
+    def text(self, event):
+        """The recorded text, or its stand-in when only the hash was recorded."""
+        return event["x"] if "x" in event else self.stand_in(event["h"])
+
+    def card_for(self, source_id, escalated):
+        """The report card the replay created for the recorded reported message, if any."""
+        replayed_id = self.replayed_ids.get(source_id)
+        for card_id, info in self.bot.mod_reports.items():
+            if info['reported_message'].id == replayed_id and bool(info.get('is_escalated')) == escalated:
+                return card_id
+        return None
+
+    def build(self, event):
+        """Turns one logged event into a zero-argument coroutine function, or None to skip it."""
+        if event["k"] == MESSAGE:
+            if event["g"] is None:
+                self.skip("direct message")
+                return None
+            if event["role"] == MONITORED:
+                attachments = [
+                    MockAttachment(filename, self.stand_in(event["h"], size))
+                    for filename, size in event.get("f", [])
+                ]
+                message = MockMessage(self.channel(event), self.text(event), self.user(event["a"]), attachments)
+                self.replayed_ids[event["m"]] = message.id
+                return lambda: self.bot.on_message(message)
+            if event["role"] in (MOD, ESCALATION) and event.get("s"):
+                channel = self.channel(event)
+
+                async def reply():
+                    card_id = self.card_for(event["s"], event["role"] == ESCALATION)
+                    if card_id is None:
+                        self.skip("card not replayed")
+                        return
+                    message = MockMessage(channel, self.text(event), self.user(event["a"]), reference_id=card_id)
+                    await self.bot.on_message(message)
+
+                return reply
+            self.skip(f"{event['role'] or 'other'} channel message")
+            return None
+
+        if event["k"] == REACTION and event.get("s"):
+            async def react():
+                card_id = self.card_for(event["s"], escalated=False) or self.card_for(event["s"], escalated=True)
+                if card_id is None:
+                    self.skip("card not replayed")
+                    return
+                await self.bot.on_raw_reaction_add(SimpleNamespace(
+                    guild_id=event["g"], channel_id=event["c"], message_id=card_id,
+                    user_id=event["u"], emoji=SimpleNamespace(name=event["e"])
+                ))
+
+            return react
+        self.skip("reaction off report cards")
+        return None
+
+    async def deliver(self, run):
+        start = time.perf_counter()
+        error = False
+        try:
+            await run()
+        except Exception as e:
+            error = True
+            print(f"  error: {type(e).__name__}: {e}")
+        self.stats.record(time.perf_counter() - start, error)
+
+    async def replay(self, events, speed=1.0):
+        """Replays events at `speed` times the recorded pace; 0 means one at a time, without waiting."""
+        if not events:
+            return 0.0
+        self.prepare(events)
+        first = events[0]["t"]
+        start = time.perf_counter()
+        tasks = []
+        for event in events:
+            run = self.build(event)
+            if run is None:
+                continue
+            self.stats.sent += 1
+            if not speed:
+                await self.deliver(run)
+                continue
+            await asyncio.sleep(max(0.0, start + (event["t"] - first) / speed - time.perf_counter()))
+            tasks.append(asyncio.create_task(self.deliver(run)))
+        if tasks:
+            await asyncio.wait(tasks)
+        return time.perf_counter() - start
+
+
+async def main(args):
+    for name in ('modbot', 'modbot.messages'):
+        logging.getLogger(name).setLevel(logging.WARNING)
+    events = load_traffic(args.log)
+    span = events[-1]["t"] - events[0]["t"] if events else 0.0
+    print(f"Replaying {len(events)} events spanning {span:.0f}s from {args.log}")
+
+    bot = await stub_bot(args.llm_latency_ms / 1000, args.db_latency_ms / 1000)
+    replayer = TrafficReplayer(bot, load_corpus(size=args.corpus_size), args.discord_latency_ms / 1000)
+    rss_start = rss_bytes()
+    elapsed = await replayer.replay(events, args.speed)
+
+    stats = replayer.stats
+    p50, p99, worst = LoadStats.percentiles(stats.latencies)
+    print("\nSummary:")
+    print(f"  Events: {stats.completed} replayed, {stats.errors} errors, in {elapsed:.1f}s")
+    for reason, count in sorted(replayer.skipped.items()):
+        print(f"  Skipped ({reason}): {count}")
+    print(f"  Latency: p50 {p50:.1f} ms, p99 {p99:.1f} ms, max {worst:.1f} ms")
+    mod_channels = bot.channel_index.channels[MOD].values()
+    print(f"  Mod channel messages: {sum(c.sent for c in mod_channels)}, "
+          f"database writes: {bot.db.writes}, report cards: {len(bot.mod_reports)}")
+    print(f"  Memory growth: {(rss_bytes() - rss_start) / 2**20:.1f} MB RSS")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay captured traffic through a stubbed bot")
+    parser.add_argument("log", help="traffic log written with MODBOT_TRAFFIC_LOG")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="replay speed relative to the recording; 0 replays one event at a time")
+    parser.add_argument("--llm-latency-ms", type=float, default=300, help="stubbed OpenAI response time")
+    parser.add_argument("--db-latency-ms", type=float, default=30, help="stubbed database call time")
+    parser.add_argument("--discord-latency-ms", type=float, default=50, help="mock channel send time")
+    parser.add_argument("--corpus-size", type=int, default=5000, help="texts used in place of hashed content")
+    asyncio.run(main(parser.parse_args()))
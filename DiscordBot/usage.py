@@ -0,0 +1,215 @@
+# usage.py
+import asyncio
+import atexit
+import contextvars
+import json
+import logging
+import os
+import time
+from contextlib import contextmanager
+
+from metrics import LLM_TOKENS, LLM_COST, LLM_CAPPED
+
+logger = logging.getLogger('modbot.usage')
+
+# Local store the meter appends aggregated usage to; override with MODBOT_USAGE_LOG
+USAGE_LOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "usage.jsonl")
+
+# Seconds between flushes of the in-memory totals to the usage log
+FLUSH_INTERVAL = 300
+
+# Estimated USD per 1K (prompt, completion) tokens. Versioned model names such
+# as gpt-4-0613 are priced by their longest matching prefix
+PRICES = {
+    "gpt-3.5-turbo": (0.0005, 0.0015),
+    "gpt-4": (0.03, 0.06),
+    "gpt-4-turbo": (0.01, 0.03),
+    "gpt-4o": (0.0025, 0.01),
+    "gpt-4o-mini": (0.00015, 0.0006),
+}
+
+# Cheaper model used once a guild has spent DOWNGRADE_AT of its daily cap
+FALLBACK_MODELS = {
+    "gpt-4": "gpt-3.5-turbo",
+    "gpt-4-turbo": "gpt-3.5-turbo",
+    "gpt-4o": "gpt-4o-mini",
+}
+DOWNGRADE_AT = 0.8
+
+# Guild the current task is working for, set around automod scans and report analysis
+_current_guild = contextvars.ContextVar('modbot_usage_guild', default=None)
+
+
+@contextmanager
+def guild_scope(guild_id):
+    """Attributes LLM calls made inside the `with` block (and tasks it starts) to `guild_id`."""
+    token = _current_guild.set(guild_id)
+    try:
+        yield
+    finally:
+        _current_guild.reset(token)
+
+
+def current_guild():
+    return _current_guild.get()
+
+
+class SpendCapReached(Exception):
+    """Raised instead of calling the API once a guild has used up its daily cap."""
+
+
+def price_for(model):
+    if model in PRICES:
+        return PRICES[model]
+    matches = [name for name in PRICES if model.startswith(name)]
+    return PRICES[max(matches, key=len)] if matches else (0.0, 0.0)
+
+
+def estimate_cost(model, prompt_tokens, completion_tokens):
+    prompt_price, completion_price = price_for(model)
+    return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1000
+
+
+def _today():
+    return time.strftime('%Y-%m-%d', time.gmtime())
+
+
+class UsageMeter:
+    """
+    Token and estimated cost accounting for every LLM call.
+
+    Calls are aggregated in memory by detection method, guild and caller
+    (automod, report, evaluation) and appended to a JSONL file every
+    `flush_interval` seconds, one line per group. Cache hits make no API call
+    and are not billed.
+
+    `guild_caps` maps guild IDs to a daily (UTC) spend cap in USD. Past
+    DOWNGRADE_AT of its cap a guild's calls use the cheaper model in
+    FALLBACK_MODELS; at the cap they raise SpendCapReached, leaving automod
+    with the regex tier only. Today's spend is reloaded from the file on start,
+    so restarts do not reset the caps.
+    """
+    def __init__(self, path=None, guild_caps=None, flush_interval=FLUSH_INTERVAL):
+        self.path = path
+        self.guild_caps = {int(guild): float(cap) for guild, cap in (guild_caps or {}).items()}
+        self.flush_interval = flush_interval
+        self.totals = {}  # Map from (method, guild, caller, model) to [calls, prompt, completion, cost] since the last flush
+        self.period_start = time.time()
+        self.day = _today()
+        self.daily_spend = {}  # Map from guild ID to USD spent today
+        self.lifetime = {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "cost_usd": 0.0}
+        self._task = None
+        if path:
+            self._load_spend()
+            atexit.register(self.flush)
+
+    def _load_spend(self):
+        if not os.path.isfile(self.path):
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if row.get("day") == self.day and row.get("guild") is not None:
+                    self.daily_spend[row["guild"]] = self.daily_spend.get(row["guild"], 0.0) + row["cost_usd"]
+
+    def _roll_day(self):
+        today = _today()
+        if today != self.day:
+            self.day = today
+            self.daily_spend = {}
+
+    def spent_today(self, guild_id):
+        self._roll_day()
+        return self.daily_spend.get(guild_id, 0.0)
+
+    def choose_model(self, model):
+        """
+        The model to call for the current guild given its spend cap. Raises
+        SpendCapReached when the guild may make no more calls today.
+        """
+        guild_id = current_guild()
+        cap = self.guild_caps.get(guild_id)
+        if cap is None:
+            return model
+        spent = self.spent_today(guild_id)
+        if spent >= cap:
+            LLM_CAPPED.inc(action="skipped")
+            raise SpendCapReached(f"Daily LLM spend cap of ${cap:.2f} reached for this server")
+        if spent >= cap * DOWNGRADE_AT and model in FALLBACK_MODELS:
+            LLM_CAPPED.inc(action="downgraded")
+            return FALLBACK_MODELS[model]
+        return model
+
+    def record(self, model, usage, caller="unknown", method="unknown"):
+        """Adds one API response's `usage` (prompt and completion token counts) to the totals."""
+        if usage is None:
+            return
+        prompt = getattr(usage, 'prompt_tokens', 0) or 0
+        completion = getattr(usage, 'completion_tokens', 0) or 0
+        cost = estimate_cost(model, prompt, completion)
+        guild_id = current_guild()
+
+        group = self.totals.setdefault((method, guild_id, caller, model), [0, 0, 0, 0.0])
+        group[0] += 1
+        group[1] += prompt
+        group[2] += completion
+        group[3] += cost
+        self.lifetime["calls"] += 1
+        self.lifetime["prompt_tokens"] += prompt
+        self.lifetime["completion_tokens"] += completion
+        self.lifetime["cost_usd"] += cost
+        if guild_id is not None:
+            self._roll_day()
+            self.daily_spend[guild_id] = self.daily_spend.get(guild_id, 0.0) + cost
+
+        LLM_TOKENS.inc(prompt, caller=caller, method=method, kind="prompt")
+        LLM_TOKENS.inc(completion, caller=caller, method=method, kind="completion")
+        LLM_COST.inc(cost, caller=caller, method=method)
+
+    def flush(self):
+        """Appends the totals since the last flush to the usage log and clears them."""
+        now = time.time()
+        totals, self.totals = self.totals, {}
+        start, self.period_start = self.period_start, now
+        if not self.path or not totals:
+            return
+        day = time.strftime('%Y-%m-%d', time.gmtime(start))
+        try:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                for (method, guild_id, caller, model), (calls, prompt, completion, cost) in totals.items():
+                    f.write(json.dumps({
+                        "start": round(start, 3),
+                        "end": round(now, 3),
+                        "day": day,
+                        "method": method,
+                        "guild": guild_id,
+                        "caller": caller,
+                        "model": model,
+                        "calls": calls,
+                        "prompt_tokens": prompt,
+                        "completion_tokens": completion,
+                        "cost_usd": round(cost, 6),
+                    }, separators=(',', ':')) + "\n")
+        except OSError as e:
+            logger.error("Failed to write usage log %s: %s", self.path, e)
+
+    def start(self):
+        """Starts flushing every `flush_interval` seconds on the running event loop."""
+        if self._task is None and self.path:
+            self._task = asyncio.create_task(self._flush_periodically())
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            self.flush()
+
+    def cap_summary(self, guild_id):
+        """One line on the guild's spend today and its cap, for the `.stats` mod command."""
+        spent = self.spent_today(guild_id)
+        cap = self.guild_caps.get(guild_id)
+        if cap is None:
+            return f"• this server today: ${spent:.4f}, no cap"
+        return f"• this server today: ${spent:.4f} of ${cap:.2f} cap"